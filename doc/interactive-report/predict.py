@@ -2,7 +2,6 @@ import pandas as pd
 import numpy as np
 import pickle
 import shap
-from lightgbm import LGBMClassifier
 
 def get_new_prediction(bus_line, hour, month, day, bus_carrying_cap, city, temp, pressure, bus_age, total_rain):
   
@@ -69,12 +68,17 @@ def get_new_prediction(bus_line, hour, month, day, bus_carrying_cap, city, temp,
     'month': pd.Series(month, dtype='int')
   })
   
-  for c in new_data.columns:
-    col_type = new_data[c].dtype
-    if col_type == 'object' or col_type.name == 'category':
-      new_data[c] = new_data[c].astype('category')
-
   with (open("results/ml_model/report/final_fitted.pickle", 'rb')) as openfile:
     model = pickle.load(openfile)
+
+  # the categorical columns of the model and their levels are saved with it by 3_model_generator.py,
+  # a model without them only had the text columns as categories
+  feature_categories = getattr(model, 'feature_categories_', None)
+  for c in new_data.columns:
+    if feature_categories is None:
+      if new_data[c].dtype == 'object':
+        new_data[c] = new_data[c].astype('category')
+    elif c in feature_categories:
+      new_data[c] = pd.Categorical(new_data[c], categories=feature_categories[c])
     
   return {'shap': shap.TreeExplainer(model=model).shap_values(new_data)[1], 'predicted': model.predict_proba(new_data), 'column_names': new_data.columns.to_list()}
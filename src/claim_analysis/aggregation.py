@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+The aggregation stage of `claim_description.py`. It works on the integer codes
+of the `TokenStore` of the parsed claims: the typos are fixed on the
+vocabulary, the rare impacted objects and chosen verbs are found with
+`np.bincount`, the chosen verbs of each claim are exploded from the offsets and
+every impacted object and verb gets a colour from the sorted distinct values.
+Categories beyond the size of the palette get a colour derived from a hash of
+their name. The lists of the claims are only turned back into Python lists for
+the rows of the two output data frames. Optionally, the rare tokens that are
+not in the typo tables are matched to the known spellings and the common
+tokens with a fuzzy index.
+"""
+
+import hashlib
+import os
+import sys
+import numpy as np
+import pandas as pd
+from token_store import TokenColumn
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.fuzzy_index import fuzzy_normalizer
+
+
+def hash_colour(value):
+    """
+    It returns a hex colour derived from the md5 hash of a value, so a value
+    always gets the same colour.
+    """
+    return '#' + hashlib.md5(str(value).encode('utf-8')).hexdigest()[:6]
+
+
+def normalized_values(column, vocabulary, lookup, min_confidence=None, min_count=5):
+    """
+    It gives the lowercased tokens of each claim with the typos fixed. Like the
+    joined text of the tokens, the lookup only matches the claims with one
+    token, and the claims without tokens get one empty token.
+
+    Parameters:
+    column (TokenColumn): The tokens of the claims.
+    vocabulary (Vocabulary): The vocabulary of the codes, the new values are added to it.
+    lookup (dict): A dictionary of value -> normalized value, see `normalization.load_mapping`.
+    min_confidence (float): The minimum confidence of a fuzzy match of a rare token, None turns the fuzzy matching off.
+    min_count (int): The tokens of the column that occur at least this many times are taken as correct.
+
+    Returns:
+    normalized (TokenColumn): At least one token for each claim.
+    """
+    lower = vocabulary.map(str.lower)
+    lengths = column.lengths()
+    codes = lower[column.codes]
+    single = column.offsets[:-1][lengths == 1]
+    used, counts = np.unique(codes, return_counts=True)
+    strings = vocabulary.strings
+    normalized = fuzzy_normalizer(lookup, {strings[code]: count for code, count in zip(used.tolist(), counts.tolist())},
+                                  min_confidence, min_count)
+    single_codes, inverse = np.unique(codes[single], return_inverse=True)
+    codes[single] = np.array([vocabulary.add(normalized[strings[code]]) for code in single_codes.tolist()],
+                             dtype=codes.dtype)[inverse.ravel()]
+    empty_code = vocabulary.add(lookup.get('', ''))
+    codes = np.insert(codes, column.offsets[:-1][lengths == 0], empty_code)
+    offsets = np.zeros(len(column) + 1, dtype=np.int64)
+    np.cumsum(np.maximum(lengths, 1), out=offsets[1:])
+    return TokenColumn(offsets, codes)
+
+
+def rare_codes(codes, lower, n_codes, min_count):
+    """
+    It flags the codes of the values that occur less than `min_count` times,
+    the values are counted in lowercase but the flags are for the values as they are.
+
+    Parameters:
+    codes (ndarray): The codes of the values.
+    lower (ndarray): The code of the lowercased value of each code.
+    n_codes (int): The size of the vocabulary.
+    min_count (int): The minimum number of occurrences.
+
+    Returns:
+    rare (ndarray): A flag for every code of the vocabulary.
+    """
+    counts = np.bincount(lower[codes], minlength=n_codes)
+    return (counts > 0) & (counts < min_count)
+
+
+def assign_colours(codes, vocabulary, palette):
+    """
+    It assigns a colour to each distinct value, the i-th value in sorted order
+    gets the i-th colour of the palette and the values beyond the palette get
+    a `hash_colour`.
+
+    Returns:
+    colours (ndarray): The colour of each code.
+    """
+    used, inverse = np.unique(codes, return_inverse=True)
+    strings = vocabulary.array()[used]
+    ranks = np.empty(len(used), dtype=np.int64)
+    ranks[np.argsort(strings, kind='stable')] = np.arange(len(used))
+    colours = np.array([palette[rank] if rank < len(palette) else hash_colour(string)
+                        for rank, string in zip(ranks, strings)], dtype=object)
+    return colours[inverse.ravel()]
+
+
+def aggregate(claims_df, store, typos, palette, min_impact_count=5, min_verb_count=3, min_confidence=None):
+    """
+    It creates the claim and the verb data frames of the dashboard.
+
+    Parameters:
+    claims_df (DataFrame): The description and the information of each parsed claim with a RangeIndex.
+    store (TokenStore): The parsed claims in the order of `claims_df`.
+    typos (dict): The typo lookup of the `impact` and `chosen_verb` columns.
+    palette (list): The colour names.
+    min_impact_count (int): The impacted objects that occur less often are left out.
+    min_verb_count (int): The chosen verbs that occur less often are left out.
+    min_confidence (float): The minimum confidence of a fuzzy match of a rare impacted
+    object or chosen verb, None turns the fuzzy matching off.
+
+    Returns:
+    result_df (DataFrame): The claims with a common impacted object and its colour in `impact_colour`.
+    result_verb_df (DataFrame): A row per common chosen verb of these claims with its colour in `verb_colour`.
+    """
+    vocabulary = store.vocabulary
+    impact = normalized_values(store['impact'], vocabulary, typos.get('impact', {}), min_confidence)
+    chosen_verb = normalized_values(store['chosen_verb'], vocabulary, typos.get('chosen_verb', {}), min_confidence)
+    lower = vocabulary.map(str.lower)
+    n_codes = len(vocabulary)
+
+    # there is one impacted object per claim
+    rare_impact = rare_codes(impact.codes, lower, n_codes, min_impact_count)
+    keep = np.flatnonzero(~rare_impact[impact.codes])
+    verbs = chosen_verb.take(keep)
+    # the first filter of the verbs uses the rare impacted objects, as it always has
+    common_verbs = ~rare_impact[verbs.codes]
+    rare_verb = rare_codes(verbs.codes[common_verbs], lower, n_codes, min_verb_count)
+    verb_rows = np.flatnonzero(common_verbs & ~rare_verb[verbs.codes])
+
+    strings = vocabulary.array()
+    kept = store.take(keep)
+    pos_lists = pd.Series(kept['pos'].to_lists(vocabulary), index=keep, dtype=object)
+    info = claims_df.iloc[keep]
+    result_df = pd.concat([pd.DataFrame({
+        'Description': info['Description'].values,
+        'POS': pos_lists,
+        'preposition': pd.Series(kept['preposition'].to_lists(vocabulary), index=keep, dtype=object),
+        'verb': pd.Series(kept['verb'].to_lists(vocabulary), index=keep, dtype=object),
+        'chosen_verb': verbs.join(vocabulary),
+        'pos': pos_lists,
+        'noun': pd.Series(kept['noun'].to_lists(vocabulary), index=keep, dtype=object),
+        'impact': strings[impact.codes[keep]]}, index=keep), info.drop(columns='Description')], axis=1)
+    result_df['claim_id'] = np.arange(1, len(keep) + 1, 1)
+
+    result_verb_df = result_df.iloc[verbs.rows()[verb_rows]].rename(columns={'chosen_verb': 'chosen_verb_y'})
+    result_verb_df.index = verb_rows
+    result_verb_df.insert(0, 'chosen_verb_x', strings[verbs.codes[verb_rows]])
+    result_verb_df = result_verb_df[['claim_id'] + [column for column in result_verb_df.columns if column != 'claim_id']]
+
+    result_df['impact_colour'] = assign_colours(impact.codes[keep], vocabulary, palette)
+    result_verb_df['verb_colour'] = assign_colours(verbs.codes[verb_rows], vocabulary, palette)
+    return result_df, result_verb_df
@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This script benchmarks the stage of `claim_description.py` after the parsing
+on synthetic parsed claims at several multiples of the claim volume. It
+compares three versions, checks that they give the same data frames and
+reports their time and their peak memory:
+- lists: the data frame of Python lists, the joined and reparsed verbs, the
+  dictionary counts and the per row colour lookups the script used first,
+- pandas: the same data frame with `value_counts`, `explode` and `np.unique`,
+- store: the integer codes of `token_store.TokenStore` and `aggregation.aggregate`.
+
+Usage: benchmark_aggregation.py [--n_claims=<n_claims>] [--scales=<scales>] [--normalization_path=<normalization_path>] [--color_path=<color_path>] [--seed=<seed>]
+
+Options:
+--n_claims=<n_claims>  The number of claims at scale 1 [default: 3000].
+--scales=<scales>  The comma separated multiples of the number of claims [default: 1,10,100].
+--normalization_path=<normalization_path>  A file path for the typo and colour mapping tables [default: src/claim_analysis/normalization.json].
+--color_path=<color_path>  A file path for the list of colors [default: src/claim_analysis/data.json].
+--seed=<seed>  The random seed [default: 123].
+
+Example:
+python src/claim_analysis/benchmark_aggregation.py --n_claims=3000 --scales=1,10,100
+"""
+
+import sys
+import time
+import tracemalloc
+from docopt import docopt
+import numpy as np
+import pandas as pd
+from aggregation import aggregate
+from normalization import load_mapping, normalize
+from token_store import TokenStore
+
+INFO_COLUMNS = ['occurrence_id', 'loss_date_x', 'bus_category', 'bus_no_x', 'asset_manufacturer', 'latt', 'long']
+
+
+def list_frame(claims_df, parsed_claims, typos):
+    """
+    The data frame of Python lists with the joined impacts and verbs, the way
+    `claim_description.py` built it before the token store.
+    """
+    list_of_list = list()
+    for sentence, parsed, info in zip(claims_df['Description'], parsed_claims, claims_df[INFO_COLUMNS].values.tolist()):
+        pos_list, preposition_list, verb_list, chosen_verb_list, noun_list, impact_list = parsed
+        list_of_list.append([sentence, pos_list, preposition_list, verb_list, chosen_verb_list, pos_list,
+                             noun_list, impact_list] + info)
+    pos_df = pd.DataFrame(list_of_list, columns=['Description', 'POS', 'preposition', 'verb', 'chosen_verb', 'pos',
+                                                 'noun', 'impact'] + INFO_COLUMNS)
+    pos_df['impact'] = pos_df['impact'].apply(','.join).str.lower()
+    pos_df['chosen_verb'] = pos_df['chosen_verb'].apply(','.join).str.lower()
+    for column, lookup in typos.items():
+        pos_df[column] = normalize(pos_df[column], lookup)
+    return pos_df
+
+
+def lists_aggregate(pos_df, palette):
+    """
+    The aggregation with dictionary counts and per row colour lookups.
+    """
+    checker = dict()
+    for i in pos_df['impact']:
+        if i.lower() not in checker:
+            checker[i.lower()] = 1
+        else:
+            checker[i.lower()] += 1
+    Impacted_object_df = pd.DataFrame(checker.items(), columns=[
+                                      'Impacted Object', 'Count']).sort_values(by='Count', ascending=False)
+    Verbs_df = pd.DataFrame(checker.items(), columns=[
+                            'Verbs', 'Count']).sort_values(by='Count', ascending=False)
+    less_frequent_impact_objects = Impacted_object_df['Impacted Object'][Impacted_object_df['Count'] < 5]
+    less_frequent_verbs = Verbs_df['Verbs'][Verbs_df['Count'] < 5]
+    effective_impact = pos_df[~pos_df['impact'].isin(
+        less_frequent_impact_objects)].copy()
+
+    list_of_colour = pd.DataFrame({'name': palette})
+    effective_impact_len = len(effective_impact)
+    effective_impact['claim_id'] = np.arange(1, effective_impact_len+1, 1)
+    intermediate_df = (effective_impact[['claim_id', 'chosen_verb']].set_index(['claim_id'])
+                       .apply(lambda x: x.str.split(',').explode()).reset_index())
+    exploded_verb_df = pd.merge(
+        intermediate_df, effective_impact, on='claim_id')
+    effective_verb = exploded_verb_df[~exploded_verb_df['chosen_verb_x'].isin(
+        less_frequent_verbs)]
+
+    checker_verb = dict()
+    for i in effective_verb['chosen_verb_x']:
+        if i.lower() not in checker_verb:
+            checker_verb[i.lower()] = 1
+        else:
+            checker_verb[i.lower()] += 1
+    effective_verbs_df = pd.DataFrame(checker_verb.items(), columns=[
+                                      'Verbs', 'Count']).sort_values(by='Count', ascending=False)
+    less_occuring_verbs = effective_verbs_df['Verbs'][effective_verbs_df['Count'] < 3]
+    updated_verb = effective_verb[~effective_verb['chosen_verb_x'].isin(
+        less_occuring_verbs)].copy()
+
+    impact_list = list(np.unique(effective_impact['impact']))
+    impact_colour = list()
+    for i in effective_impact['impact']:
+        impact_colour.append(list_of_colour.iloc[impact_list.index(i)]['name'])
+    verb_list = list(np.unique(updated_verb['chosen_verb_x']))
+    verb_colour = list()
+    for i in updated_verb['chosen_verb_x']:
+        verb_colour.append(list_of_colour.iloc[verb_list.index(i)]['name'])
+    effective_impact['impact_colour'] = impact_colour
+    updated_verb['verb_colour'] = verb_colour
+    return effective_impact, updated_verb
+
+
+def pandas_aggregate(pos_df, palette):
+    """
+    The aggregation with `value_counts`, `explode` and the codes of `np.unique`.
+    """
+    def rare_values(values, min_count):
+        counts = values.str.lower().value_counts()
+        return counts.index[counts < min_count]
+
+    def assign_colours(values):
+        uniques, codes = np.unique(values.values, return_inverse=True)
+        return np.array(palette[:len(uniques)], dtype=object)[codes.ravel()]
+
+    less_frequent_impact_objects = rare_values(pos_df['impact'], 5)
+    effective_impact = pos_df[~pos_df['impact'].isin(less_frequent_impact_objects)].copy()
+    effective_impact['claim_id'] = np.arange(1, len(effective_impact) + 1, 1)
+    columns = ['claim_id', 'chosen_verb_x'] + ['chosen_verb_y' if column == 'chosen_verb' else column
+                                               for column in effective_impact.columns if column != 'claim_id']
+    exploded_verb_df = (effective_impact.rename(columns={'chosen_verb': 'chosen_verb_y'})
+                        .assign(chosen_verb_x=effective_impact['chosen_verb'].str.split(','))
+                        .explode('chosen_verb_x'))[columns].reset_index(drop=True)
+    effective_verb = exploded_verb_df[~exploded_verb_df['chosen_verb_x'].isin(less_frequent_impact_objects)]
+    less_occuring_verbs = rare_values(effective_verb['chosen_verb_x'], 3)
+    updated_verb = effective_verb[~effective_verb['chosen_verb_x'].isin(less_occuring_verbs)].copy()
+    effective_impact['impact_colour'] = assign_colours(effective_impact['impact'])
+    updated_verb['verb_colour'] = assign_colours(updated_verb['chosen_verb_x'])
+    return effective_impact, updated_verb
+
+
+def synthetic_claims(n_claims, rng, typos):
+    """
+    It creates parsed claims with a Zipf like distribution of the nouns and the
+    verbs, some of them typos of the normalization tables.
+    """
+    typo_verbs = sorted({source for rule in typos['chosen_verb'] for source in rule})
+    typo_impacts = sorted({source for rule in typos['impact'] for source in rule})
+    nouns = np.array(['noun%d' % i for i in range(100)] + ['Bus', 'TP'] + typo_impacts, dtype=object)
+    verbs = np.array(['verb%d' % i for i in range(150)] + ['Hit'] + typo_verbs, dtype=object)
+    tags = np.array(['NOUN', 'VERB', 'PROPN', 'ADJ', 'ADP'], dtype=object)
+    noun_weights = 1.0 / np.arange(1, len(nouns) + 1)
+    verb_weights = 1.0 / np.arange(1, len(verbs) + 1)
+    n_nouns = rng.randint(0, 4, n_claims)
+    n_verbs = rng.randint(0, 4, n_claims)
+    all_nouns = rng.choice(nouns, n_nouns.sum(), p=noun_weights / noun_weights.sum()).tolist()
+    all_verbs = rng.choice(verbs, n_verbs.sum(), p=verb_weights / verb_weights.sum()).tolist()
+    all_tags = rng.choice(tags, (n_nouns + n_verbs).sum()).tolist()
+    parsed_claims = []
+    noun_start = verb_start = tag_start = 0
+    for n_noun, n_verb in zip(n_nouns, n_verbs):
+        noun_list = all_nouns[noun_start:noun_start + n_noun]
+        verb_list = all_verbs[verb_start:verb_start + n_verb]
+        pos_list = all_tags[tag_start:tag_start + n_noun + n_verb]
+        noun_start, verb_start, tag_start = noun_start + n_noun, verb_start + n_verb, tag_start + n_noun + n_verb
+        parsed_claims.append([pos_list, [], verb_list, verb_list[:2], noun_list, noun_list[-1:]])
+    claims_df = pd.DataFrame({'Description': ['claim %d' % i for i in range(n_claims)],
+                              'occurrence_id': np.arange(n_claims),
+                              'loss_date_x': pd.date_range('2019-01-01', periods=n_claims, freq='h'),
+                              'bus_category': rng.randint(0, 5, n_claims), 'bus_no_x': rng.randint(0, 9999, n_claims),
+                              'asset_manufacturer': rng.choice(['NEW FLYER', 'NOVA'], n_claims).astype(object),
+                              'latt': rng.rand(n_claims), 'long': rng.rand(n_claims)})
+    return claims_df, parsed_claims
+
+
+def list_bytes(parsed_claims):
+    """
+    It returns the size of the list objects of the parsed claims, the strings
+    are shared by the lists and not counted.
+    """
+    return sum(sys.getsizeof(tokens) for parsed in parsed_claims for tokens in parsed)
+
+
+def measure(function, *args):
+    """
+    It returns the result, the time and the peak memory of a function, the
+    memory is traced in a second run so it doesn't slow the first one down.
+    """
+    t = time.time()
+    result = function(*args)
+    elapsed_time = time.time() - t
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed_time, peak
+
+
+def main(n_claims, scales, normalization_path, color_path, seed):
+    mapping = load_mapping(normalization_path)
+    palette = list(normalize(pd.read_json(color_path)['name'], mapping['colours']))
+    rules = pd.read_json(normalization_path, typ='series')['typos']
+    typo_sources = {column: [rule['from'] for rule in column_rules] for column, column_rules in rules.items()}
+    rng = np.random.RandomState(seed)
+    for scale in scales:
+        claims_df, parsed_claims = synthetic_claims(n_claims * scale, rng, typo_sources)
+        versions = {
+            'lists': lambda: lists_aggregate(list_frame(claims_df, parsed_claims, mapping['typos']), palette),
+            'pandas': lambda: pandas_aggregate(list_frame(claims_df, parsed_claims, mapping['typos']), palette),
+            'store': lambda: aggregate(claims_df, TokenStore.from_parsed(parsed_claims), mapping['typos'], palette)}
+        results = {name: measure(function) for name, function in versions.items()}
+        reference_df, reference_verb_df = results['lists'][0]
+        print("Claims: %d (x%d), token lists: %.1f MB as Python lists, %.1f MB in the token store" % (
+            len(parsed_claims), scale, list_bytes(parsed_claims) / 2 ** 20,
+            TokenStore.from_parsed(parsed_claims).nbytes / 2 ** 20))
+        for name, ((result_df, result_verb_df), elapsed_time, peak) in results.items():
+            identical = result_df.equals(reference_df) and result_verb_df.equals(reference_verb_df)
+            print("  %-6s identical: %s, %.2f s, peak memory %.1f MB" % (name, identical, elapsed_time, peak / 2 ** 20))
+
+
+if __name__ == "__main__":
+    opt = docopt(__doc__)
+    main(int(opt['--n_claims']), [int(scale) for scale in opt['--scales'].split(',')],
+         opt['--normalization_path'], opt['--color_path'], int(opt['--seed']))
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This script benchmarks the in-memory merge of `merge_claims.py` against the
+streamed join of `hash_join.py` on synthetic claim and location files. Every
+run is made in a new process so its peak resident memory can be compared, and
+the merged data of every streamed run is checked against the in-memory one.
+Some columns of both files are empty in their first half and change their
+type in the second half, as in the wide and sparse claim file, so the chunks
+of a streamed run don't all read them with the same dtype.
+
+Usage: benchmark_merge.py [--n_claims=<n_claims>] [--budgets=<budgets>] [--partitions=<partitions>] [--chunksize=<chunksize>] [--seed=<seed>]
+
+Options:
+--n_claims=<n_claims>  The number of claim rows [default: 1000000].
+--budgets=<budgets>  The comma separated memory budgets in megabytes of the streamed runs [default: 512,128,32].
+--partitions=<partitions>  The number of disk partitions of an extra streamed run that spills [default: 8].
+--chunksize=<chunksize>  The number of claim rows in a chunk of an extra streamed run, with and without partitions [default: 20000].
+--seed=<seed>  The random seed [default: 123].
+
+Example:
+python src/claim_analysis/benchmark_merge.py --n_claims=1000000 --budgets=512,128,32
+"""
+
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from docopt import docopt
+import numpy as np
+import pandas as pd
+from hash_join import stream_merge
+from common.artifact_io import write_table
+from common.schemas import peak_rss
+
+
+def make_files(n_claims, directory, seed):
+    """
+    It writes a claim file with several lines per claim and a location file
+    with the coordinates of part of the claims, both with some shared columns
+    and some columns that are empty in their first half.
+    """
+    rng = np.random.RandomState(seed)
+    n_ids = n_claims // 3
+    claims = pd.DataFrame({'claim_id': rng.randint(0, n_ids, n_claims), 'line_id': np.arange(n_claims),
+                           'loss_date': pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.randint(0, 2000, n_claims), unit='D'),
+                           'bus_no': rng.randint(1000, 9999, n_claims),
+                           'paid_cost$': np.round(rng.lognormal(7, 1.5, n_claims), 2),
+                           'claim_desc': rng.choice(['BUS HIT POLE', 'TP REAR ENDED BUS', 'MIRROR CLIPPED',
+                                                     'PASSENGER FELL ON BOARD'], n_claims)})
+    for i in range(10):
+        claims['code_%d' % i] = rng.randint(0, 1000, n_claims)
+    second_half = np.arange(n_claims) >= n_claims // 2
+    # text after the empty first half, integers with missing values and integers that turn into text
+    claims['repair_shop'] = np.where(second_half, rng.choice(['NORTH YARD', 'OAKRIDGE', 'SURREY'], n_claims), None)
+    claims['po_number'] = np.where(second_half & (rng.rand(n_claims) < 0.9), rng.randint(1, 99999, n_claims), np.nan)
+    claims['po_number'] = claims['po_number'].astype('Int64')
+    claims['unit_ref'] = np.where(second_half, np.char.add('U', rng.randint(0, 999, n_claims).astype(str)),
+                                  rng.randint(0, 999, n_claims).astype(str))
+    location_ids = rng.choice(n_ids, n_ids // 2, replace=False)
+    locations = pd.DataFrame({'claim_id': location_ids, 'bus_no': rng.randint(1000, 9999, len(location_ids)),
+                              'city_of_incident': rng.choice(['Vancouver', 'Burnaby', 'Surrey'], len(location_ids)),
+                              'lat': rng.uniform(49.0, 49.4, len(location_ids)),
+                              'long': rng.uniform(-123.3, -122.6, len(location_ids))})
+    locations['loss_location_at'] = np.where(np.arange(len(location_ids)) >= len(location_ids) // 2,
+                                             rng.choice(['KINGSWAY', 'MAIN ST', 'GRANVILLE ST'], len(location_ids)), None)
+    claims_path = os.path.join(directory, 'claims.csv')
+    locations_path = os.path.join(directory, 'locations.csv')
+    claims.to_csv(claims_path, index=False)
+    locations.to_csv(locations_path, index=False)
+    return claims_path, locations_path
+
+
+def run(claims_path, locations_path, output_file_path, memory_budget, n_partitions, chunksize=None):
+    """
+    It runs one merge in the current process.
+
+    Returns:
+    elapsed_time (float): The time of the merge.
+    peak (float): The peak resident memory of the process in megabytes.
+    baseline (float): The resident memory of the process before the merge in megabytes.
+    """
+    baseline = peak_rss()
+    t = time.time()
+    if memory_budget is None and n_partitions is None and chunksize is None:
+        merged = pd.merge(pd.read_csv(claims_path), pd.read_csv(locations_path), on=['claim_id'], how='inner')
+        write_table(merged, output_file_path)
+    else:
+        stream_merge(claims_path, locations_path, output_file_path,
+                     memory_budget=None if memory_budget is None else memory_budget * 2 ** 20,
+                     n_partitions=n_partitions, chunksize=chunksize)
+    return time.time() - t, peak_rss(), baseline
+
+
+def main(n_claims, budgets, partitions, chunksize, seed):
+    with tempfile.TemporaryDirectory() as directory:
+        claims_path, locations_path = make_files(n_claims, directory, seed)
+        print("Claims: %d rows, %.1f MB on disk; locations: %.1f MB on disk" % (
+            n_claims, os.path.getsize(claims_path) / 2 ** 20, os.path.getsize(locations_path) / 2 ** 20))
+        runs = [('in-memory', None, None, None)] + [('budget %d MB' % budget, budget, None, None) for budget in budgets]
+        runs.append(('budget %d MB, %d partitions' % (budgets[-1], partitions), budgets[-1], partitions, None))
+        runs.append(('chunks of %d rows' % chunksize, None, None, chunksize))
+        runs.append(('chunks of %d rows, %d partitions' % (chunksize, partitions), None, partitions, chunksize))
+        reference = None
+        for i, (name, memory_budget, n_partitions, run_chunksize) in enumerate(runs):
+            output_file_path = os.path.join(directory, 'merged_%d.parquet' % i)
+            # a new process for every run, the peak memory of a process never goes down
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                elapsed_time, peak, baseline = executor.submit(
+                    run, claims_path, locations_path, output_file_path, memory_budget, n_partitions,
+                    run_chunksize).result()
+            merged = pd.read_parquet(output_file_path)
+            if reference is None:
+                reference = merged
+            if n_partitions is not None:
+                # the spilled join is ordered by partition
+                merged = merged.sort_values('line_id').reset_index(drop=True)
+                identical = merged.equals(reference.sort_values('line_id').reset_index(drop=True))
+            else:
+                identical = merged.equals(reference)
+            print("  %-30s %6.2f s, peak memory %7.1f MB (%.1f MB above the start), %d rows, identical: %s" % (
+                name, elapsed_time, peak, peak - baseline, len(merged), identical))
+
+
+if __name__ == "__main__":
+    opt = docopt(__doc__)
+    main(int(opt['--n_claims']), [int(budget) for budget in opt['--budgets'].split(',')],
+         int(opt['--partitions']), int(opt['--chunksize']), int(opt['--seed']))
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This script benchmarks the tagging of the claim descriptions. It compares the
+previous loop, which calls the full spaCy pipeline once per claim, with
+`nlp.pipe` on the pipeline without the parser and the NER, checks that both give
+the same POS tags and lemmas and reports the claims per second of both.
+
+Usage: benchmark_nlp.py [--input_merged_path=<input_merged_path>] [--n_claims=<n_claims>] [--batch_size=<batch_size>] [--n_process=<n_process>]
+
+Options:
+--input_merged_path=<input_merged_path>  A file path for merged data, synthetic descriptions are used if it is not given.
+--n_claims=<n_claims>  The number of claims to tag [default: 5000].
+--batch_size=<batch_size>  The number of claim descriptions in a spaCy batch [default: 256].
+--n_process=<n_process>  The number of processes spaCy uses to tag the descriptions [default: 1].
+
+Example:
+python src/claim_analysis/benchmark_nlp.py \
+--input_merged_path "results/claim_analysis/data/merged_collision.parquet"
+"""
+
+from docopt import docopt
+import os
+import random
+import spacy
+import sys
+import time
+from claim_parser import load_nlp, clean_description
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.artifact_io import read_table
+
+WORDS = ['bus', 'rr', 'scrape', 'tp', 'veh', 'hit', 'rear', 'ended', 'pole', 'mirror', 'side',
+         'swiped', 'while', 'turning', 'left', 'right', 'cyclist', 'pedestrian', 'fell', 'on',
+         'board', 'damaged', 'parked', 'car', 'door', 'clipped', 'trolley', 'poles', 'curb']
+
+
+def synthetic_descriptions(n_claims, seed=123):
+    """
+    It creates short, jargon heavy descriptions like the ones of the claims.
+    """
+    rng = random.Random(seed)
+    return [' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 9))).upper() for _ in range(n_claims)]
+
+
+def main(input_merged_path, n_claims, batch_size, n_process):
+    if input_merged_path is None:
+        descriptions = synthetic_descriptions(n_claims)
+    else:
+        descriptions = read_table(input_merged_path, columns=['claim_desc'])['claim_desc'].dropna().tolist()[:n_claims]
+
+    t = time.time()
+    full_nlp = spacy.load("en_core_web_sm")
+    full_load_time = time.time() - t
+    t = time.time()
+    nlp = load_nlp()
+    load_time = time.time() - t
+
+    texts = [clean_description(sentence, nlp.Defaults.stop_words)[1] for sentence in descriptions]
+
+    t = time.time()
+    loop_tags = [[(token.pos_, token.lemma_) for token in full_nlp(text)] for text in texts]
+    loop_time = time.time() - t
+
+    t = time.time()
+    pipe_tags = [[(token.pos_, token.lemma_) for token in doc]
+                 for doc in nlp.pipe(texts, batch_size=batch_size, n_process=n_process)]
+    pipe_time = time.time() - t
+
+    identical = sum(loop == pipe for loop, pipe in zip(loop_tags, pipe_tags))
+    print("Claims: %d, identical POS tags and lemmas: %d" % (len(texts), identical))
+    print("Loop over nlp(): load %.2f s, %.2f s, %.1f claims/s" % (full_load_time, loop_time, len(texts) / loop_time))
+    print("nlp.pipe:        load %.2f s, %.2f s, %.1f claims/s" % (load_time, pipe_time, len(texts) / pipe_time))
+
+
+if __name__ == "__main__":
+    opt = docopt(__doc__)
+    main(opt['--input_merged_path'], int(opt['--n_claims']), int(opt['--batch_size']), int(opt['--n_process']))
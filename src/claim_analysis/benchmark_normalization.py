@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This script benchmarks the normalization of the typos and the colours. It
+compares the chained `replace` calls that `claim_description.py` used before
+with the compiled lookups of `normalization.py` on a synthetic frame, checks
+that both give the same impacts, chosen verbs and colours and reports the time
+of both.
+
+Usage: benchmark_normalization.py [--n_rows=<n_rows>] [--normalization_path=<normalization_path>] [--color_path=<color_path>] [--seed=<seed>]
+
+Options:
+--n_rows=<n_rows>  The number of rows of the synthetic frame [default: 1000000].
+--normalization_path=<normalization_path>  A file path for the typo and colour mapping tables [default: src/claim_analysis/normalization.json].
+--color_path=<color_path>  A file path for the list of colors [default: src/claim_analysis/data.json].
+--seed=<seed>  The random seed [default: 123].
+
+Example:
+python src/claim_analysis/benchmark_normalization.py --n_rows=1000000
+"""
+
+import json
+import time
+from docopt import docopt
+import numpy as np
+import pandas as pd
+from normalization import load_mapping, normalize
+
+OTHER_WORDS = ['bus', 'pole', 'mirror', 'window', 'door', 'hit', 'turn', 'strike', 'hit,turn', 'pull,strike']
+
+
+def legacy_normalize(frame, tables):
+    """
+    It applies the rules the way `claim_description.py` did, one `replace` per
+    rule, the colour rules on the whole frame.
+    """
+    frame = frame.copy()
+    for column, rules in tables['typos'].items():
+        for rule in rules:
+            frame[column] = frame[column].replace(rule['from'], rule['to'], regex=False)
+    for rule in tables['colours']:
+        for source in rule['from']:
+            frame = frame.replace(source, rule['to'])
+    return frame
+
+
+def main(n_rows, normalization_path, color_path, seed):
+    with open(normalization_path) as mapping_file:
+        tables = json.load(mapping_file)
+    palette = pd.read_json(color_path)['name']
+
+    rng = np.random.RandomState(seed)
+    frame = pd.DataFrame({'Description': rng.choice(OTHER_WORDS, n_rows).astype(object),
+                          'bus_no_x': rng.randint(0, 10000, n_rows),
+                          'colour': palette.values[rng.randint(0, len(palette), n_rows)]})
+    for column, rules in tables['typos'].items():
+        vocabulary = sorted({source for rule in rules for source in rule['from']}) + OTHER_WORDS
+        frame[column] = np.array(vocabulary, dtype=object)[rng.randint(0, len(vocabulary), n_rows)]
+
+    t = time.time()
+    legacy = legacy_normalize(frame, tables)
+    legacy_time = time.time() - t
+
+    t = time.time()
+    mapping = load_mapping(normalization_path)
+    normalized = frame.copy()
+    for column, lookup in mapping['typos'].items():
+        normalized[column] = normalize(normalized[column], lookup)
+    normalized['colour'] = normalize(normalized['colour'], mapping['colours'])
+    engine_time = time.time() - t
+
+    columns = list(tables['typos']) + ['colour']
+    print("Rows: %d, identical columns %s: %s" % (n_rows, columns, legacy[columns].equals(normalized[columns])))
+    print("Chained replace: %.2f s" % legacy_time)
+    print("Compiled lookup: %.2f s (%.1fx faster)" % (engine_time, legacy_time / engine_time))
+
+
+if __name__ == "__main__":
+    opt = docopt(__doc__)
+    main(int(opt['--n_rows']), opt['--normalization_path'], opt['--color_path'], int(opt['--seed']))
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This script benchmarks the fast tagger of `fast_tagger.py` against the spaCy
+model. It reports the startup time and the claims per second of both and the
+fraction of the claims the fast tagger tags from its lexicon. Without a lexicon
+one is distilled from the spaCy tags of the claims first.
+
+Usage: benchmark_tagger.py [--input_merged_path=<input_merged_path>] [--lexicon_path=<lexicon_path>] [--n_claims=<n_claims>] [--batch_size=<batch_size>]
+
+Options:
+--input_merged_path=<input_merged_path>  A file path for merged data, synthetic descriptions are used if it is not given.
+--lexicon_path=<lexicon_path>  A file path for a lexicon of `fast_tagger.py`.
+--n_claims=<n_claims>  The number of claims to tag [default: 5000].
+--batch_size=<batch_size>  The number of claim descriptions in a batch [default: 256].
+
+Example:
+python src/claim_analysis/benchmark_tagger.py \
+--input_merged_path "results/claim_analysis/data/merged_collision.parquet" \
+--lexicon_path "results/claim_analysis/cache/lexicon.json"
+"""
+
+import os
+import sys
+import tempfile
+import time
+from docopt import docopt
+from benchmark_nlp import synthetic_descriptions
+from claim_parser import load_nlp, clean_description
+from fast_tagger import FastTagger, distill_lexicon, save_lexicon
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.artifact_io import read_table
+
+
+def main(input_merged_path, lexicon_path, n_claims, batch_size):
+    if input_merged_path is None:
+        descriptions = synthetic_descriptions(n_claims)
+    else:
+        descriptions = read_table(input_merged_path, columns=['claim_desc'])['claim_desc'].dropna().tolist()[:n_claims]
+
+    t = time.time()
+    nlp = load_nlp()
+    spacy_startup = time.time() - t
+    texts = [clean_description(sentence, nlp.Defaults.stop_words)[1] for sentence in descriptions]
+
+    if lexicon_path is None:
+        lexicon_path = os.path.join(tempfile.mkdtemp(), 'lexicon.json')
+        save_lexicon(distill_lexicon(texts, nlp), nlp.Defaults.stop_words, lexicon_path)
+
+    t = time.time()
+    tagger = FastTagger.from_file(lexicon_path)
+    fast_startup = time.time() - t
+
+    t = time.time()
+    spacy_tags = [[(token.pos_, token.lemma_) for token in doc] for doc in nlp.pipe(texts, batch_size=batch_size)]
+    spacy_time = time.time() - t
+
+    t = time.time()
+    fast_tags = [[(token.pos_, token.lemma_) for token in doc] for doc in tagger.pipe(texts, batch_size=batch_size)]
+    fast_time = time.time() - t
+
+    identical = sum(spacy_doc == fast_doc for spacy_doc, fast_doc in zip(spacy_tags, fast_tags))
+    print("Claims: %d, lexicon: %d tokens, identical POS tags and lemmas: %d" % (len(texts), len(tagger), identical))
+    print("spaCy:       startup %.3f s, %.2f s, %.1f claims/s" % (spacy_startup, spacy_time, len(texts) / spacy_time))
+    print("Fast tagger: startup %.3f s, %.2f s, %.1f claims/s" % (fast_startup, fast_time, len(texts) / fast_time))
+    print("Claims tagged from the lexicon: {fast_claims}, by spaCy: {fallback_claims} ({fast_ratio:.2%} fast)".format(
+        **tagger.stats()))
+
+
+if __name__ == "__main__":
+    opt = docopt(__doc__)
+    main(opt['--input_merged_path'], opt['--lexicon_path'], int(opt['--n_claims']), int(opt['--batch_size']))
@@ -6,36 +6,55 @@ This script takes different data sets as input.
 It cleans different data sets by removing extra rows from the top of the dataset.
 Cleaned data is stored by creating a folder named "Clean_data". This script assumes that 'get-data.py' is run before.
 
-Usage: claim_description.py --input_merged_path=<input_merged_path> --color_path=<color_path> --output_path=<output_path> 
+Usage: claim_description.py --input_merged_path=<input_merged_path> --color_path=<color_path> --output_path=<output_path> [--batch_size=<batch_size>] [--n_process=<n_process>] [--cache_dir=<cache_dir>] [--incremental] [--normalization_path=<normalization_path>] [--workers=<workers>] [--lexicon_path=<lexicon_path>] [--min_confidence=<min_confidence>] [--export=<export>]
 
 Options:
 --input_merged_path=<input_merged_path> A file path for merged data.
 --color_path=<color> A file path for the list of colors.
 --output_path=<output_path> A file path to store the verb colour and noun colour dataframes.
+--export=<export>  The comma separated extensions of other formats to write the dataframes in too, the dashboard reads xlsx.
+--batch_size=<batch_size>  The number of claim descriptions in a spaCy batch [default: 256].
+--n_process=<n_process>  The number of processes spaCy uses to tag the descriptions [default: 1].
+--workers=<workers>  The number of processes that parse shards of the claims, each one with its own spaCy model [default: 1].
+--lexicon_path=<lexicon_path>  A file path for a lexicon of `fast_tagger.py`, the claims are tagged from it and spaCy only tags the claims with unknown tokens.
+--min_confidence=<min_confidence>  The minimum confidence from 0 to 1 of a fuzzy match of a rare impacted object or chosen verb that is not in the typo tables, no fuzzy matching if it is not given.
+--cache_dir=<cache_dir>  A directory for the caches kept between runs [default: results/claim_analysis/cache].
+--normalization_path=<normalization_path>  A file path for the typo and colour mapping tables [default: src/claim_analysis/normalization.json].
+--incremental  Only parse the claim descriptions that are not in the claim store of the cache directory.
 
 Example: 
 python src/claim_analysis/claim_description.py \
---input_merged_path "results/claim_analysis/data/merged_collision.xlsx" \
+--input_merged_path "results/claim_analysis/data/merged_collision.parquet" \
 --color_path "src/claim_analysis/data.json" \
---output_path "results/claim_analysis/report" 
+--output_path "results/claim_analysis/report" \
+--export xlsx
 
 """
 
 from docopt import docopt
 import pandas as pd
-import nltk
-import spacy
-from nltk import word_tokenize
-from nltk.corpus import wordnet
 import time
-from collections import Counter
-import numpy as np
 import os
+import sys
+from claim_parser import (PIPELINE_VERSION, load_nlp, model_version, clean_description, parse_descriptions,
+                          parse_sharded)
+from lexname_cache import LexnameCache
+from claim_store import ClaimStore
+from fast_tagger import FastTagger
+from normalization import load_mapping, normalize
+from aggregation import aggregate
+from token_store import TokenStore
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.artifact_io import read_table, write_table
 
 opt = docopt(__doc__)
 
 
-def main(input_merged_path, color_path, output_path):
+def main(input_merged_path, color_path, output_path, batch_size=256, n_process=1,
+         cache_dir='results/claim_analysis/cache', incremental=False,
+         normalization_path='src/claim_analysis/normalization.json', workers=1, lexicon_path=None,
+         min_confidence=None, exports=()):
     """This function takes the claim data nd parses the claim description to create two different dataframes where nouns and verbs are mapped with different colours to store the results in the local system. These files are further used to create R shiny dashboard for the 		interactive visualisation
 
 	Parameters
@@ -46,6 +65,24 @@ def main(input_merged_path, color_path, output_path):
 		A file path for the list of colors.
 	output_path
 		 A file path to store the verb colour dataframe.
+	batch_size
+		The number of claim descriptions in a spaCy batch.
+	n_process
+		The number of processes spaCy uses to tag the descriptions.
+	cache_dir
+		A directory for the caches kept between runs.
+	incremental
+		If True, the parsed claims are kept in a store and only the new or changed descriptions are parsed.
+	normalization_path
+		A file path for the typo and colour mapping tables.
+	workers
+		The number of processes that parse shards of the claims.
+	lexicon_path
+		A file path for a lexicon of `fast_tagger.py`, None tags all the claims with spaCy.
+	min_confidence
+		The minimum confidence of a fuzzy match of a rare impacted object or chosen verb, None turns the fuzzy matching off.
+	exports
+		The extensions of other formats to write the dataframes in too, e.g. ['xlsx'] for the dashboard.
 
 	Returns
 	----------
@@ -54,329 +91,87 @@ def main(input_merged_path, color_path, output_path):
 	"""
 
 
-    mid_df = pd.read_excel(input_merged_path)
+    mapping = load_mapping(normalization_path)
+    mid_df = read_table(input_merged_path)
     mid_df = mid_df.dropna(subset=['claim_desc', 'lat', 'long'])
-    # loading model of spacy
-    nlp = spacy.load("en_core_web_sm")
-    # loading all the stopwords
-    all_stopwords = nlp.Defaults.stop_words
-    list_of_list = list()
-
-    # for sentence in test['Claim_Desc']:
-    for row in range(len(mid_df)):
-        sentence = mid_df.iloc[row, 6]  # claim_dec
-        occurrence_id = mid_df.iloc[row, 0]  # getting id for merging later
-        loss_date_x = mid_df.iloc[row, 7]
-        bus_category = mid_df.iloc[row, 19]
-        bus_no_x = mid_df.iloc[row, 16]
-        asset_manufacturer = mid_df.iloc[row, 42]
-        lat = mid_df.iloc[row, 47]
-        long = mid_df.iloc[row, 48]
-
-        # declaring list of differrent pos tags
-
-        intermediate_list = list()
-        pos_list = list()
-        noun_list = list()
-        description_list = list()
-        preposition_list = list()
-        verb_list = list()
-        adjective_list = list()
-        # Removing the digits from the claim descriptions
-        sentence = sentence.strip().lower()
-        sentence = ''.join([i for i in sentence if not i.isdigit()])
-        sentence = sentence.replace('- NO DMG', ' ')
-        sentence = sentence.replace('-', ' ')
-
-        text = nltk.word_tokenize(sentence)
-
-        # Removing stopwords
-
-        text_without_sw = [word for word in text if (
-            not word in all_stopwords or not word.isdigit())]
-        result = ' '.join(text_without_sw)
-        spacy_ready_text = nlp(result)
-
-        # POS tagging
-        for token in spacy_ready_text:
-            pos_list.append(token.pos_)
-            if (token.pos_ == 'NOUN' or token.pos_ == 'PROPN') and len(token) > 2:
-                noun_list.append(str(token.lemma_))
-                # print(token.lemma_)
-            elif token.pos_ == 'VERB' and len(token) > 2:
-                # print(token.lemma_)
-                verb_list.append(str(token.lemma_))
-            elif token.pos_ == 'PROPN' and len(token) > 2:
-                # print(token.lemma_)
-                preposition_list.append(str(token.lemma_))
-
-        tag = 'unknown'
-        chosen_verb_list = list()
-        if verb_list == [] and preposition_list != []:
-            for w in preposition_list:
-                syns = wordnet.synsets(w)
-                if syns:
-                    if syns[0].lexname().split('.')[0] == 'verb':
-                        chosen_verb_list.append(w)
-                    else:
-                        continue
-        if chosen_verb_list == []:
-            chosen_verb_list = preposition_list
-
-        elif preposition_list == [] and verb_list != []:
-            for w in verb_list:
-                syns = wordnet.synsets(w)
-                if syns:
-                    if syns[0].lexname().split('.')[0] == 'verb':
-                        chosen_verb_list.append(w)
-                    else:
-                        continue
-        if chosen_verb_list == []:
-            chosen_verb_list = verb_list
-
-        elif verb_list == [] and preposition_list == []:
-            for w in noun_list:
-                syns = wordnet.synsets(w)
-                if syns:
-                    if syns[0].lexname().split('.')[0] == 'verb' or syns[0].lexname().split('.')[0] == 'adj':
-                        chosen_verb_list.append(w)
-                    elif w == 'HIT':
-                        chosen_verb_list.append(w)
-                    else:
-                        continue
-
+    # loading model of spacy, only with the components needed for POS tags and lemmas
+    if lexicon_path is None:
+        nlp = load_nlp()
+        # loading all the stopwords
+        all_stopwords = nlp.Defaults.stop_words
+    else:
+        # the spaCy model is only loaded if a claim has a token that is not in the lexicon
+        nlp = FastTagger.from_file(lexicon_path)
+        all_stopwords = nlp.stop_words
+
+    descriptions = mid_df.iloc[:, 6]  # claim_dec
+    cleaned = [clean_description(sentence, all_stopwords) for sentence in descriptions]
+
+    # WordNet categories of the words seen in the previous runs
+    lexnames = LexnameCache(os.path.join(cache_dir, 'lexnames.json'))
+
+    texts = [result for _, result in cleaned]
+
+    def parse(texts, docs=None):
+        if workers > 1:
+            return parse_sharded(texts, lexnames, workers, batch_size=batch_size, lexicon_path=lexicon_path,
+                                 docs=docs)
+        return parse_descriptions(texts, nlp, lexnames, batch_size=batch_size, n_process=n_process, docs=docs)
+
+    t = time.time()
+    if incremental:
+        # the parsed claims of the previous runs, keyed by the cleaned description, the pipeline version
+        # and the tagger of each claim, so the results of the lexicon and of spaCy are never mixed up
+        if lexicon_path is None:
+            taggers, docs = [model_version()] * len(texts), None
         else:
-            for w in verb_list:
-                syns = wordnet.synsets(w)
-                if syns:
-                    if syns[0].lexname().split('.')[0] == 'verb':
-                        chosen_verb_list.append(w)
-                    else:
-                        continue
-
-        if chosen_verb_list == [] and verb_list != []:
-            chosen_verb_list = verb_list
-
-        elif chosen_verb_list == [] and preposition_list != []:
-            chosen_verb_list = preposition_list
-
-        impact_list = []
-        if noun_list:
-            last_noun = noun_list[-1]
-            if len(last_noun) > 2:
-                syns = wordnet.synsets(last_noun)
-                if syns:
-                    if syns[0].lexname().split('.')[0] == 'noun':
-                        impact_list.append(last_noun)
-                    else:
-                        continue
-
-        intermediate_list.extend([sentence, pos_list, preposition_list, verb_list, chosen_verb_list, pos_list,
-                                    noun_list, impact_list, occurrence_id, loss_date_x, bus_category, bus_no_x, asset_manufacturer, lat, long])
-        list_of_list.append(intermediate_list)
-
-        
-    pos_df = pd.DataFrame(list_of_list, columns=['Description', 'POS', 'preposition', 'verb', 'chosen_verb', 'pos', 'noun', 'impact', 'occurrence_id',\
-                                                 'loss_date_x', 'bus_category', 'bus_no_x', 'asset_manufacturer', 'latt', 'long'])
-
-    pos_df['impact'] = pos_df['impact'].apply(','.join).str.lower()
-    pos_df['chosen_verb'] = pos_df['chosen_verb'].apply(','.join).str.lower()
-
-    pos_df['impact'] = pos_df['impact'].replace(
-        ['rr', 'rf', 'rl', 'lf', 'rd', 'rs', 's', 'l', 'ls'], 'side of the vehicle', regex=False)
-
-    pos_df['impact'] = pos_df['impact'].replace(['dmgd', 'dmged', 'damae', 'damage',
-                                                 'damaging', 'damdage', 'damge', 'dmge'], 'damaged', regex=False)
-
-    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(['dmgd', 'dmged', 'damae', 'damage',
-                                                           'damaging', 'damdage', 'damge', 'dmge'], 'damaged', regex=False)
-    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(
-        ['bone', 'boned'], 'T-bone', regex=False)
-
-    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(['colledid', 'collide',
-                                                           'colliede', 'colly'], 'collide', regex=False)
-
-    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(
-        ['block', 'blockie'], 'block', regex=False)
-    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(
-        ['brake', 'braked'], 'brake', regex=False)
-    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(
-        ['cause', 'causge'], 'cause', regex=False)
-
-    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(
-        ['end', 'endde', 'ene'], 'end', regex=False)
-
-    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(
-        ['force', 'forcing'], 'force', regex=False)
-    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(
-        ['reaende', 'rear', 'rearedne', 'rearend', 'rearende', 'rearenede'], 'hit 	rearend', regex=False)
-    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(
-        ['scapre', 'scrap', 'scrape', 'rsscrape'], 'scrape', regex=False)
-    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(
-        ['incur', 'injure', 'injurie'], 'injure', regex=False)
-    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(
-        ['swerve', 'swerved'], 'swerve', regex=False)
-    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(
-        ['slidde', 'slide'], 'slide', regex=False)
-    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(
-        ['sqeeze', 'squeese', 'squeeze'], 'squeeze', regex=False)
-    pos_df['impact'] = pos_df['impact'].replace(
-        ['veh'], 'vehicle', regex=False)
-    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(
-        ['veh'], 'vehicle', regex=False)
-    pos_df['impact'] = pos_df['impact'].replace(
-        ['tp'], 'Third party', regex=False)
-    lst = ["BUS", "BUS", "TROLLEY", "POLES", "CUT", "TROLLEY", "ROPE"]
-    checker_verb = dict()
-    for i in pos_df['chosen_verb']:
-        if ',' in i:
-            action_list = i.split(',')
-            for word in action_list:
-
-                if word.lower() not in checker_verb:
-                    checker_verb[word.lower()] = 1
-                else:
-                    checker_verb[word.lower()] += 1
-        else:
-            if i.lower() not in checker_verb:
-                checker_verb[i.lower()] = 1
-            else:
-                checker_verb[i.lower()] += 1
-
-    checker = dict()
-    for i in pos_df['impact']:
-        if i.lower() not in checker:
-            checker[i.lower()] = 1
-        else:
-            checker[i.lower()] += 1
-    Impacted_object_df = pd.DataFrame(checker.items(), columns=[
-                                      'Impacted Object', 'Count']).sort_values(by='Count', ascending=False)
-    Verbs_df = pd.DataFrame(checker.items(), columns=[
-                            'Verbs', 'Count']).sort_values(by='Count', ascending=False)
-    less_frequent_impact_objects = Impacted_object_df['Impacted Object'][Impacted_object_df['Count'] < 5]
-    less_frequent_verbs = Verbs_df['Verbs'][Verbs_df['Count'] < 5]
-    effective_impact = pos_df[~pos_df['impact'].isin(
-        less_frequent_impact_objects)]
+            # the claims are tagged once, the tags of the new ones are parsed below
+            taggers, docs = nlp.tag_all(texts)
+        with ClaimStore(os.path.join(cache_dir, 'claims.jsonl'), PIPELINE_VERSION) as claim_store:
+            keys, missing = claim_store.split(texts, taggers)
+            missing_docs = None
+            if docs is not None:
+                doc_of_key = dict(zip(keys, docs))
+                missing_docs = [doc_of_key[key] for key in missing]
+                del doc_of_key, docs
+            new_claims = parse(list(missing.values()), missing_docs)
+            for key, parsed in zip(missing, new_claims):
+                claim_store.add(key, parsed)
+            parsed_claims = [claim_store.get(key) for key in keys]
+        print("Claim store entries:{entries} Hits:{hits} Misses:{misses} HitRatio:{hit_ratio:.2%}".format(**claim_store.stats()))
+    else:
+        new_claims = parsed_claims = parse(texts)
+    elapsed_time = time.time() - t
+    print("Parsed %d claims in %.2f s (%.1f claims/s)" % (len(new_claims), elapsed_time,
+                                                          len(new_claims) / elapsed_time if elapsed_time else 0.0))
+    lexnames.save()
+    if lexicon_path is not None and workers == 1:
+        print("Fast tagger claims:{fast_claims} spaCy claims:{fallback_claims} FastRatio:{fast_ratio:.2%}".format(**nlp.stats()))
+    print("Lexname cache entries:{entries} Hits:{hits} Misses:{misses} HitRatio:{hit_ratio:.2%}".format(**lexnames.stats()))
+
+    # occurrence id for merging later, loss_date_x, bus_category, bus_no_x, asset_manufacturer, lat, long
+    kept = [i for i, parsed in enumerate(parsed_claims) if parsed is not None]
+    claims_df = mid_df.iloc[kept, [0, 7, 19, 16, 42, 47, 48]].reset_index(drop=True)
+    claims_df.columns = ['occurrence_id', 'loss_date_x', 'bus_category', 'bus_no_x', 'asset_manufacturer', 'latt', 'long']
+    claims_df.insert(0, 'Description', [cleaned[i][0] for i in kept])
+    # the lists of the claims as integer codes over one vocabulary
+    token_store = TokenStore.from_parsed([parsed_claims[i] for i in kept])
 
     list_of_colour = pd.read_json(color_path)[['name']]
-    effective_impact_len = len(effective_impact)
-    effective_impact['claim_id'] = np.arange(1, effective_impact_len+1, 1)
-    intermediate_df = (effective_impact[['claim_id', 'chosen_verb']].set_index(['claim_id'])
-                       .apply(lambda x: x.str.split(',').explode()).reset_index()
-
-                       )
-    exploded_verb_df = pd.merge(
-        intermediate_df, effective_impact, on='claim_id')
-
-    effective_verb = exploded_verb_df[~exploded_verb_df['chosen_verb_x'].isin(
-        less_frequent_verbs)]
-
-    checker_verb = dict()
-    for i in effective_verb['chosen_verb_x']:
-        if i.lower() not in checker_verb:
-            checker_verb[i.lower()] = 1
-        else:
-            checker_verb[i.lower()] += 1
-    effective_verbs_df = pd.DataFrame(checker_verb.items(), columns=[
-                                      'Verbs', 'Count']).sort_values(by='Count', ascending=False)
-
-    less_occuring_verbs = effective_verbs_df['Verbs'][effective_verbs_df['Count'] < 3]
-
-    updated_verb = effective_verb[~effective_verb['chosen_verb_x'].isin(
-        less_occuring_verbs)]
-
-    impact_list = list(np.unique(effective_impact['impact']))
-    impact_colour = list()
-    for i in effective_impact['impact']:
-        impact_colour.append(list_of_colour.iloc[impact_list.index(i)]['name'])
-
-    verb_list = list(np.unique(updated_verb['chosen_verb_x']))
-    verb_colour = list()
-    for i in updated_verb['chosen_verb_x']:
-        verb_colour.append(list_of_colour.iloc[verb_list.index(i)]['name'])
-
-    effective_impact['impact_colour'] = impact_colour
-    updated_verb['verb_colour'] = verb_colour
-
-    result_df = effective_impact
-    result_verb_df = updated_verb
-
-    # replacing colours in the dataframe with nouns
-    result_df = result_df.replace('Silver', 'skyblue')
-    result_df = result_df.replace('Aqua', 'Pink')
-    result_df = result_df.replace('Fuchsia', 'Red')
-    result_df = result_df.replace('Lime', 'peachpuff')
-    result_df = result_df.replace('Olive', 'orange')
-    result_df = result_df.replace('Teal', 'yellowgreen')
-    result_df = result_df.replace('SpringGreen3', 'SpringGreen')
-    result_df = result_df.replace('Cyan3', 'Cyan')
-    result_df = result_df.replace('DodgerBlue3', 'DodgerBlue')
-    result_df = result_df.replace('DodgerBlue1', 'darkmagenta')
-    result_df = result_df.replace('DodgerBlue2', 'gold')
-    result_df = result_df.replace('DeepSkyBlue1', 'firebrick')
-    result_df = result_df.replace('DeepSkyBlue2', 'DeepSkyBlue')
-    result_df = result_df.replace('DeepSkyBlue3', 'thistle')
-    result_df = result_df.replace('DeepSkyBlue4', 'tan')
-    result_df = result_df.replace('Green1', 'forestgreen')
-    result_df = result_df.replace('Green3', 'Green')
-    result_df = result_df.replace('Green4', 'plum')
-    result_df = result_df.replace('Turquoise3', 'rosybrown')
-    result_df = result_df.replace('Turquoise4', 'royalblue')
-    result_df = result_df.replace('Turquoise2', 'darkorange')
-    result_df = result_df.replace('SpringGreen2', 'darksalmon')
-    result_df = result_df.replace('SpringGreen1', 'darkgoldenrod')
-    result_df = result_df.replace('DeepPink4', 'darkkhaki')
-    result_df = result_df.replace('Blue3', 'chocolate')
-    result_df = result_df.replace('Blue1', 'darkorchid')
-    result_df = result_df.replace('violetred', 'blue')
-    result_df = result_df.replace('SlateBlue3', 'limegreen')
-    result_df = result_df.replace('burgundy', 'rosybrown')
-    result_df = result_df.replace('SkyBlue2', 'sienna')
-    result_df = result_df.replace('MediumPurple3', 'seagreen')
-    result_df = result_df.replace('DarkOliveGreen3', 'sandybrown')
-    result_df = result_df.replace('White', 'magenta')
-    # replacing colours in the verb dataframe
-    result_verb_df = result_verb_df.replace('Silver', 'skyblue')
-    result_verb_df = result_verb_df.replace('Aqua', 'Pink')
-    result_verb_df = result_verb_df.replace('Fuchsia', 'Red')
-    result_verb_df = result_verb_df.replace('Lime', 'peachpuff')
-    result_verb_df = result_verb_df.replace('Olive', 'orange')
-    result_verb_df = result_verb_df.replace('Teal', 'yellowgreen')
-    result_verb_df = result_verb_df.replace('SpringGreen3', 'SpringGreen')
-    result_verb_df = result_verb_df.replace('Cyan3', 'Cyan')
-    result_verb_df = result_verb_df.replace('DodgerBlue3', 'DodgerBlue')
-    result_verb_df = result_verb_df.replace('DodgerBlue1', 'darkmagenta')
-    result_verb_df = result_verb_df.replace('DodgerBlue2', 'gold')
-    result_verb_df = result_verb_df.replace('DeepSkyBlue1', 'firebrick')
-    result_verb_df = result_verb_df.replace('DeepSkyBlue2', 'DeepSkyBlue')
-    result_verb_df = result_verb_df.replace('DeepSkyBlue3', 'thistle')
-    result_verb_df = result_verb_df.replace('DeepSkyBlue4', 'tan')
-    result_verb_df = result_verb_df.replace('Green1', 'forestgreen')
-    result_verb_df = result_verb_df.replace('Green3', 'Green')
-    result_verb_df = result_verb_df.replace('Green4', 'plum')
-    result_verb_df = result_verb_df.replace('Turquoise3', 'rosybrown')
-    result_verb_df = result_verb_df.replace('Turquoise4', 'royalblue')
-    result_verb_df = result_verb_df.replace('Turquoise2', 'darkorange')
-    result_verb_df = result_verb_df.replace('SpringGreen2', 'darksalmon')
-    result_verb_df = result_verb_df.replace('SpringGreen1', 'darkgoldenrod')
-    result_verb_df = result_verb_df.replace('DeepPink4', 'darkkhaki')
-    result_verb_df = result_verb_df.replace('Blue3', 'chocolate')
-    result_verb_df = result_verb_df.replace('Blue1', 'darkorchid')
-    result_verb_df = result_verb_df.replace('violetred', 'blue')
-    result_verb_df = result_verb_df.replace('SlateBlue3', 'limegreen')
-    result_verb_df = result_verb_df.replace('burgundy', 'rosybrown')
-    result_verb_df = result_verb_df.replace('SkyBlue2', 'sienna')
-    result_verb_df = result_verb_df.replace('MediumPurple3', 'seagreen')
-    result_verb_df = result_verb_df.replace('DarkOliveGreen3', 'sandybrown')
-    result_verb_df = result_verb_df.replace('White', 'magenta')
+    # the colours are replaced by the display colours of the dashboard
+    palette = list(normalize(list_of_colour['name'], mapping['colours']))
+    result_df, result_verb_df = aggregate(claims_df, token_store, mapping['typos'], palette,
+                                          min_confidence=min_confidence)
 
-    if not os.path.exists(output_path):
-        os.makedirs(output_path)
     # saving the data with colours for unique nouns
-    result_df.to_excel(output_path + '/claim_colour_df.xlsx', index=False)
+    write_table(result_df, output_path + '/claim_colour_df.parquet', exports=exports)
     # saving the data with colours for unique verbs
-    result_verb_df.to_excel(output_path + '/verb_colour_df.xlsx', index=False)
+    write_table(result_verb_df, output_path + '/verb_colour_df.parquet', exports=exports)
 
 
 if __name__ == "__main__":
-    main(opt['--input_merged_path'], opt['--color_path'], opt['--output_path'])
+    main(opt['--input_merged_path'], opt['--color_path'], opt['--output_path'],
+         int(opt['--batch_size']), int(opt['--n_process']), opt['--cache_dir'],
+         opt['--incremental'], opt['--normalization_path'], int(opt['--workers']),
+         opt['--lexicon_path'], float(opt['--min_confidence']) if opt['--min_confidence'] else None,
+         opt['--export'].split(',') if opt['--export'] else ())
@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Parsing of the claim descriptions for `claim_description.py`. The descriptions
+are cleaned, tagged with spaCy in batches with `nlp.pipe` and the nouns, verbs,
+chosen verbs and the impacted object of each claim are extracted from the tags.
+"""
+
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+import nltk
+import spacy
+from lexname_cache import LexnameCache
+
+# only the tagger and the lemmatizer are needed for the POS and lemma logic
+DISABLED_COMPONENTS = ["parser", "ner"]
+# the version of the parsing logic, it has to be changed when the output of
+# `parse_tokens` changes so the incremental mode parses the stored claims again
+PIPELINE_VERSION = "1"
+
+
+def model_version(model="en_core_web_sm"):
+    """
+    It returns the identity of a spaCy model for the claim store of the
+    incremental mode: its name, the version of its package and of spaCy.
+    """
+    get_package_version = getattr(spacy.util, 'get_package_version', lambda name: None)
+    return "spacy:{0}-{1}:{2}".format(model, get_package_version(model), spacy.__version__)
+
+
+def load_nlp(model="en_core_web_sm"):
+    """
+    It loads the spaCy model without the components that the claim parsing doesn't use.
+    """
+    return spacy.load(model, disable=DISABLED_COMPONENTS)
+
+
+def clean_description(sentence, all_stopwords):
+    """
+    It lowercases the claim description, removes the digits and the dashes and
+    the stopwords to prepare it for spaCy.
+
+    Parameters
+    -----------
+    sentence
+        The claim description.
+    all_stopwords
+        The stopwords of the spaCy model.
+
+    Returns
+    ----------
+    sentence
+        The cleaned claim description.
+    result
+        The text that is given to spaCy.
+    """
+    # Removing the digits from the claim descriptions
+    sentence = sentence.strip().lower()
+    sentence = ''.join([i for i in sentence if not i.isdigit()])
+    sentence = sentence.replace('- NO DMG', ' ')
+    sentence = sentence.replace('-', ' ')
+
+    text = nltk.word_tokenize(sentence)
+
+    # Removing stopwords
+
+    text_without_sw = [word for word in text if (
+        not word in all_stopwords or not word.isdigit())]
+    result = ' '.join(text_without_sw)
+    return sentence, result
+
+
+def choose_verbs(noun_list, verb_list, preposition_list, lexnames):
+    """
+    It chooses the verbs that describe the action of the claim. `lexnames` is the
+    LexnameCache for the WordNet categories.
+    """
+    chosen_verb_list = list()
+    if verb_list == [] and preposition_list != []:
+        for w in preposition_list:
+            if lexnames.lookup(w) == 'verb':
+                chosen_verb_list.append(w)
+    if chosen_verb_list == []:
+        chosen_verb_list = preposition_list
+
+    elif preposition_list == [] and verb_list != []:
+        for w in verb_list:
+            if lexnames.lookup(w) == 'verb':
+                chosen_verb_list.append(w)
+    if chosen_verb_list == []:
+        chosen_verb_list = verb_list
+
+    elif verb_list == [] and preposition_list == []:
+        for w in noun_list:
+            category = lexnames.lookup(w)
+            if category is not None:
+                if category == 'verb' or category == 'adj':
+                    chosen_verb_list.append(w)
+                elif w == 'HIT':
+                    chosen_verb_list.append(w)
+
+    else:
+        for w in verb_list:
+            if lexnames.lookup(w) == 'verb':
+                chosen_verb_list.append(w)
+
+    if chosen_verb_list == [] and verb_list != []:
+        chosen_verb_list = verb_list
+
+    elif chosen_verb_list == [] and preposition_list != []:
+        chosen_verb_list = preposition_list
+    return chosen_verb_list
+
+
+def parse_tokens(tokens, lexnames):
+    """
+    It parses the tagged tokens of a claim description.
+
+    Parameters
+    -----------
+    tokens
+        The tokens of the description with `pos_` and `lemma_` attributes, e.g. a spaCy Doc.
+    lexnames
+        The LexnameCache for the WordNet categories.
+
+    Returns
+    ----------
+    parsed
+        A list of the POS tags, prepositions, verbs, chosen verbs, nouns and the
+        impacted object of the claim, or None if the claim is left out because its
+        last noun is not a noun in WordNet.
+    """
+    pos_list = list()
+    noun_list = list()
+    preposition_list = list()
+    verb_list = list()
+
+    # POS tagging
+    for token in tokens:
+        pos_list.append(token.pos_)
+        if (token.pos_ == 'NOUN' or token.pos_ == 'PROPN') and len(token) > 2:
+            noun_list.append(str(token.lemma_))
+        elif token.pos_ == 'VERB' and len(token) > 2:
+            verb_list.append(str(token.lemma_))
+        elif token.pos_ == 'PROPN' and len(token) > 2:
+            preposition_list.append(str(token.lemma_))
+
+    chosen_verb_list = choose_verbs(noun_list, verb_list, preposition_list, lexnames)
+
+    impact_list = []
+    if noun_list:
+        last_noun = noun_list[-1]
+        if len(last_noun) > 2:
+            category = lexnames.lookup(last_noun)
+            if category is not None:
+                if category == 'noun':
+                    impact_list.append(last_noun)
+                else:
+                    return None
+
+    return [pos_list, preposition_list, verb_list, chosen_verb_list, noun_list, impact_list]
+
+
+def parse_descriptions(texts, nlp, lexnames, batch_size=256, n_process=1, docs=None):
+    """
+    It tags the cleaned descriptions with `nlp.pipe` and parses them.
+
+    Parameters
+    -----------
+    texts
+        The cleaned descriptions.
+    nlp
+        The spaCy model.
+    lexnames
+        The LexnameCache for the WordNet categories.
+    batch_size
+        The number of descriptions in a spaCy batch.
+    n_process
+        The number of processes of `nlp.pipe`.
+    docs
+        The docs of `FastTagger.tag_all` for the texts, so a `FastTagger` doesn't tag them
+        again, None to tag them all in `nlp.pipe`.
+
+    Returns
+    ----------
+    parsed
+        The parsed claims in the order of the texts, see `parse_tokens`.
+    """
+    pipe_options = {} if docs is None else {'docs': docs}
+    return [parse_tokens(doc, lexnames)
+            for doc in nlp.pipe(texts, batch_size=batch_size, n_process=n_process, **pipe_options)]
+
+
+# the model and the lexname cache of a worker process of `parse_sharded`
+_worker_nlp = None
+_worker_lexnames = None
+
+
+def _init_worker(model, lexname_table, lexicon_path):
+    global _worker_nlp, _worker_lexnames
+    if lexicon_path is None:
+        _worker_nlp = load_nlp(model)
+    else:
+        from fast_tagger import FastTagger
+        _worker_nlp = FastTagger.from_file(lexicon_path)
+    _worker_lexnames = LexnameCache()
+    _worker_lexnames.update(lexname_table)
+
+
+def _parse_shard(args):
+    shard_id, texts, docs, batch_size = args
+    hits, misses = _worker_lexnames.hits, _worker_lexnames.misses
+    t = time.time()
+    parsed = parse_descriptions(texts, _worker_nlp, _worker_lexnames, batch_size=batch_size, docs=docs)
+    return (shard_id, parsed, time.time() - t, _worker_lexnames.table(),
+            _worker_lexnames.hits - hits, _worker_lexnames.misses - misses)
+
+
+def parse_sharded(texts, lexnames, workers, batch_size=256, shard_size=None, model="en_core_web_sm",
+                  lexicon_path=None, docs=None):
+    """
+    It splits the cleaned descriptions in shards and parses them in a pool of
+    processes, each one with its own copy of the spaCy model.
+
+    Parameters
+    -----------
+    texts
+        The cleaned descriptions.
+    lexnames
+        The LexnameCache for the WordNet categories, the workers start from its
+        table and the words they look up are added back to it.
+    workers
+        The number of processes.
+    batch_size
+        The number of descriptions in a spaCy batch.
+    shard_size
+        The number of descriptions in a shard, by default there are 4 shards per worker.
+    model
+        The name of the spaCy model.
+    lexicon_path
+        A file path for a lexicon of `fast_tagger.py` the workers tag the claims with, None uses the spaCy model.
+    docs
+        The docs of `FastTagger.tag_all` for the texts with a lexicon, so the workers don't tag them again.
+
+    Returns
+    ----------
+    parsed
+        The parsed claims in the order of the texts, see `parse_tokens`.
+    """
+    if not texts:
+        return []
+    if shard_size is None:
+        shard_size = math.ceil(len(texts) / (4 * workers))
+    shards = [(shard_id, texts[start:start + shard_size], None if docs is None else docs[start:start + shard_size],
+               batch_size)
+              for shard_id, start in enumerate(range(0, len(texts), shard_size))]
+    parsed = []
+    t = time.time()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model, lexnames.table(), lexicon_path)) as executor:
+        # map gives the shards back in their order
+        for shard_id, shard_parsed, elapsed_time, lexname_table, hits, misses in executor.map(_parse_shard, shards):
+            print("Shard %d: %d claims in %.2f s (%.1f claims/s)" % (shard_id, len(shard_parsed), elapsed_time,
+                                                                     len(shard_parsed) / elapsed_time if elapsed_time else 0.0))
+            parsed.extend(shard_parsed)
+            lexnames.update(lexname_table)
+            lexnames.hits += hits
+            lexnames.misses += misses
+    elapsed_time = time.time() - t
+    print("%d workers: %d claims in %.2f s (%.1f claims/s)" % (workers, len(parsed), elapsed_time,
+                                                               len(parsed) / elapsed_time if elapsed_time else 0.0))
+    return parsed
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+A store of the parsed claim descriptions for the incremental mode of
+`claim_description.py`. The output of `parse_tokens` of each description is
+kept under a hash of the cleaned description, the parsing pipeline version and
+the tagger that tagged it, the lexicon of `fast_tagger.py` or a spaCy model, in
+an append-only JSON lines file. A rerun only parses the descriptions that are
+new or changed since the previous runs, or that another tagger would tag.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+
+def claim_key(text, pipeline_version, tagger=None):
+    """
+    It returns the key of a cleaned description for a version of the parsing pipeline and a tagger.
+    """
+    return hashlib.sha1('{0}\0{1}\0{2}'.format(pipeline_version, tagger or '', text).encode('utf-8')).hexdigest()
+
+
+class ClaimStore:
+    """
+    An append-only store of key -> parsed claim.
+
+    Parameters:
+    file_path (str): The path of the store file.
+    pipeline_version (str): The version of the parsing pipeline, the entries of other versions are not used.
+    """
+
+    def __init__(self, file_path, pipeline_version):
+        self.file_path = file_path
+        self.pipeline_version = pipeline_version
+        self.hits = 0
+        self.misses = 0
+        self._parsed = {}
+        self._file = None
+        if os.path.exists(file_path):
+            with open(file_path) as store_file:
+                for line in store_file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # a torn last line of an interrupted run
+                        continue
+                    self._parsed[record['key']] = record['parsed']
+
+    def __len__(self):
+        return len(self._parsed)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def split(self, texts, taggers=None):
+        """
+        It looks up the cleaned descriptions in the store.
+
+        Parameters:
+        texts (list): The cleaned descriptions.
+        taggers (list): The identity of the tagger of each description, see
+        `FastTagger.tag_all` and `claim_parser.model_version`.
+
+        Returns:
+        keys (list): The key of each description.
+        missing (dict): The key -> description of the distinct descriptions that have to be parsed.
+        """
+        if taggers is None:
+            taggers = [None] * len(texts)
+        keys = [claim_key(text, self.pipeline_version, tagger) for text, tagger in zip(texts, taggers)]
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key in self._parsed:
+                self.hits += 1
+            else:
+                self.misses += 1
+                missing.setdefault(key, text)
+        return keys, missing
+
+    def get(self, key):
+        return self._parsed[key]
+
+    def add(self, key, parsed):
+        """
+        It appends a parsed claim, None for a claim that is left out, to the store.
+        """
+        if self._file is None:
+            Path(os.path.dirname(self.file_path) or '.').mkdir(parents=True, exist_ok=True)
+            self._file = open(self.file_path, 'a')
+            # a torn line of an interrupted run must not swallow the first new record
+            if self._file.tell() > 0:
+                self._file.write('\n')
+        self._parsed[key] = parsed
+        self._file.write(json.dumps({'key': key, 'parsed': parsed}) + '\n')
+
+    def close(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def stats(self):
+        """
+        It returns the hit and miss counters of the store.
+        """
+        lookups = self.hits + self.misses
+        return {'entries': len(self._parsed), 'hits': self.hits, 'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0}
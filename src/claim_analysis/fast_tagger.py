@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This script distills a lexicon of POS tags and lemmas from the spaCy model on
+the historical claim descriptions and reports how often the fast tagger agrees
+with spaCy on held out claims. The module also provides `FastTagger`, a drop-in
+for the spaCy model in `claim_parser.parse_descriptions` that tags a claim from
+the lexicon when all of its tokens are in it and falls back to the spaCy model
+for the whole claim otherwise.
+
+Usage: fast_tagger.py --input_merged_path=<input_merged_path> --lexicon_path=<lexicon_path> [--holdout=<holdout>] [--min_agreement=<min_agreement>] [--seed=<seed>]
+
+Options:
+--input_merged_path=<input_merged_path>  A file path for merged data.
+--lexicon_path=<lexicon_path>  A file path to store the lexicon.
+--holdout=<holdout>  The fraction of the claims that is held out for the agreement report [default: 0.2].
+--min_agreement=<min_agreement>  The tokens whose most common tag and lemma cover a smaller fraction of their occurrences are left to spaCy [default: 0.95].
+--seed=<seed>  The random seed of the holdout split [default: 123].
+
+Example:
+python src/claim_analysis/fast_tagger.py \
+--input_merged_path "results/claim_analysis/data/merged_collision.parquet" \
+--lexicon_path "results/claim_analysis/cache/lexicon.json"
+"""
+
+import hashlib
+import json
+import os
+import random
+import sys
+from collections import Counter, defaultdict
+from pathlib import Path
+from docopt import docopt
+import spacy
+from claim_parser import load_nlp, model_version, clean_description, parse_tokens
+from lexname_cache import LexnameCache
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.artifact_io import read_table
+
+
+class TaggedToken:
+    """
+    A token with the attributes of a spaCy token that `parse_tokens` uses.
+    """
+    __slots__ = ('text', 'pos_', 'lemma_')
+
+    def __init__(self, text, pos_, lemma_):
+        self.text = text
+        self.pos_ = pos_
+        self.lemma_ = lemma_
+
+    def __len__(self):
+        return len(self.text)
+
+
+def distill_lexicon(texts, nlp, min_agreement=0.95, batch_size=256):
+    """
+    It tags the cleaned descriptions with spaCy and keeps the most common POS
+    tag and lemma of each token.
+
+    Parameters:
+    texts (list): The cleaned descriptions.
+    nlp: The spaCy model.
+    min_agreement (float): The tokens whose most common tag and lemma cover a smaller
+    fraction of their occurrences depend on their context and are left out.
+    batch_size (int): The number of descriptions in a spaCy batch.
+
+    Returns:
+    lexicon (dict): A dictionary of token -> [POS tag, lemma].
+    """
+    tags = defaultdict(Counter)
+    for doc in nlp.pipe(texts, batch_size=batch_size):
+        for token in doc:
+            tags[token.text][(token.pos_, token.lemma_)] += 1
+    lexicon = {}
+    for text, counts in tags.items():
+        (pos, lemma), count = counts.most_common(1)[0]
+        if count / sum(counts.values()) >= min_agreement:
+            lexicon[text] = [pos, lemma]
+    return lexicon
+
+
+def save_lexicon(lexicon, stop_words, lexicon_path, model="en_core_web_sm"):
+    """
+    It writes the lexicon, the stopwords and the name of the spaCy model to a JSON file.
+    """
+    Path(os.path.dirname(lexicon_path) or '.').mkdir(parents=True, exist_ok=True)
+    with open(lexicon_path, 'w') as lexicon_file:
+        json.dump({'model': model, 'stop_words': sorted(stop_words), 'tokens': lexicon}, lexicon_file)
+
+
+class FastTagger:
+    """
+    A tagger with the `pipe` interface of a spaCy model that looks the tokens up
+    in a lexicon. The claims with a token that is not in the lexicon are tagged
+    by the spaCy model, which is only loaded when the first such claim shows up.
+
+    Parameters:
+    lexicon (dict): A dictionary of token -> [POS tag, lemma], see `distill_lexicon`.
+    stop_words (set): The stopwords of the spaCy model.
+    model (str): The name of the spaCy model of the fallback.
+    """
+
+    def __init__(self, lexicon, stop_words=(), model="en_core_web_sm"):
+        self.model = model
+        self.stop_words = set(stop_words)
+        self.fast_claims = 0
+        self.fallback_claims = 0
+        # the tokenizer of a blank English pipeline splits the text like the model does
+        self.tokenizer = spacy.blank("en").tokenizer
+        self._nlp = None
+        self._lexicon = {sys.intern(text): (sys.intern(pos), lemma) for text, (pos, lemma) in lexicon.items()}
+        # the identity of the lexicon and of the fallback model for the claim store
+        content = json.dumps({'stop_words': sorted(self.stop_words), 'tokens': lexicon}, sort_keys=True)
+        self.version = "lexicon:" + hashlib.sha1(content.encode('utf-8')).hexdigest()
+        self.fallback_version = model_version(model)
+
+    @classmethod
+    def from_file(cls, lexicon_path):
+        with open(lexicon_path) as lexicon_file:
+            lexicon = json.load(lexicon_file)
+        return cls(lexicon['tokens'], lexicon['stop_words'], lexicon['model'])
+
+    def __len__(self):
+        return len(self._lexicon)
+
+    @property
+    def nlp(self):
+        if self._nlp is None:
+            self._nlp = load_nlp(self.model)
+        return self._nlp
+
+    def tag(self, text):
+        """
+        It tags a cleaned description from the lexicon or returns None if one of its tokens is not in it.
+        """
+        tokens = []
+        for token in self.tokenizer(text):
+            entry = self._lexicon.get(token.text)
+            if entry is None:
+                return None
+            tokens.append(TaggedToken(token.text, entry[0], entry[1]))
+        return tokens
+
+    def tag_all(self, texts):
+        """
+        It tags the cleaned descriptions that the lexicon covers, so the claim
+        store can pick the key of each claim and `pipe` doesn't tag them again.
+
+        Returns:
+        taggers (list): The identity of the tagger of each description, the lexicon or the
+        spaCy model of the fallback.
+        docs (list): The tokens of each description tagged from the lexicon, None for the others.
+        """
+        docs = [self.tag(text) for text in texts]
+        taggers = [self.version if doc is not None else self.fallback_version for doc in docs]
+        return taggers, docs
+
+    def pipe(self, texts, batch_size=256, n_process=1, docs=None):
+        """
+        It tags the cleaned descriptions in batches and in their order. The claims
+        of a batch that can't be tagged from the lexicon are tagged by spaCy.
+        The docs of `tag_all`, if they are given, are used instead of looking the
+        tokens up again.
+        """
+        texts = list(texts)
+        for start in range(0, len(texts), batch_size):
+            if docs is None:
+                batch_docs = [self.tag(text) for text in texts[start:start + batch_size]]
+            else:
+                batch_docs = list(docs[start:start + batch_size])
+            missing = [i for i, doc in enumerate(batch_docs) if doc is None]
+            self.fast_claims += len(batch_docs) - len(missing)
+            self.fallback_claims += len(missing)
+            if missing:
+                fallback_docs = self.nlp.pipe([texts[start + i] for i in missing], batch_size=batch_size,
+                                              n_process=n_process)
+                for i, doc in zip(missing, fallback_docs):
+                    batch_docs[i] = doc
+            yield from batch_docs
+
+    def stats(self):
+        claims = self.fast_claims + self.fallback_claims
+        return {'tokens': len(self._lexicon), 'fast_claims': self.fast_claims,
+                'fallback_claims': self.fallback_claims,
+                'fast_ratio': self.fast_claims / claims if claims else 0.0}
+
+
+def agreement_report(texts, tagger, nlp, lexnames):
+    """
+    It compares the fast tagger with spaCy on the cleaned descriptions.
+
+    Returns:
+    report (dict): The token agreement of the POS tags and the lemmas and the
+    fraction of the claims with the same chosen verbs and impacted object.
+    """
+    tokens = pos_agreement = lemma_agreement = claims = same_parse = 0
+    for fast_doc, doc in zip(tagger.pipe(texts), nlp.pipe(texts)):
+        claims += 1
+        for fast_token, token in zip(fast_doc, doc):
+            tokens += 1
+            pos_agreement += fast_token.pos_ == token.pos_
+            lemma_agreement += fast_token.lemma_ == token.lemma_
+        fast_parsed, parsed = parse_tokens(fast_doc, lexnames), parse_tokens(doc, lexnames)
+        if fast_parsed is None or parsed is None:
+            same_parse += fast_parsed is parsed
+        else:
+            # the chosen verbs and the impacted object
+            same_parse += fast_parsed[3] == parsed[3] and fast_parsed[5] == parsed[5]
+    return {'claims': claims, 'tokens': tokens,
+            'pos_agreement': pos_agreement / tokens if tokens else 0.0,
+            'lemma_agreement': lemma_agreement / tokens if tokens else 0.0,
+            'parse_agreement': same_parse / claims if claims else 0.0}
+
+
+def main(input_merged_path, lexicon_path, holdout, min_agreement, seed):
+    mid_df = read_table(input_merged_path)
+    nlp = load_nlp()
+    texts = [clean_description(sentence, nlp.Defaults.stop_words)[1]
+             for sentence in mid_df['claim_desc'].dropna()]
+    random.Random(seed).shuffle(texts)
+    n_holdout = int(len(texts) * holdout)
+    train_texts, holdout_texts = texts[n_holdout:], texts[:n_holdout]
+
+    lexicon = distill_lexicon(train_texts, nlp, min_agreement)
+    save_lexicon(lexicon, nlp.Defaults.stop_words, lexicon_path)
+    print("Lexicon of %d tokens from %d claims saved to %s" % (len(lexicon), len(train_texts), lexicon_path))
+
+    tagger = FastTagger.from_file(lexicon_path)
+    report = agreement_report(holdout_texts, tagger, nlp, LexnameCache())
+    print("Held out claims: {claims}, tokens: {tokens}".format(**report))
+    print("POS agreement: {pos_agreement:.2%}, lemma agreement: {lemma_agreement:.2%}, "
+          "same chosen verbs and impact: {parse_agreement:.2%}".format(**report))
+    print("Claims tagged from the lexicon: {fast_claims}, by spaCy: {fallback_claims} "
+          "({fast_ratio:.2%} fast)".format(**tagger.stats()))
+
+
+if __name__ == "__main__":
+    opt = docopt(__doc__)
+    main(opt['--input_merged_path'], opt['--lexicon_path'], float(opt['--holdout']),
+         float(opt['--min_agreement']), int(opt['--seed']))
@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+An out-of-core inner join of the claims with the incident locations for
+`merge_claims.py`. The smaller location side is loaded once into a
+`HashIndex`, the claims are streamed in chunks and every merged chunk is
+written out before the next one is read, so the memory depends on the chunk
+size and not on the size of the claim file. If the location side doesn't fit
+in the memory budget either, both sides are streamed to on-disk partitions by
+the hash of the key and the partitions are joined one at a time (a Grace hash
+join). Every chunk of a file has to be read with the same dtypes, as a chunk
+with missing values, or without any value, in a column may be read with
+another dtype than the rest of the file. The claims are read with the dtypes
+of their schema (see `schemas.sample_schema`), the location side, and claims
+without a schema, are first scanned in chunks for the dtype of every column
+over the whole file, which also gives the memory of the location side. The result
+has the columns and the `_x`/`_y` suffixes of
+`pd.merge(claims, locations, on=key, how='inner')`. Without spilling the rows
+are in the same order too, with spilling they are ordered by partition.
+"""
+
+import math
+import os
+import shutil
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.artifact_io import iter_table, read_table, TableWriter
+from common.schemas import iter_dataset, sample_schema
+
+# a merged chunk holds the claim chunk, the matched location rows and the
+# output, so a chunk gets this fraction of the memory left for the claims
+CHUNK_FRACTION = 0.25
+
+
+class HashIndex:
+    """
+    The rows of a data frame grouped by the value of a key column, built once
+    and probed by every chunk of the other side.
+
+    Parameters:
+    df (DataFrame): The build side of the join.
+    key (str): The name of the key column.
+    """
+
+    def __init__(self, df, key):
+        self.df = df.reset_index(drop=True)
+        self.key = key
+        codes, uniques = pd.factorize(self.df[key])
+        self.keys = pd.Index(uniques)
+        # the rows of each key are order[starts[code]:starts[code] + counts[code]], in their original order
+        self.order = np.argsort(codes, kind='stable')
+        self.counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        self.starts = np.zeros(len(uniques), dtype=np.int64)
+        np.cumsum(self.counts[:-1], out=self.starts[1:])
+
+    @property
+    def nbytes(self):
+        return int(self.df.memory_usage(deep=True).sum()) + self.order.nbytes + self.counts.nbytes + self.starts.nbytes
+
+    def probe(self, keys):
+        """
+        It finds the matching rows of some keys.
+
+        Returns:
+        probe_rows (ndarray): The position of each match in the keys.
+        build_rows (ndarray): The row of each match in the build side.
+        """
+        codes = self.keys.get_indexer(keys)
+        counts = np.where(codes >= 0, self.counts[codes], 0)
+        probe_rows = np.repeat(np.arange(len(keys)), counts)
+        # the position of each match among the matches of its key
+        offsets = np.arange(len(probe_rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+        build_rows = self.order[self.starts[codes[probe_rows]] + offsets]
+        return probe_rows, build_rows
+
+    def join(self, chunk, suffixes=('_x', '_y')):
+        """
+        It returns the inner join of a chunk with the build side, with the
+        columns of `pd.merge(chunk, build_side, on=key)`.
+        """
+        probe_rows, build_rows = self.probe(chunk[self.key])
+        left = chunk.iloc[probe_rows].reset_index(drop=True)
+        right = self.df.iloc[build_rows].drop(columns=self.key).reset_index(drop=True)
+        overlap = set(left.columns) & set(right.columns)
+        left = left.rename(columns={column: column + suffixes[0] for column in overlap})
+        right = right.rename(columns={column: column + suffixes[1] for column in overlap})
+        return pd.concat([left, right], axis=1)
+
+
+def partition_of(keys, n_partitions):
+    """
+    It returns the partition of each key from a hash that is the same in every chunk.
+    """
+    return pd.util.hash_pandas_object(keys, index=False).values % n_partitions
+
+
+def spill(chunks, key, n_partitions, directory, prefix):
+    """
+    It writes the chunks to one Parquet file per partition of the key.
+
+    Returns:
+    file_paths (dict): The file of each partition with rows.
+    """
+    writers = {}
+    try:
+        for chunk in chunks:
+            partitions = partition_of(chunk[key], n_partitions)
+            for partition in np.unique(partitions):
+                if partition not in writers:
+                    writers[partition] = TableWriter(os.path.join(directory, '%s_%d.parquet' % (prefix, partition)))
+                writers[partition].write(chunk[partitions == partition])
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return {partition: writer.file_path for partition, writer in writers.items()}
+
+
+def chunk_rows(file_path, budget, sample_rows=1000, **kwargs):
+    """
+    It returns the number of rows of a chunk of a file that fits in a memory
+    budget, from the memory of the first rows.
+    """
+    sample = next(iter_table(file_path, sample_rows, **kwargs), None)
+    if sample is None or len(sample) == 0:
+        return sample_rows
+    row_bytes = sample.memory_usage(deep=True).sum() / len(sample)
+    return max(int(budget * CHUNK_FRACTION / row_bytes), 1)
+
+
+def column_dtype(dtypes, missing_dtypes):
+    """
+    It returns the dtype of a column over the whole file, as `pd.read_csv`
+    would infer it at once, from the dtypes of its chunks.
+
+    Parameters:
+    dtypes (set): The dtypes of the chunks with values in the column.
+    missing_dtypes (set): The dtypes of the chunks without any value in the column.
+
+    Returns:
+    dtype (dtype): The dtype of the column, None if every chunk has the same one.
+    """
+    if len(dtypes | missing_dtypes) <= 1:
+        return None
+    if not dtypes:
+        return np.dtype(object)
+    if len(dtypes) == 1:
+        dtype = next(iter(dtypes))
+        # the missing values make the integers floats and the booleans objects
+        if pd.api.types.is_integer_dtype(dtype):
+            return np.dtype('float64')
+        return np.dtype(object) if pd.api.types.is_bool_dtype(dtype) else dtype
+    if all(pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype) for dtype in dtypes):
+        return np.dtype('float64')
+    return np.dtype(object)
+
+
+def scan_table(file_path, chunksize):
+    """
+    It reads a file in chunks to find the columns whose dtype changes between
+    chunks and the memory of the whole file.
+
+    Returns:
+    dtypes (dict): The dtype over the whole file of the columns that change.
+    nbytes (int): The memory of the data frame of the file.
+    """
+    dtypes, missing_dtypes, nbytes = {}, {}, 0
+    for chunk in iter_table(file_path, chunksize):
+        for column in chunk.columns:
+            values = chunk[column]
+            if values.isna().all():
+                missing_dtypes.setdefault(column, set()).add(values.dtype)
+            elif values.dtype == object and pd.api.types.infer_dtype(values, skipna=True) == 'boolean':
+                # the booleans of a chunk with missing values are objects
+                dtypes.setdefault(column, set()).add(np.dtype(bool))
+                missing_dtypes.setdefault(column, set()).add(values.dtype)
+            else:
+                dtypes.setdefault(column, set()).add(values.dtype)
+        nbytes += int(chunk.memory_usage(deep=True).sum())
+    columns = set(dtypes) | set(missing_dtypes)
+    column_dtypes = {column: column_dtype(dtypes.get(column, set()), missing_dtypes.get(column, set()))
+                     for column in columns}
+    return {column: dtype for column, dtype in column_dtypes.items() if dtype is not None}, nbytes
+
+
+def typed_chunks(file_path, chunksize, dtypes):
+    """
+    It reads a file in chunks with the dtypes of `scan_table`. The numbers of a
+    column that has text in other chunks are converted to text, as
+    `arrow_compatible` does for a column read at once.
+    """
+    for chunk in iter_table(file_path, chunksize):
+        numbers = [column for column, dtype in dtypes.items()
+                   if dtype == object and pd.api.types.is_numeric_dtype(chunk[column].dtype)
+                   and not pd.api.types.is_bool_dtype(chunk[column].dtype)]
+        chunk = chunk.astype(dtypes)
+        for column in numbers:
+            chunk[column] = chunk[column].where(chunk[column].isna(), chunk[column].astype(str))
+        yield chunk
+
+
+def stream_merge(claims_path, locations_path, output_file_path, key='claim_id', memory_budget=None,
+                 chunksize=None, n_partitions=None, spill_dir=None, exports=(), claims_schema=None):
+    """
+    It joins the claims with the locations on the key and writes the result
+    chunk by chunk.
+
+    Parameters:
+    claims_path (str): A file path for the claim data, the probe side that is streamed.
+    locations_path (str): A file path for the location data, the build side that is loaded, or
+    streamed to the partitions.
+    output_file_path (str): A file path for the merged data.
+    key (str): The name of the key column.
+    memory_budget (int): The bytes the join may use, it sets the chunk size and the
+    number of partitions that aren't given. None reads chunks of 100000 rows and
+    doesn't spill.
+    chunksize (int): The number of claim rows in a chunk.
+    n_partitions (int): The number of on-disk partitions, the join spills if it is above 1.
+    spill_dir (str): A directory for the partitions, a temporary one if it is None.
+    exports (list): The extensions of other formats to write the merged data in too.
+    claims_schema (DatasetSchema): The schema of the claims with all their columns, e.g.
+    `SCHEMAS['claim_lines']`, None scans the claims for the dtypes of their columns.
+
+    Returns:
+    stats (dict): The number of rows and chunks and the partitions of the join.
+    """
+    # a scan holds one chunk at a time, it also measures the memory of the location side
+    scan_rows = {path: chunksize or (100000 if memory_budget is None else chunk_rows(path, memory_budget))
+                 for path in (claims_path, locations_path)}
+    location_dtypes, location_bytes = scan_table(locations_path, scan_rows[locations_path])
+    if claims_schema is None:
+        claim_dtypes, _ = scan_table(claims_path, scan_rows[claims_path])
+
+        def claim_chunks(rows):
+            return typed_chunks(claims_path, rows, claim_dtypes)
+    else:
+        # the dtypes of the columns that aren't in the schema are taken from the first chunk
+        schema = sample_schema(claims_schema, claims_path, scan_rows[claims_path])
+
+        def claim_chunks(rows):
+            return iter_dataset(schema, claims_path, rows)
+    if n_partitions is None:
+        # the build side of a partition should take at most half of the budget
+        n_partitions = 1 if memory_budget is None else max(math.ceil(2 * location_bytes / memory_budget), 1)
+    if chunksize is None:
+        chunksize = 100000 if memory_budget is None else chunk_rows(
+            claims_path, max(memory_budget - location_bytes / n_partitions, memory_budget / 2))
+    stats = {'rows': 0, 'chunks': 0, 'partitions': n_partitions, 'chunksize': chunksize}
+    # the columns of the result, for an empty join
+    header = next(claim_chunks(1), None)
+    location_header = next(typed_chunks(locations_path, 1, location_dtypes), None)
+    empty = None if header is None or location_header is None else HashIndex(
+        location_header.iloc[:0], key).join(header.iloc[:0])
+
+    with TableWriter(output_file_path, exports=exports) as writer:
+        def join_chunks(index, chunks):
+            for chunk in chunks:
+                merged = index.join(chunk)
+                # the empty chunks are skipped, the types of their columns may be unknown
+                if len(merged):
+                    writer.write(merged)
+                stats['rows'] += len(merged)
+                stats['chunks'] += 1
+
+        if n_partitions == 1:
+            chunks = list(typed_chunks(locations_path, scan_rows[locations_path], location_dtypes))
+            locations = pd.concat(chunks, ignore_index=True) if chunks else location_header
+            join_chunks(HashIndex(locations, key), claim_chunks(chunksize))
+        else:
+            directory = tempfile.mkdtemp(dir=spill_dir)
+            try:
+                location_files = spill(typed_chunks(locations_path, scan_rows[locations_path], location_dtypes), key,
+                                       n_partitions, directory, 'locations')
+                claim_files = spill(claim_chunks(chunksize), key, n_partitions, directory,
+                                    'claims')
+                for partition in sorted(claim_files):
+                    if partition in location_files:
+                        index = HashIndex(read_table(location_files[partition]), key)
+                        join_chunks(index, iter_table(claim_files[partition], chunksize))
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+        if writer.n_rows == 0 and empty is not None:
+            writer.write(empty)
+    return stats
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+A cache of the WordNet lexicographer categories used by `claim_parser.py`.
+The claims use a small vocabulary, so the category of the top synset of each
+word is memoized in a bounded LRU table and persisted to a JSON file between
+runs. WordNet is only loaded when a word is not in the table.
+"""
+
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+
+
+class LexnameCache:
+    """
+    A bounded LRU table of word -> lexicographer category of the top synset.
+
+    Parameters:
+    file_path (str): The JSON file the table is loaded from and saved to, None keeps it in memory only.
+    max_entries (int): The maximum number of words kept in the table.
+    """
+
+    def __init__(self, file_path=None, max_entries=100000):
+        self.file_path = file_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._table = OrderedDict()
+        self._wordnet = None
+        if file_path is not None and os.path.exists(file_path):
+            with open(file_path) as cache_file:
+                for word, category in json.load(cache_file).items():
+                    self._store(word, category)
+
+    def __len__(self):
+        return len(self._table)
+
+    def _store(self, word, category):
+        self._table[word] = category
+        self._table.move_to_end(word)
+        if len(self._table) > self.max_entries:
+            self._table.popitem(last=False)
+            self.evictions += 1
+
+    def lookup(self, word):
+        """
+        It returns the lexicographer category ('verb', 'noun', 'adj', ...) of the
+        top WordNet synset of a word or None if the word has no synset.
+        """
+        if word in self._table:
+            self.hits += 1
+            self._table.move_to_end(word)
+            return self._table[word]
+        self.misses += 1
+        if self._wordnet is None:
+            # the corpus is only loaded when there is a word we haven't seen before
+            from nltk.corpus import wordnet
+            self._wordnet = wordnet
+        syns = self._wordnet.synsets(word)
+        category = syns[0].lexname().split('.')[0] if syns else None
+        self._store(word, category)
+        return category
+
+    def update(self, table):
+        """
+        It adds the words of another table, e.g. the ones found by a worker process.
+        """
+        for word, category in table.items():
+            self._store(word, category)
+
+    def table(self):
+        return dict(self._table)
+
+    def save(self):
+        """
+        It writes the table to the JSON file.
+        """
+        if self.file_path is None:
+            return
+        Path(os.path.dirname(self.file_path) or '.').mkdir(parents=True, exist_ok=True)
+        temporary_path = self.file_path + '.tmp'
+        with open(temporary_path, 'w') as cache_file:
+            json.dump(self._table, cache_file)
+        os.replace(temporary_path, self.file_path)
+
+    def stats(self):
+        """
+        It returns the hit and miss counters of the cache.
+        """
+        lookups = self.hits + self.misses
+        return {'entries': len(self._table), 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0}
@@ -2,30 +2,43 @@
 # coding: utf-8
 
 """
-This script takes two datasets as input and then merges the dataset to produce a final dataset that includes the latitude and longitude informatiion of all the locations where incidents took place. Final dataset is stored in Translink Raw data.  This script assumes that 'get-data.py' is run before.
+This script takes two datasets as input and then merges the dataset to produce a final dataset that includes the latitude and longitude informatiion of all the locations where incidents took place. Final dataset is stored as `merged_collision.parquet` in the output directory.  This script assumes that 'get-data.py' is run before.
 
-Usage: merge_claims.py --input_claim_path=<input_claims> --input_location_path=<input_locations> --output_path=<outputs>
+Usage: merge_claims.py --input_claim_path=<input_claims> --input_location_path=<input_locations> --output_path=<outputs> [--export=<export>] [--memory_budget=<memory_budget>] [--chunksize=<chunksize>] [--partitions=<partitions>] [--spill_dir=<spill_dir>]
 
 Example:
 python src/claim_analysis/merge_claims.py \
 --input_claim_path "data/TransLink Raw Data/claim_vehicle_employee_line.csv" \
 --input_location_path "results/processed_data/collision_locations_with_coordinates.csv" \
---output_path "results/claim_analysis/data"
+--output_path "results/claim_analysis/data" \
+--memory_budget 512
 
 Options:
 --input_claim_path=<input_claims> A file for claim data.
 --input_location_path=<input_locations> A file for location data.
 --output_path=<outputs> Merged data file.
+--export=<export>  The comma separated extensions of other formats to write the merged data in too, e.g. xlsx.
+--memory_budget=<memory_budget>  The megabytes the join may use, the claims are then streamed in chunks and the data is spilled to disk partitions if the locations don't fit.
+--chunksize=<chunksize>  The number of claim rows in a chunk of the streamed join, instead of the one that fits the memory budget.
+--partitions=<partitions>  The number of disk partitions of the streamed join, instead of the one that fits the memory budget.
+--spill_dir=<spill_dir>  A directory for the disk partitions, a temporary directory if it is not given.
 """
 
 from docopt import docopt
 import pandas as pd
 import numpy as np
 import os
+import sys
+from hash_join import stream_merge
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.artifact_io import read_table, write_table
+from common.schemas import load_dataset, peak_rss, SCHEMAS
 
 opt = docopt(__doc__)
 
-def main(input_claim_path,input_location_path, output_path):
+def main(input_claim_path,input_location_path, output_path, exports=(), memory_budget=None, chunksize=None,
+         partitions=None, spill_dir=None):
 	"""
 	This function merges two dataframes based on claim id in order to combine claims data with location data of all the incidents
 
@@ -34,25 +47,42 @@ def main(input_claim_path,input_location_path, output_path):
 	input_claim_path: A file for claim data.
 	input_location_path: A file for location data.
 	output_path: Merged data file.
+	exports: The extensions of other formats to write the merged data in too.
+	memory_budget: The megabytes the join may use, None loads both datasets and merges them in memory.
+	chunksize: The number of claim rows in a chunk of the streamed join.
+	partitions: The number of disk partitions of the streamed join.
+	spill_dir: A directory for the disk partitions.
 
 	Returns
 	--------
 	None
 	"""
 	
-	claim_vehicle_data = pd.read_csv(input_claim_path)
+	output_file_path = output_path + '/merged_collision.parquet'
+	if memory_budget is not None or chunksize is not None or partitions is not None:
+		# the claims are streamed through a hash index of the locations
+		stats = stream_merge(input_claim_path, input_location_path, output_file_path, key='claim_id',
+		                     memory_budget=None if memory_budget is None else memory_budget * 2 ** 20,
+		                     chunksize=chunksize, n_partitions=partitions, spill_dir=spill_dir, exports=exports,
+		                     claims_schema=SCHEMAS['claim_lines'])
+		print("Merged rows:{rows} Chunks:{chunks} ChunkSize:{chunksize} Partitions:{partitions}".format(**stats))
+	else:
+		# every column of the claims is kept, `claim_description.py` takes them by position
+		claim_vehicle_data = load_dataset('claim_lines', input_claim_path)
 
-	collision_location_data = pd.read_csv(input_location_path)
+		collision_location_data = read_table(input_location_path)
 
-	merged_data = pd.merge(claim_vehicle_data, collision_location_data,on=['claim_id'], how='inner')
+		merged_data = pd.merge(claim_vehicle_data, collision_location_data,on=['claim_id'], how='inner')
 
-	if not os.path.exists(output_path):
-		os.makedirs(output_path)
-	
-	merged_data.to_excel(output_path + '/merged_collision.xlsx', index=False)
+		write_table(merged_data, output_file_path, exports=exports)
+	print("Peak memory: %.1f MB" % peak_rss())
 
 if __name__ == "__main__":
-	main(opt["--input_claim_path"], opt["--input_location_path"], opt["--output_path"])
+	main(opt["--input_claim_path"], opt["--input_location_path"], opt["--output_path"],
+	     opt["--export"].split(',') if opt["--export"] else (),
+	     float(opt["--memory_budget"]) if opt["--memory_budget"] else None,
+	     int(opt["--chunksize"]) if opt["--chunksize"] else None,
+	     int(opt["--partitions"]) if opt["--partitions"] else None, opt["--spill_dir"])
 
 
 
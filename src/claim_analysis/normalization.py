@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+The normalization of the typos and the colours of `claim_description.py`.
+The mapping tables are read from a JSON file (see `normalization.json`) with
+the replacement rules of each column and of the colours. The rules of a table
+are compiled into one lookup and a column is normalized in one pass over its
+distinct values.
+"""
+
+import json
+import numpy as np
+import pandas as pd
+
+
+def load_mapping(mapping_path):
+    """
+    It reads the mapping tables.
+
+    Parameters:
+    mapping_path (str): The path of the JSON file with the "typos" rules of each column and the "colours" rules.
+
+    Returns:
+    mapping (dict): The compiled lookups, {'typos': {column: lookup}, 'colours': lookup}.
+    """
+    with open(mapping_path) as mapping_file:
+        tables = json.load(mapping_file)
+    return {'typos': {column: compile_rules(rules) for column, rules in tables.get('typos', {}).items()},
+            'colours': compile_rules(tables.get('colours', []))}
+
+
+def compile_rules(rules):
+    """
+    It compiles a list of replacement rules into one lookup that gives the same
+    result as applying the rules one after the other.
+
+    Parameters:
+    rules (list): The rules in the order they are applied, each one a dictionary
+    with the values to replace under "from" and the new value under "to".
+
+    Returns:
+    lookup (dict): A dictionary of value -> normalized value.
+    """
+    lookup = {}
+    for rule in rules:
+        sources = set(rule['from'])
+        # the values that an earlier rule turned into one of the sources
+        for value, normalized in lookup.items():
+            if normalized in sources:
+                lookup[value] = rule['to']
+        for source in sources:
+            lookup.setdefault(source, rule['to'])
+    return lookup
+
+
+def normalize(values, lookup):
+    """
+    It replaces the values of a column that are in the lookup. The lookup is
+    only applied to the distinct values and the column is rebuilt from their codes.
+
+    Parameters:
+    values (Series): The column.
+    lookup (dict): A dictionary of value -> normalized value.
+
+    Returns:
+    normalized (Series): The normalized column with the index of the input.
+    """
+    values = pd.Series(values)
+    codes, uniques = pd.factorize(values)
+    normalized_uniques = np.array([lookup.get(value, value) for value in uniques] + [np.nan], dtype=object)
+    # the code of the missing values is -1, the last item
+    return pd.Series(normalized_uniques[codes], index=values.index, name=values.name)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+A columnar store of the parsed claims of `claim_description.py`. Every list of
+a parsed claim (POS tags, prepositions, verbs, chosen verbs, nouns and the
+impacted object) is kept as a `TokenColumn`: the integer codes of the tokens of
+all the claims in one array and the offsets of each claim in another, with the
+codes of all the columns over one shared `Vocabulary`.
+"""
+
+import numpy as np
+
+# the lists of `claim_parser.parse_tokens`, in their order
+COLUMNS = ['pos', 'preposition', 'verb', 'chosen_verb', 'noun', 'impact']
+
+
+class Vocabulary:
+    """
+    A table of string <-> integer code.
+    """
+
+    def __init__(self):
+        self.strings = []
+        self.codes = {}
+
+    def __len__(self):
+        return len(self.strings)
+
+    def add(self, string):
+        code = self.codes.get(string)
+        if code is None:
+            code = self.codes[string] = len(self.strings)
+            self.strings.append(string)
+        return code
+
+    def array(self):
+        return np.array(self.strings, dtype=object)
+
+    def map(self, function):
+        """
+        It returns an array that maps the code of every string to the code of function(string).
+        """
+        return np.array([self.add(function(string)) for string in list(self.strings)], dtype=np.int32)
+
+
+class TokenColumn:
+    """
+    The token lists of the claims as the codes of all the tokens and the offsets
+    of the lists, the tokens of claim i are codes[offsets[i]:offsets[i + 1]].
+
+    Parameters:
+    offsets (ndarray): The offsets of the lists, one more than the number of claims.
+    codes (ndarray): The codes of the tokens.
+    """
+
+    def __init__(self, offsets, codes):
+        self.offsets = offsets
+        self.codes = codes
+
+    @classmethod
+    def from_lists(cls, lists, vocabulary):
+        lengths = np.fromiter((len(tokens) for tokens in lists), dtype=np.int64, count=len(lists))
+        offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        codes = np.fromiter((vocabulary.add(token) for tokens in lists for token in tokens),
+                            dtype=np.int32, count=offsets[-1])
+        return cls(offsets, codes)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + self.codes.nbytes
+
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    def rows(self):
+        """
+        It returns the claim of every token.
+        """
+        return np.repeat(np.arange(len(self)), self.lengths())
+
+    def take(self, rows):
+        """
+        It returns the lists of the given claims as a new column.
+        """
+        lengths = self.lengths()[rows]
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        # the position of every token of the selected claims in the codes
+        positions = np.repeat(self.offsets[rows] - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return TokenColumn(offsets, self.codes[positions])
+
+    def to_lists(self, vocabulary):
+        strings = vocabulary.array()[self.codes].tolist()
+        return [strings[start:end] for start, end in zip(self.offsets[:-1].tolist(), self.offsets[1:].tolist())]
+
+    def join(self, vocabulary, separator=','):
+        return [separator.join(tokens) for tokens in self.to_lists(vocabulary)]
+
+
+class TokenStore:
+    """
+    The parsed claims as one `TokenColumn` per list of `COLUMNS` over a shared vocabulary.
+
+    Parameters:
+    vocabulary (Vocabulary): The vocabulary of the codes.
+    columns (dict): The TokenColumn of each name of `COLUMNS`.
+    """
+
+    def __init__(self, vocabulary, columns):
+        self.vocabulary = vocabulary
+        self.columns = columns
+
+    @classmethod
+    def from_parsed(cls, parsed_claims):
+        """
+        It builds the store from the lists of `parse_tokens`, the claims must not be None.
+        """
+        vocabulary = Vocabulary()
+        columns = {name: TokenColumn.from_lists([parsed[i] for parsed in parsed_claims], vocabulary)
+                   for i, name in enumerate(COLUMNS)}
+        return cls(vocabulary, columns)
+
+    def __len__(self):
+        return len(self.columns[COLUMNS[0]])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns.values())
+
+    def take(self, rows):
+        return TokenStore(self.vocabulary, {name: column.take(rows) for name, column in self.columns.items()})
@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+The reading and writing of the data sets that the scripts pass to each other.
+The format of a file is chosen by its extension. The intermediate files of the
+pipeline are compressed Parquet or Feather files, which keep the dtypes of the
+columns and are much faster to write and read than Excel files. Excel and CSV
+files are only written for the R and Shiny code that reads them, as exports
+of the Parquet file. The columnar formats need pyarrow. The large data sets can
+be read in chunks with `iter_table` and written in chunks with `TableWriter`.
+"""
+
+import os
+import pandas as pd
+
+FORMATS = {'.parquet': 'parquet', '.feather': 'feather', '.arrow': 'feather',
+           '.csv': 'csv', '.txt': 'csv', '.xlsx': 'excel', '.xls': 'excel'}
+
+
+def file_format(file_path):
+    """
+    It returns the format of a file from its extension.
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError("The file should have one of the extensions: ", sorted(FORMATS))
+    return FORMATS[extension]
+
+
+def with_extension(file_path, extension):
+    """
+    It returns the file path with its extension replaced, e.g. the xlsx export of a Parquet file.
+    """
+    return os.path.splitext(file_path)[0] + '.' + extension.lstrip('.')
+
+
+def read_table(file_path, columns=None, **kwargs):
+    """
+    It reads a data frame in the format of its extension.
+
+    Parameters:
+    file_path (str): A file path.
+    columns (list): The columns to read, all of them if it is None. The columnar
+    formats only read these columns from the file.
+    kwargs: Passed on to the pandas reader, e.g. the delimiter of a CSV file.
+
+    Returns:
+    df (DataFrame): The data set.
+    """
+    file_type = file_format(file_path)
+    if file_type == 'parquet':
+        return pd.read_parquet(file_path, columns=columns, **kwargs)
+    if file_type == 'feather':
+        return pd.read_feather(file_path, columns=columns, **kwargs)
+    if file_type == 'excel':
+        return pd.read_excel(file_path, usecols=columns, **kwargs)
+    return pd.read_csv(file_path, usecols=columns, **kwargs)
+
+
+def iter_table(file_path, chunksize, columns=None, **kwargs):
+    """
+    It reads a data frame in chunks of `chunksize` rows. CSV and Parquet files
+    are streamed, the other formats are read at once and sliced.
+
+    Parameters:
+    file_path (str): A file path.
+    chunksize (int): The number of rows of a chunk.
+    columns (list): The columns to read, all of them if it is None.
+    kwargs: Passed on to the pandas reader.
+
+    Returns:
+    chunks (iterator): The chunks as data frames.
+    """
+    file_type = file_format(file_path)
+    if file_type == 'csv':
+        with pd.read_csv(file_path, usecols=columns, chunksize=chunksize, **kwargs) as reader:
+            yield from reader
+    elif file_type == 'parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    else:
+        df = read_table(file_path, columns=columns, **kwargs)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+
+
+def arrow_compatible(df):
+    """
+    It converts the object columns that mix types, e.g. numbers and strings,
+    to strings as Arrow needs one type per column. The missing values are kept.
+    """
+    mixed = [column for column in df.columns[df.dtypes == object]
+             if df[column].dropna().map(type).nunique() > 1]
+    if not mixed:
+        return df
+    df = df.copy()
+    for column in mixed:
+        df[column] = df[column].where(df[column].isna(), df[column].astype(str))
+    return df
+
+
+def write_table(df, file_path, index=False, exports=(), compression='zstd'):
+    """
+    It writes a data frame in the format of its extension and creates its
+    directory if it doesn't exist.
+
+    Parameters:
+    df (DataFrame): The data set.
+    file_path (str): A file path.
+    index (bool): Whether to write the index of the data frame.
+    exports (list): The extensions of the other formats to write next to the file, e.g. ['xlsx'].
+    compression (str): The compression of the columnar formats.
+    """
+    directory = os.path.dirname(file_path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    file_type = file_format(file_path)
+    if file_type == 'parquet':
+        arrow_compatible(df).to_parquet(file_path, index=index, compression=compression)
+    elif file_type == 'feather':
+        df = arrow_compatible(df)
+        (df.reset_index() if index else df.reset_index(drop=True)).to_feather(file_path, compression=compression)
+    elif file_type == 'excel':
+        df.to_excel(file_path, index=index)
+    else:
+        df.to_csv(file_path, index=index)
+    for extension in exports:
+        export_path = with_extension(file_path, extension)
+        if export_path != file_path:
+            write_table(df, export_path, index=index, compression=compression)
+
+
+class TableWriter:
+    """
+    A writer of a data frame that arrives in chunks. The chunks of a Parquet
+    or Feather file are written as row groups or record batches with the
+    schema of the first chunk, where the columns without any value are
+    strings, the chunks of a CSV file are appended and the rows of an Excel
+    file are streamed to a write-only workbook, so the data set is never held
+    in memory at once. The exports are written chunk by chunk along with the
+    file.
+
+    Parameters:
+    file_path (str): A file path.
+    exports (list): The extensions of the other formats to write next to the file.
+    compression (str): The compression of the columnar formats.
+    """
+
+    def __init__(self, file_path, exports=(), compression='zstd'):
+        self.file_path = file_path
+        self.compression = compression
+        self.file_type = file_format(file_path)
+        self.n_rows = 0
+        self._writer = None
+        self._schema = None
+        self._sheet = None
+        directory = os.path.dirname(file_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        export_paths = [with_extension(file_path, extension) for extension in exports]
+        self._exports = [TableWriter(export_path, compression=compression)
+                         for export_path in export_paths if export_path != file_path]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _arrow_table(self, df):
+        import pyarrow as pa
+        df = arrow_compatible(df)
+        if self._schema is not None:
+            try:
+                return pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as error:
+                raise ValueError("A chunk doesn't fit the column types of the first chunk, "
+                                 "give the dtypes of the columns to the reader: " + str(error))
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        # a column without any value in the first chunk has no type, its values are taken as text
+        null_fields = [i for i, field in enumerate(table.schema) if pa.types.is_null(field.type)]
+        if null_fields:
+            schema = table.schema
+            for i in null_fields:
+                schema = schema.set(i, schema.field(i).with_type(pa.string()))
+            table = table.cast(schema)
+        self._schema = table.schema
+        return table
+
+    def write(self, df):
+        if self.file_type == 'parquet':
+            import pyarrow.parquet as pq
+            table = self._arrow_table(df)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.file_path, self._schema, compression=self.compression)
+            self._writer.write_table(table)
+        elif self.file_type == 'feather':
+            import pyarrow as pa
+            table = self._arrow_table(df)
+            if self._writer is None:
+                # a Feather file is an Arrow IPC file, its record batches are written one at a time
+                self._writer = pa.ipc.new_file(self.file_path, self._schema,
+                                               options=pa.ipc.IpcWriteOptions(compression=self.compression))
+            self._writer.write_table(table)
+        elif self.file_type == 'csv':
+            df.to_csv(self.file_path, mode='w' if self.n_rows == 0 else 'a', header=self.n_rows == 0, index=False)
+        else:
+            if self._writer is None:
+                from openpyxl import Workbook
+                self._writer = Workbook(write_only=True)
+                self._sheet = self._writer.create_sheet('Sheet1')
+                self._sheet.append(list(df.columns))
+            # the missing values are empty cells, as in `DataFrame.to_excel`
+            for row in df.astype(object).where(df.notna(), None).itertuples(index=False):
+                self._sheet.append(list(row))
+        for export in self._exports:
+            export.write(df)
+        self.n_rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            if self.file_type == 'excel':
+                self._writer.save(self.file_path)
+            else:
+                self._writer.close()
+            self._writer = None
+        for export in self._exports:
+            export.close()
+        self._exports = []
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This script benchmarks the formats of `artifact_io.py` on a synthetic data set
+shaped like `merged_collision`: claim descriptions, street and city names,
+codes, costs, coordinates and dates. It writes and reads the data set in each
+format and reports the time, the size of the file and how many columns keep
+their dtype.
+
+Usage: benchmark_artifact_io.py [--n_rows=<n_rows>] [--formats=<formats>] [--seed=<seed>]
+
+Options:
+--n_rows=<n_rows>  The number of rows of the data set [default: 20000].
+--formats=<formats>  The comma separated extensions of the formats [default: xlsx,csv,parquet,feather].
+--seed=<seed>  The random seed [default: 123].
+
+Example:
+python src/common/benchmark_artifact_io.py --n_rows=20000
+"""
+
+import os
+import tempfile
+import time
+from docopt import docopt
+import numpy as np
+import pandas as pd
+from artifact_io import read_table, write_table
+
+WORDS = ['bus', 'rear', 'ended', 'pole', 'mirror', 'side', 'swiped', 'while', 'turning', 'left', 'right',
+         'cyclist', 'pedestrian', 'fell', 'on', 'board', 'damaged', 'parked', 'car', 'door', 'clipped', 'curb']
+STREETS = ['Granville St', 'Hastings St', 'Kingsway', 'Main St', 'Broadway', 'Knight St', 'Commercial Dr']
+CITIES = ['Vancouver', 'Burnaby', 'Surrey', 'Richmond', 'Coquitlam', 'Delta']
+
+
+def synthetic_collisions(n_rows, rng):
+    """
+    It creates a data set with the kinds of columns of the merged claims and locations.
+    """
+    df = pd.DataFrame({
+        'claim_id': np.arange(n_rows),
+        'claim_desc': [' '.join(rng.choice(WORDS, rng.randint(4, 15))).upper() for _ in range(n_rows)],
+        'loss_location_at': rng.choice(STREETS, n_rows),
+        'loss_location_on': rng.choice(STREETS, n_rows),
+        'city_of_incident': rng.choice(CITIES, n_rows),
+        'loss_date': pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.randint(0, 2000, n_rows), unit='D'),
+        'paid_cost$': np.round(rng.lognormal(7, 1.5, n_rows), 2),
+        'lat': rng.uniform(49.0, 49.4, n_rows),
+        'long': rng.uniform(-123.3, -122.6, n_rows)})
+    for i in range(20):
+        df['code_%d' % i] = rng.randint(0, 1000, n_rows)
+    for i in range(20):
+        df['category_%d' % i] = rng.choice(['A', 'B', 'C', 'D', 'E'], n_rows)
+    return df
+
+
+def main(n_rows, formats, seed):
+    df = synthetic_collisions(n_rows, np.random.RandomState(seed))
+    print("Rows: %d, columns: %d, %.1f MB in memory" % (len(df), len(df.columns),
+                                                      df.memory_usage(deep=True).sum() / 2 ** 20))
+    with tempfile.TemporaryDirectory() as directory:
+        for extension in formats:
+            file_path = os.path.join(directory, 'merged_collision.' + extension)
+            t = time.time()
+            write_table(df, file_path)
+            write_time = time.time() - t
+            t = time.time()
+            read_df = read_table(file_path)
+            read_time = time.time() - t
+            kept_dtypes = int((read_df.dtypes.values == df.dtypes.values).sum())
+            print("  %-8s write %6.2f s, read %6.2f s, %6.1f MB, dtypes kept %d/%d" % (
+                extension, write_time, read_time, os.path.getsize(file_path) / 2 ** 20, kept_dtypes, len(df.columns)))
+
+
+if __name__ == "__main__":
+    opt = docopt(__doc__)
+    main(int(opt['--n_rows']), opt['--formats'].split(','), int(opt['--seed']))
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This script benchmarks the fuzzy index of `fuzzy_index.py` against a brute
+force search that computes the edit distance of a word to every term of the
+vocabulary. It builds synthetic vocabularies, looks up misspelled and unseen
+words with both, checks that both find the same terms and reports the time of
+the lookups.
+
+Usage: benchmark_fuzzy_index.py [--vocabulary_sizes=<vocabulary_sizes>] [--n_queries=<n_queries>] [--n_brute_force=<n_brute_force>] [--max_distance=<max_distance>] [--seed=<seed>]
+
+Options:
+--vocabulary_sizes=<vocabulary_sizes>  The comma separated sizes of the vocabularies [default: 10000,50000].
+--n_queries=<n_queries>  The number of words looked up in the index [default: 2000].
+--n_brute_force=<n_brute_force>  The number of these words also looked up with the brute force search [default: 100].
+--max_distance=<max_distance>  The maximum edit distance of a match [default: 2].
+--seed=<seed>  The random seed [default: 123].
+
+Example:
+python src/common/benchmark_fuzzy_index.py --vocabulary_sizes=10000,50000
+"""
+
+import random
+import time
+from docopt import docopt
+from fuzzy_index import FuzzyIndex, edit_distance
+
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+
+
+def make_word(rng):
+    syllables = [rng.choice('bcdfghklmnprstvwz') + rng.choice('aeiou') for _ in range(rng.randint(2, 5))]
+    return ''.join(syllables)
+
+
+def misspell(word, rng, n_edits):
+    """
+    It applies random deletions, insertions, substitutions and transpositions to a word.
+    """
+    for _ in range(n_edits):
+        position = rng.randrange(len(word))
+        edit = rng.random()
+        if edit < 0.25 and len(word) > 3:
+            word = word[:position] + word[position + 1:]
+        elif edit < 0.5:
+            word = word[:position] + rng.choice(LETTERS) + word[position:]
+        elif edit < 0.75:
+            word = word[:position] + rng.choice(LETTERS) + word[position + 1:]
+        elif position < len(word) - 1:
+            word = word[:position] + word[position + 1] + word[position] + word[position + 2:]
+    return word
+
+
+def brute_force_match(word, terms, counts, max_distance):
+    """
+    It finds the closest term of a word by computing its distance to every term.
+    """
+    best_term, best_distance = None, max_distance + 1
+    for term in terms:
+        distance = edit_distance(word, term, max_distance)
+        if distance < best_distance or (distance == best_distance and best_term is not None and
+                                         (-counts.get(term, 0), term) < (-counts.get(best_term, 0), best_term)):
+            best_term, best_distance = term, distance
+    return best_term, best_distance
+
+
+def main(vocabulary_sizes, n_queries, n_brute_force, max_distance, seed):
+    rng = random.Random(seed)
+    for vocabulary_size in vocabulary_sizes:
+        vocabulary = set()
+        while len(vocabulary) < vocabulary_size:
+            vocabulary.add(make_word(rng))
+        vocabulary = sorted(vocabulary)
+        counts = {term: rng.randint(1, 1000) for term in vocabulary}
+        queries = [misspell(rng.choice(vocabulary), rng, rng.randint(0, 2)) if rng.random() < 0.8 else make_word(rng)
+                   for _ in range(n_queries)]
+
+        t = time.time()
+        index = FuzzyIndex({term: term for term in vocabulary}, counts, max_distance)
+        build_time = time.time() - t
+
+        t = time.time()
+        index_matches = [index.match(word) for word in queries]
+        index_time = time.time() - t
+
+        t = time.time()
+        brute_force_matches = [brute_force_match(word, vocabulary, counts, max_distance) for word in queries[:n_brute_force]]
+        brute_force_time = time.time() - t
+
+        found = sum(term is not None for term, _ in index_matches)
+        identical = sum(index_match == brute_force for index_match, brute_force in zip(index_matches, brute_force_matches))
+        index_per_query = index_time / len(queries)
+        brute_force_per_query = brute_force_time / len(brute_force_matches)
+        print("Vocabulary: %d terms, index built in %.2f s" % (vocabulary_size, build_time))
+        print("  index:       %d queries, %d matched, %.1f us/query" % (len(queries), found, 1e6 * index_per_query))
+        print("  brute force: %d queries, %d identical matches, %.1f us/query (%.0fx slower)" % (
+            len(brute_force_matches), identical, 1e6 * brute_force_per_query, brute_force_per_query / index_per_query))
+
+
+if __name__ == "__main__":
+    opt = docopt(__doc__)
+    main([int(size) for size in opt['--vocabulary_sizes'].split(',')], int(opt['--n_queries']),
+         int(opt['--n_brute_force']), int(opt['--max_distance']), int(opt['--seed']))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This script benchmarks `schemas.load_dataset` against reading a whole raw
+file, selecting the columns and parsing the dates afterwards, on a synthetic
+claims file with the columns of the `claims` schema and extra columns. Every
+load is made in a new process so its peak resident memory can be compared.
+
+Usage: benchmark_schemas.py [--n_rows=<n_rows>] [--n_extra_columns=<n_extra_columns>] [--seed=<seed>]
+
+Options:
+--n_rows=<n_rows>  The number of rows of the claims file [default: 500000].
+--n_extra_columns=<n_extra_columns>  The number of columns that are not in the schema [default: 40].
+--seed=<seed>  The random seed [default: 123].
+
+Example:
+python src/common/benchmark_schemas.py --n_rows=500000
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from docopt import docopt
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.schemas import SCHEMAS, load_dataset, peak_rss
+
+
+def make_claims(n_rows, n_extra_columns, file_path, seed):
+    rng = np.random.RandomState(seed)
+    claims = pd.DataFrame({
+        'claim_id': np.arange(n_rows), 'paid_cost$': np.round(rng.lognormal(7, 1.5, n_rows), 2),
+        'empl_id': rng.randint(0, 5000, n_rows), 'day_of_week': rng.choice(['Mon', 'Tue', 'Wed', 'Thu', 'Fri'], n_rows),
+        'loss_date': (pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.randint(0, 2000, n_rows), unit='D')).strftime('%Y-%m-%d'),
+        'claim_status': rng.choice(['Open', 'Closed'], n_rows), 'line_no': rng.choice(['014', '099', '025', 'N19'], n_rows),
+        'bus_no': rng.randint(1000, 19999, n_rows), 'bus_fuel_type': rng.choice(['Diesel', 'Electric', 'CNG'], n_rows),
+        'bus_carry_capacity': rng.choice([40, 60, 80], n_rows)})
+    for i in range(n_extra_columns):
+        claims['extra_%d' % i] = rng.choice(['A description', 'Another one', 'Something else'], n_rows) if i % 2 else rng.rand(n_rows)
+    claims.to_csv(file_path, index=False)
+
+
+def load_whole(file_path):
+    """
+    The load of `prepare_data.py` before the schemas.
+    """
+    claims = pd.read_csv(file_path, low_memory=False)
+    claims = claims[SCHEMAS['claims'].columns]
+    claims['loss_date'] = pd.to_datetime(claims['loss_date'], format="%Y-%m-%d")
+    return claims
+
+
+def run(load, file_path):
+    """
+    It loads the claims in the current process.
+
+    Returns:
+    elapsed_time (float): The time of the load.
+    rss (float): The peak resident memory of the load above the start of the process in megabytes.
+    size (float): The memory of the data frame in megabytes.
+    """
+    baseline = peak_rss()
+    t = time.time()
+    claims = load_whole(file_path) if load == 'whole' else load_dataset('claims', file_path, report=False)
+    return time.time() - t, peak_rss() - baseline, claims.memory_usage(deep=True).sum() / 2 ** 20
+
+
+def main(n_rows, n_extra_columns, seed):
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, 'claims.csv')
+        make_claims(n_rows, n_extra_columns, file_path, seed)
+        print("Claims: %d rows, %d columns, %.1f MB on disk" % (
+            n_rows, len(SCHEMAS['claims'].columns) + n_extra_columns, os.path.getsize(file_path) / 2 ** 20))
+        for load in ['whole', 'schema']:
+            # a new process for every load, the peak memory of a process never goes down
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                elapsed_time, rss, size = executor.submit(run, load, file_path).result()
+            print("  %-6s %6.2f s, peak RSS +%7.1f MB, data frame %6.1f MB" % (load, elapsed_time, rss, size))
+
+
+if __name__ == "__main__":
+    opt = docopt(__doc__)
+    main(int(opt['--n_rows']), int(opt['--n_extra_columns']), int(opt['--seed']))
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+A fuzzy index that maps misspelled words to their canonical form. The index
+is a SymSpell-style deletion dictionary: every term of the vocabulary is
+stored under the strings that are left after deleting up to `max_distance` of
+its characters, so the candidates of a word are found by generating the
+deletions of the word and are then checked with the edit distance. A lookup
+costs a number of dictionary probes that depends on the length of the word
+and not on the size of the vocabulary.
+"""
+
+from itertools import combinations
+
+
+def edit_distance(first, second, max_distance=None):
+    """
+    It returns the optimal string alignment distance of two strings, the number
+    of insertions, deletions, substitutions and transpositions of adjacent
+    characters that turn one into the other.
+
+    Parameters:
+    first (str): A string.
+    second (str): A string.
+    max_distance (int): If it is given, the computation stops early and returns
+    max_distance + 1 once the distance is known to be larger.
+    """
+    if abs(len(first) - len(second)) > (max_distance if max_distance is not None else len(first) + len(second)):
+        return max_distance + 1
+    previous_previous = None
+    previous = list(range(len(second) + 1))
+    for i in range(1, len(first) + 1):
+        current = [i] + [0] * len(second)
+        for j in range(1, len(second) + 1):
+            cost = first[i - 1] != second[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (i > 1 and j > 1 and first[i - 1] == second[j - 2] and first[i - 2] == second[j - 1]):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if max_distance is not None and min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+def deletions(word, max_distance):
+    """
+    It returns the set of the strings left after deleting up to `max_distance` characters of a word.
+    """
+    variants = {word}
+    for n_deleted in range(1, min(max_distance, len(word)) + 1):
+        for positions in combinations(range(len(word)), n_deleted):
+            variants.add(''.join(character for i, character in enumerate(word) if i not in positions))
+    return variants
+
+
+def confidence(word, term, distance):
+    """
+    It returns the similarity of a word and a term from 0 to 1 given their edit distance.
+    """
+    return 1.0 - distance / max(len(word), len(term), 1)
+
+
+class FuzzyIndex:
+    """
+    A deletion dictionary over the terms of a canonical vocabulary.
+
+    Parameters:
+    terms (dict): A dictionary of term -> canonical form, e.g. the known spellings of
+    a word and the word itself. The keys are matched as they are, so they should be
+    in the same case as the words that are looked up.
+    counts (dict): The number of occurrences of the terms, a closer term wins and
+    between terms at the same distance the more common one wins.
+    max_distance (int): The maximum edit distance of a match.
+    min_confidence (float): The minimum `confidence` of a match.
+    """
+
+    def __init__(self, terms, counts=None, max_distance=2, min_confidence=0.8):
+        self.terms = dict(terms)
+        self.counts = counts or {}
+        self.max_distance = max_distance
+        self.min_confidence = min_confidence
+        self._deletions = {}
+        for term in self.terms:
+            for variant in deletions(term, max_distance):
+                self._deletions.setdefault(variant, []).append(term)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __contains__(self, word):
+        return word in self.terms
+
+    def match(self, word):
+        """
+        It finds the closest term of a word.
+
+        Returns:
+        term (str): The matched term or None if no term is within `max_distance`.
+        distance (int): The edit distance of the word and the term.
+        """
+        if word in self.terms:
+            return word, 0
+        best_term, best_distance, checked = None, self.max_distance + 1, set()
+        for variant in deletions(word, self.max_distance):
+            for term in self._deletions.get(variant, ()):
+                if term in checked:
+                    continue
+                checked.add(term)
+                distance = edit_distance(word, term, self.max_distance)
+                if distance < best_distance or (distance == best_distance and best_term is not None and
+                                                 (-self.counts.get(term, 0), term) < (-self.counts.get(best_term, 0), best_term)):
+                    best_term, best_distance = term, distance
+        if best_term is None:
+            return None, best_distance
+        return best_term, best_distance
+
+    def lookup(self, word):
+        """
+        It returns the canonical form of a word and the confidence of the match,
+        or None and the confidence of the closest term if it is below `min_confidence`.
+        """
+        term, distance = self.match(word)
+        if term is None:
+            return None, 0.0
+        match_confidence = confidence(word, term, distance)
+        if match_confidence < self.min_confidence:
+            return None, match_confidence
+        return self.terms[term], match_confidence
+
+    def get(self, word, default=None):
+        canonical, _ = self.lookup(word)
+        return default if canonical is None else canonical
+
+
+def fuzzy_normalizer(aliases, counts, min_confidence, min_count=5, max_distance=2):
+    """
+    It maps the distinct values of a column to their canonical form. The values
+    in the aliases are replaced by their canonical form, the common values are
+    kept and the rare values are matched with a `FuzzyIndex` of both.
+
+    Parameters:
+    aliases (dict): A dictionary of known spelling -> canonical form.
+    counts (dict): The number of occurrences of the distinct values.
+    min_confidence (float): The minimum confidence of a fuzzy match, None turns the fuzzy matching off.
+    min_count (int): The values that occur at least this many times are taken as correct.
+    max_distance (int): The maximum edit distance of a fuzzy match.
+
+    Returns:
+    normalized (dict): A dictionary of value -> canonical form for every value of the counts.
+    """
+    normalized = {value: aliases.get(value, value) for value in counts}
+    if min_confidence is None:
+        return normalized
+    terms = dict(aliases)
+    for canonical in set(aliases.values()):
+        terms.setdefault(canonical.lower(), canonical)
+    for value, count in counts.items():
+        if count >= min_count:
+            terms.setdefault(value, value)
+    index = FuzzyIndex(terms, counts, max_distance, min_confidence)
+    for value, count in counts.items():
+        if value not in aliases and count < min_count:
+            normalized[value] = index.get(value, value)
+    return normalized
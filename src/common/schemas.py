@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+The schemas of the raw TransLink data sets. Each schema declares the columns
+that the scripts use, compact dtypes for them and the format of their dates.
+`load_dataset` pushes them into the reader, so the other columns are never
+parsed and the repeated strings are stored as categories. The numeric columns
+are read as text and converted with `pd.to_numeric(errors='coerce')`, so a
+value like "N/A" or "12A" is a missing value instead of an error, as is a
+value that doesn't fit an integer dtype. The dates are
+parsed with their format right after the read. The columns are matched without regard to case and
+are returned with the names of the schema.
+"""
+
+import resource
+import numpy as np
+import pandas as pd
+from common.artifact_io import file_format, iter_table, read_table
+
+
+class DatasetSchema:
+    """
+    The columns of a raw data set that the scripts use.
+
+    Parameters:
+    columns (list): The names of the columns, in the order they are returned, None
+    for all the columns of the file in their order.
+    dtypes (dict): The dtype of some columns, e.g. 'category', 'float32' or the nullable 'Int32'.
+    The integer dtypes should be the nullable ones, the values that aren't numbers are missing.
+    dates (dict): The date format of the date columns.
+    read_options (dict): Other options of the reader, e.g. the delimiter.
+    """
+
+    def __init__(self, columns, dtypes=None, dates=None, read_options=None):
+        self.columns = columns
+        self.dtypes = dtypes or {}
+        self.dates = dates or {}
+        self.read_options = read_options or {}
+
+
+# the columns of claim_vehicle_employee_line.csv that may be typed in a way
+# that the type inference would mix between the parts of the file
+CLAIM_DTYPES = {'day_of_week': 'category', 'claim_status': 'category', 'line_no': 'category',
+                'bus_no': 'Int32', 'bus_fuel_type': 'category', 'bus_carry_capacity': 'Int16'}
+
+SCHEMAS = {
+    # claim_vehicle_employee_line.csv, a wide file: only these columns are tokenized and
+    # the text ones are given a dtype, so the chunked type inference of the default
+    # `low_memory=True` can't mix types and the file isn't tokenized in one buffer
+    'claims': DatasetSchema(
+        columns=['claim_id', 'paid_cost$', 'empl_id', 'day_of_week', 'loss_date', 'claim_status',
+                 'line_no', 'bus_no', 'bus_fuel_type', 'bus_carry_capacity'],
+        dtypes=CLAIM_DTYPES,
+        dates={'loss_date': '%Y-%m-%d'}),
+    # claim_vehicle_employee_line.csv with every column for `merge_claims.py`, as
+    # `claim_description.py` takes the columns of the merged data by position;
+    # the dates are kept as they are typed
+    'claim_lines': DatasetSchema(columns=None, dtypes=CLAIM_DTYPES),
+    # Preventable and Non Preventable_tabDelimited.txt
+    'collisions': DatasetSchema(
+        columns=['loss_location_at', 'preventable_nonpreventable', 'loss_location_on', 'city_of_incident',
+                 'loss_date', 'apta_desc', 'asset_vehicle_year', 'asset_manufacturer', 'claim_id', 'time_of_loss'],
+        dtypes={'preventable_nonpreventable': 'category', 'apta_desc': 'category',
+                'asset_vehicle_year': 'float32', 'asset_manufacturer': 'category'},
+        dates={'loss_date': '%d/%m/%Y'},
+        read_options={'delimiter': '\t'}),
+    # employee_experience_V2.csv
+    'employees': DatasetSchema(
+        columns=['employee_id', 'hire_date'],
+        dates={'hire_date': '%Y-%m-%d'}),
+    # Bus_spec.csv
+    'bus_spec': DatasetSchema(
+        columns=['bus_no', 'asset_class', 'asset_manufactmodel'],
+        dtypes={'bus_no': 'Int32', 'asset_class': 'category', 'asset_manufactmodel': 'category'}),
+}
+
+
+def peak_rss():
+    """
+    It returns the peak resident memory of the process in megabytes. The high
+    water mark of /proc is used on Linux as a spawned process inherits the
+    ru_maxrss of its parent, which is in kilobytes on Linux.
+    """
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def match_columns(names, columns):
+    """
+    It matches the columns of a schema to the names of the columns of a file without regard to case.
+
+    Returns:
+    file_names (dict): The name in the file of each column.
+    """
+    lower_names = {}
+    for name in names:
+        lower_names.setdefault(str(name).strip().lower(), name)
+    missing = [column for column in columns if column.lower() not in lower_names]
+    if missing:
+        raise ValueError("The data set should contain all of: ", missing)
+    return {column: lower_names[column.lower()] for column in columns}
+
+
+def is_numeric(dtype):
+    dtype = pd.api.types.pandas_dtype(dtype)
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+def to_numeric(values, dtype):
+    """
+    It converts a column to a numeric dtype. The values that aren't numbers, and
+    for an integer dtype the values that aren't integers or are out of its
+    range, are missing values.
+
+    Parameters:
+    values (Series): The column, e.g. read as text.
+    dtype (str): A numeric dtype, the integer ones should be nullable, e.g. 'Int32'.
+
+    Returns:
+    values (Series): The column with the dtype.
+    """
+    numbers = pd.to_numeric(values, errors='coerce')
+    dtype = pd.api.types.pandas_dtype(dtype)
+    if pd.api.types.is_integer_dtype(dtype):
+        numbers = numbers.astype('float64')
+        limits = np.iinfo(getattr(dtype, 'numpy_dtype', dtype))
+        numbers = numbers.where((numbers % 1 == 0) & numbers.between(limits.min, limits.max))
+    return numbers.astype(dtype)
+
+
+def schema_dtypes(schema, file_names, read_dtypes=True):
+    """
+    It returns the dtypes of the columns of a schema under their names in the file.
+
+    Parameters:
+    schema (DatasetSchema): The schema.
+    file_names (dict): The name in the file of each column, see `match_columns`.
+    read_dtypes (bool): Whether to give the dtypes of the reader, where the numeric
+    columns are text, or the dtypes of the loaded data set.
+    """
+    return {file_names[column]: str if read_dtypes and is_numeric(dtype) else dtype
+            for column, dtype in schema.dtypes.items()}
+
+
+def apply_schema(df, schema, file_names):
+    """
+    It converts the columns of a data frame with the names of the file to the
+    dtypes and the dates of a schema. The columns get the names of the schema,
+    unless the schema keeps all the columns of the file as they are.
+    """
+    if schema.columns is not None:
+        df = df[[file_names[column] for column in schema.columns]]
+    else:
+        df = df.copy()
+    for column, dtype in schema.dtypes.items():
+        values = df[file_names[column]]
+        if values.dtype != dtype:
+            df[file_names[column]] = to_numeric(values, dtype) if is_numeric(dtype) else values.astype(dtype)
+    for column, date_format in schema.dates.items():
+        # the dates are parsed with their format after the read, the `date_format` of the reader needs pandas 2
+        if not pd.api.types.is_datetime64_any_dtype(df[file_names[column]]):
+            df[file_names[column]] = pd.to_datetime(df[file_names[column]], format=date_format)
+    if schema.columns is not None:
+        df = df.rename(columns={file_name: column for column, file_name in file_names.items()})
+    return df
+
+
+def file_columns(schema, names):
+    """
+    It returns the name in the file of each column of a schema with a dtype or a
+    date, and of the other columns of the schema.
+    """
+    columns = list(schema.dtypes) + list(schema.dates)
+    if schema.columns is not None:
+        columns = schema.columns + [column for column in columns if column not in schema.columns]
+    return match_columns(names, list(dict.fromkeys(columns)))
+
+
+def sample_schema(schema, file_path, sample_rows=10000):
+    """
+    It completes a schema that keeps all the columns of a file with a dtype for
+    each of its other columns, from the first rows of the file, so every chunk
+    of the file is read with the same dtypes without reading the whole file
+    first. The integers are the nullable 'Int64' and the other numbers
+    'float64', both converted like the numeric columns of the schema. The other
+    columns, the columns without any value in the first rows and the categories
+    of the schema are text, as the levels of a chunk aren't the ones of the file.
+
+    Parameters:
+    schema (DatasetSchema): A schema with all the columns of the file.
+    file_path (str): A file path.
+    sample_rows (int): The number of rows the dtypes are taken from.
+
+    Returns:
+    schema (DatasetSchema): The schema with a dtype for every column.
+    """
+    sample = next(iter_table(file_path, sample_rows, **schema.read_options), None)
+    if sample is None:
+        return schema
+    file_names = file_columns(schema, sample.columns)
+    typed = set(file_names[column] for column in list(schema.dtypes) + list(schema.dates))
+    dtypes = {column: object if dtype == 'category' else dtype for column, dtype in schema.dtypes.items()}
+    for column in sample.columns:
+        if column in typed:
+            continue
+        values = sample[column]
+        if values.notna().any() and is_numeric(values.dtype):
+            dtypes[column] = 'Int64' if pd.api.types.is_integer_dtype(values.dtype) else 'float64'
+        else:
+            dtypes[column] = object
+    return DatasetSchema(schema.columns, dtypes, schema.dates, schema.read_options)
+
+
+def iter_dataset(schema, file_path, chunksize):
+    """
+    It reads a data set in chunks of `chunksize` rows with the dtypes and the dates of a schema.
+    """
+    header = next(iter_table(file_path, 1, **schema.read_options))
+    file_names = file_columns(schema, header.columns)
+    read_options = dict(schema.read_options)
+    if file_format(file_path) == 'csv':
+        read_options['dtype'] = schema_dtypes(schema, file_names)
+    columns = None if schema.columns is None else list(file_names.values())
+    for chunk in iter_table(file_path, chunksize, columns=columns, **read_options):
+        yield apply_schema(chunk, schema, file_names)
+
+
+def load_dataset(name, file_path, report=True):
+    """
+    It reads the columns of a raw data set with the dtypes and the dates of its schema.
+
+    Parameters:
+    name (str): The name of the schema in `SCHEMAS`.
+    file_path (str): A file path, a CSV file is read with the columns and the dtypes
+    pushed into the reader, the numeric columns as text, the other formats are
+    converted after they are read.
+    report (bool): Whether to print the size of the data set and the peak memory of the load.
+
+    Returns:
+    df (DataFrame): The columns of the schema.
+    """
+    schema = SCHEMAS[name]
+    rss_before = peak_rss()
+    if file_format(file_path) == 'csv':
+        header = pd.read_csv(file_path, nrows=0, **schema.read_options).columns
+        file_names = file_columns(schema, header)
+        df = read_table(file_path, columns=None if schema.columns is None else list(file_names.values()),
+                        dtype=schema_dtypes(schema, file_names), **schema.read_options)
+    else:
+        df = read_table(file_path)
+        file_names = file_columns(schema, df.columns)
+    df = apply_schema(df, schema, file_names)
+    if report:
+        rss_after = peak_rss()
+        print("Loaded {0}: {1} rows, {2} columns, {3:.1f} MB in memory, peak RSS {4:.1f} MB (+{5:.1f} MB)".format(
+            name, len(df), len(df.columns), df.memory_usage(deep=True).sum() / 2 ** 20, rss_after,
+            rss_after - rss_before))
+    return df
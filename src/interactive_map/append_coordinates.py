@@ -1,108 +1,52 @@
 #!/usr/bin/env python
 # coding: utf-8
 
-"""This script creates a csv file containing the coordination of the incidents. 
+"""This script creates a data set containing the coordination of the incidents. 
 It takes the street names and the city names and convert them to formatted addresses
 including long and lat of the incidents. Assumes `get-data.py` and `prepare_data.py`
-are run before. A google maps API key is also required. 
+are run before. A google maps API key or a local gazetteer of intersections is also required. 
 
-Usage: append_coordinates.py --input_file_path=<input_file_path> --output_file_path=<output_file_path> --api_key=<api_key>
+Usage: append_coordinates.py --input_file_path=<input_file_path> --output_file_path=<output_file_path> [--api_key=<api_key>] [--gazetteer_path=<gazetteer_path>] [--cache_file_path=<cache_file_path>] [--queries_per_second=<queries_per_second>] [--max_in_flight=<max_in_flight>] [--max_retries=<max_retries>] [--journal_path=<journal_path>] [--export=<export>]
 
 Options:
 
 --input_file_path=<input_file_path>     A file path containing the street and city names of the incident locations.
---output_file_path=<output_file_path>       A file path for coordinates of the incident locations.
+--output_file_path=<output_file_path>       A file path for coordinates of the incident locations, in the format of its extension.
+--export=<export>   The comma separated extensions of other formats to write the coordinates in too, the dashboard reads csv.
 --api_key=<api_key>   The google maps API key to make request. 
+--gazetteer_path=<gazetteer_path>   A CSV or Parquet file of intersections (street1, street2, city, lat, long) to geocode offline, the API is only asked for the queries it can't match.
+--cache_file_path=<cache_file_path>     A file path for the coordinate cache [default: results/processed_data/coordinate_cache.csv].
+--queries_per_second=<queries_per_second>   The maximum rate of the requests to the API [default: 10].
+--max_in_flight=<max_in_flight>     The maximum number of concurrent requests [default: 8].
+--max_retries=<max_retries>     The number of retries for quota and transient errors [default: 5].
+--journal_path=<journal_path>   A file path for the journal of resolved queries, an interrupted run replays it and it is removed once the output is written. Defaults to the output file path with a `.journal` suffix.
 
 Example: 
 python src/interactive_map/append_coordinates.py \
-    --input_file "results/processed_data/collision_with_claim_and_employee_info.csv" \
-    --output_file "results/processed_data/collision_locations_with_coordinates.csv" \
+    --input_file "results/processed_data/collision_with_claim_and_employee_info.parquet" \
+    --output_file "results/processed_data/collision_locations_with_coordinates.parquet" \
+    --export csv \
     --api_key ""
 """
 
 import pandas as pd
 import numpy as np
 from docopt import docopt
-import glob
 import os
+import sys
 import googlemaps
 from pathlib import Path
+from geocode_cache import GeocodeCache
+from geocoding_engine import GeocodingEngine
+from result_journal import ResultJournal
+from offline_geocoder import GazetteerGeocoder
+from street_canonicalizer import build_query, geocoding_query
 
-opt = docopt(__doc__)
-
-
-
-def get_location(google_maps_client, street1, street2, city, province="BC"):
-    '''
-    It creates longitude, latitude, and formatted address of the given 2 streets
-    that intersect and the city name of these streets. It also requires the province
-    name of the incident's location. To speed up the process, it first looks at the
-    cache file and if it doesn't exist in the cache file, then it requests google maps API.  
-
-    Parameters:
-    google_maps_client (googlemaps.client.Client): client to make queries to Google GeoCoding API
-    street1 (str): The name of the first street of the intersection point. 
-    street2 (str): The name of the second street of the intersection point.
-    city (str): The city that the incident happened. 
-    province (str): The province that the incident happened.
-
-    Returns:
-    locations (dict):  A dictionary contains latitude, longitude, and the formatted 
-    address of the incident's location.
-
-
-    Example: get_location("Dunsmuir St", "Granville St", "Vancouver") = 
-    {'lat': 49.2836214,
-    'long': -123.1164681,
-    'address': 'Granville St & Dunsmuir St, Vancouver, BC V7Y 1K4, Canada'}
-
-    '''
-    query_format = '{0} & {1}, {2}, {3}'
-    query = query_format.format(street1, street2, city, province)
-    # look up the cached file to speed up the process
-    coordinate_cache_df = pd.read_csv(
-        "results/processed_data/coordinate_cache.csv")
-    cached_coordinates = coordinate_cache_df.loc[coordinate_cache_df['query'] == query]
-    if (cached_coordinates.empty):
-        location = get_location_from_google_maps(google_maps_client, query)
-        location["source"] = "google"
-        # write it to cache too
-    else:
-        location_from_cache = dict(cached_coordinates.iloc[0])
-        location = {'lat': location_from_cache['lat'], 'long': location_from_cache['long'],
-                    "address": location_from_cache['formatted_address'], "source": "cache"}
-
-    return location
-
-
-def get_location_from_google_maps(google_maps_client, query):
-    '''
-    It is a helper function to create longitude, latitude, and formatted address
-    of the given 2 streets that intersect and the city name of these streets to
-    request google maps API. It also requires the province name of the incident's
-    location.  
-
-    Parameters:
-    google_maps_client (): 
-    query (str): The address of the incident in the 'street1 & street2, city, province' format. 
-
-    Returns:
-    location (dict): A dictionary contains latitude, longitude, and the formatted 
-    address of the incident's location.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.artifact_io import read_table, write_table
 
+opt = docopt(__doc__)
 
-    Example: get_location("Dunsmuir St & Granville St, Vancouver") = 
-    {'lat': 49.2836214,
-    'long': -123.1164681,
-    'address': 'Granville St & Dunsmuir St, Vancouver, BC V7Y 1K4, Canada'}
-
-    '''
-    geocode_result = google_maps_client.geocode(query)
-    address = geocode_result[0]['formatted_address']
-    geometry = geocode_result[0]['geometry']['location']
-    location  = {'lat': geometry['lat'], 'long': geometry['lng'], "address": address}
-    return location
 
 
 def create_dirs_if_not_exists(file_path_list):
@@ -116,10 +60,6 @@ def create_dirs_if_not_exists(file_path_list):
         Path(os.path.dirname(path)).mkdir(parents=True, exist_ok=True)
 
 
-def check_if_file_does_not_exists(file_path):
-    return len(glob.glob(file_path)) == 0
-
-
 def printProgressBar(iteration, total, prefix='Progress:', suffix='Completed', decimals=1, length=50, fill='█', printEnd="\r"):
     """
     A helper function to follow the process while getting the long and lat of the locations. 
@@ -145,36 +85,41 @@ def printProgressBar(iteration, total, prefix='Progress:', suffix='Completed', d
     if iteration == total:
         print()
 
-def main(input_file_path, output_file_path, api_key):
+def main(input_file_path, output_file_path, api_key, cache_file_path, queries_per_second=10,
+         max_in_flight=8, max_retries=5, journal_path=None, gazetteer_path=None,
+         exports=()):
     '''
     It takes a path for the input file and creates longitude, latitude, and formatted
     addresses of the locations of the incidents and then writes the resulting data frame
-    to the given output file path. It requires a valid google maps API key.
+    to the given output file path. It requires a valid google maps API key or a gazetteer.
 
     Parameters:
     input_file_path (str): A path of the input file that contains street and city information.
     output_file_path (str): A file path for resulting dataset.
+    api_key (str): The google maps API key, None to geocode only from the gazetteer.
+    cache_file_path (str): A file path for the coordinate cache.
+    queries_per_second (float): The maximum rate of the requests to the API.
+    max_in_flight (int): The maximum number of concurrent requests.
+    max_retries (int): The number of retries for quota and transient errors.
+    journal_path (str): A file path for the journal of resolved queries.
+    gazetteer_path (str): A file path for the gazetteer of the offline geocoder.
+    exports (list): The extensions of other formats to write the resulting dataset in too, e.g. ['csv'].
     '''
 
     # create given output file if it doesn't exist
     create_dirs_if_not_exists([output_file_path])
 
-    if(check_if_file_does_not_exists(output_file_path)):
-        # get cleaned data
-        try:
-            target_location_df = pd.read_csv(input_file_path)
-        except:
-            raise ValueError("The input file does not exist or is not tab seperated.")
-        # target_location_df = get_clean_data_v2(input_file_path)
+    # get cleaned data
+    try:
+        target_location_df = read_table(input_file_path)
+    except:
+        raise ValueError("The input file does not exist or is not tab seperated.")
 
-        # prepare data frame
-        target_location_df["lat"] = None
-        target_location_df["long"] = None
-        target_location_df["formatted_address"] = None
-        target_location_df.to_csv(output_file_path, index=False)
+    # prepare data frame
+    for column in ["lat", "long", "formatted_address"]:
+        if column not in target_location_df.columns:
+            target_location_df[column] = np.nan
 
-    # read current output_file
-    target_location_df = pd.read_csv(output_file_path)
     # check whether it has all required columns
     columns_list = ['employee_id', 'hire_date', 'claim_id', 'paid_cost$', 'day_of_week',
        'claim_status', 'line_no', 'bus_no', 'bus_fuel_type',
@@ -186,50 +131,128 @@ def main(input_file_path, output_file_path, api_key):
         raise ValueError(
             " Target data path should contain all of: ", columns_list)
 
-    try:
-        google_maps_client = googlemaps.Client(key=api_key)
-    except:
-        raise ValueError("You should use a valid Google maps API key.")
-    
+    google_maps_client = None
+    if api_key:
+        try:
+            google_maps_client = googlemaps.Client(key=api_key)
+        except:
+            raise ValueError("You should use a valid Google maps API key.")
+    if gazetteer_path is not None:
+        # the rate limit is only for the requests the gazetteer sends to the API
+        geocoding_client = GazetteerGeocoder.from_file(gazetteer_path, fallback_client=google_maps_client,
+                                                       queries_per_second=queries_per_second)
+    elif google_maps_client is not None:
+        geocoding_client = google_maps_client
+    else:
+        raise ValueError("You should give a Google maps API key or a gazetteer.")
+
+    # the cache is read once and new results are appended to it
+    cache = GeocodeCache(cache_file_path, key_function=build_query)
+    # every query resolved by the geocoder is journaled, a previous interrupted run is replayed from it
+    if journal_path is None:
+        journal_path = output_file_path + '.journal'
+    journal = ResultJournal(journal_path)
+    journaled_locations = journal.replay()
+
+    # the same intersections repeat across claims, so each distinct canonical query is resolved once
+    query_columns = ['loss_location_at', 'loss_location_on', 'city_of_incident']
+    if 'query_key' not in target_location_df.columns:
+        target_location_df['query_key'] = [build_query(street1, street2, city) for street1, street2, city
+                                           in target_location_df[query_columns].itertuples(index=False)]
+    missing_rows = target_location_df['lat'].isna()
+    unique_queries = target_location_df.loc[missing_rows, ['query_key'] + query_columns].drop_duplicates('query_key')
+
+    queries = {query: (street1, street2, city)
+               for query, street1, street2, city in unique_queries.itertuples(index=False)}
+    # the canonical query is only the key, the geocoder is asked with the address as it is typed
+    geocoding_queries = {geocoding_query(*streets): query for query, streets in queries.items()}
+
     # to follow whether the process is working properly.
-    error_count = 0
-    cache_hit_count = 0
-    skipped_count = 0
-    total = target_location_df.shape[0]
+    progress = {'completed': 0, 'errors': 0}
+    skipped_count = int((~missing_rows).sum())
+    total = len(queries)
     suffix_format = "Completed {0}/{1} Errors:{2} CacheHit:{3} Skipped:{4}"
+
+    # answer what we can from the journal and the cache before sending anything to the API
+    locations = {}
+    for query in queries:
+        if query in journaled_locations:
+            locations[query] = journaled_locations[query]
+            continue
+        # the cache hits are in the cache file already, they aren't journaled
+        location = cache.get(query)
+        if location is not None:
+            locations[query] = location
+    cache_hit_count = len(locations)
+    progress['completed'] = cache_hit_count
     # to see the process of the requests
-    printProgressBar(0, total, suffix=suffix_format.format(0, total, error_count, cache_hit_count, skipped_count))
-    for index, row in target_location_df.iterrows():
-        suffix = "Errors:{1} CacheHit:{2} Skipped:{3}"
-        printProgressBar(index, total, suffix=suffix_format.format(index, total, error_count, cache_hit_count, skipped_count))
-        current_lat_value = target_location_df.loc[index, 'lat']
-        if((current_lat_value == None) | (np.isnan(current_lat_value))):
-            # print("Processing ", (index+1), "/", target_location_df.shape[0], "Getting coordinates for Street1:", row['street1'], ", Street2: ", row['street2'], ", City:", row['city'])
-            try:
-                location = get_location(google_maps_client, row['loss_location_at'], row['loss_location_on'], row['city_of_incident'])
-                if(location["source"] == "cache"):
-                    cache_hit_count += 1
-                target_location_df.loc[index, 'lat'] = location['lat']
-                target_location_df.loc[index, 'long'] = location['long']
-                target_location_df.loc[index, 'formatted_address'] = location['address']
-            except Exception as e:
-                error_count += 1
-                error_message = 'Error in processing {0}/{1}, while getting coordinates for Street1:{2} & Street2:{3} and City:{4}'.format(
-                    index+1, target_location_df.shape[0], row['loss_location_at'], row['loss_location_on'], row['city_of_incident'])
-                print('\r', error_message, " " * (200-len(error_message)))
+    printProgressBar(cache_hit_count, total, suffix=suffix_format.format(cache_hit_count, total, 0, cache_hit_count, skipped_count))
+
+    def on_result(geocoded_query, location, error):
+        query = geocoding_queries[geocoded_query]
+        progress['completed'] += 1
+        if location is not None:
+            locations[query] = location
+            street1, street2, city = queries[query]
+            # write it to cache too, fuzzy gazetteer matches are not worth caching
+            if location['source'] == 'google':
+                cache.put(query, street1, street2, city, location)
+            journal.append(query, street1, street2, city, location)
         else:
-            skipped_count += 1
-            # print("Processing ", (index+1), "/", target_location_df.shape[0], "Row already has coordinates, skipping the request.")
-
-        # writing batches of 40 to avoid too much I/O time, if script terminates in the middle, next execution can continue where previous attempt interrupted.
-        if(index % 40 == 0):
-            target_location_df.to_csv(output_file_path, index=False)
-
-    target_location_df.to_csv(output_file_path, index=False)
+            # the failures are counted on the progress bar and written to the errors file at the end,
+            # a line per failure would break the bar while the workers are running
+            progress['errors'] += 1
+        # the journal syncs itself in batches of 40, if script terminates in the middle, next execution can continue where previous attempt interrupted.
+        if(progress['completed'] % 40 == 0):
+            cache.flush()
+        printProgressBar(progress['completed'], total, suffix=suffix_format.format(
+            progress['completed'], total, progress['errors'], cache_hit_count, skipped_count))
+
+    # the rate limit is for the API, the gazetteer applies it to its fallback requests itself
+    if isinstance(geocoding_client, GazetteerGeocoder):
+        queries_per_second = None
+    engine = GeocodingEngine(geocoding_client, queries_per_second=queries_per_second,
+                             max_in_flight=max_in_flight, max_retries=max_retries)
+    engine.resolve_all([geocoded_query for geocoded_query, query in geocoding_queries.items()
+                        if query not in locations], on_result=on_result)
+
+    resolved_locations = [[query, location['lat'], location['long'], location['address']]
+                          for query, location in locations.items()]
+
+    # broadcast the coordinates of each distinct query back to all of its incidents
+    if resolved_locations:
+        resolved_df = pd.DataFrame(resolved_locations, columns=['query_key', 'lat', 'long', 'formatted_address'])
+        target_location_df = target_location_df.merge(resolved_df, on='query_key', how='left', suffixes=('', '_resolved'))
+        for column in ['lat', 'long', 'formatted_address']:
+            target_location_df[column] = target_location_df[column].fillna(target_location_df[column + '_resolved'])
+        target_location_df = target_location_df.drop(columns=[column + '_resolved' for column in ['lat', 'long', 'formatted_address']])
+
+    # the output is written only once, all the progress until here is in the journal and the cache.
+    # the query key is dropped to keep the column layout that `merge_claims.py` and
+    # `claim_description.py` expect.
+    target_location_df = target_location_df.drop(columns=['query_key'])
+    write_table(target_location_df, output_file_path, exports=exports)
+    # the results are in the output now, the journal is only for an interrupted run
+    journal.remove()
+    cache.close()
+    # keep the failed queries and their errors for a later look
+    if engine.errors:
+        errors_file_path = os.path.splitext(output_file_path)[0] + '_errors.csv'
+        pd.DataFrame(list(engine.errors.items()), columns=['query', 'error']).to_csv(errors_file_path, index=False)
+        print("Failed queries:{0} written to {1}".format(len(engine.errors), errors_file_path))
+    if isinstance(geocoding_client, GazetteerGeocoder):
+        print("Gazetteer exact:{0} Fuzzy:{1} Fallbacks:{2}".format(
+            geocoding_client.exact_matches, geocoding_client.fuzzy_matches, geocoding_client.fallbacks))
+    missing_count = int(missing_rows.sum())
+    print("Incidents:{0} DistinctQueries:{1} DedupRatio:{2:.2f}".format(
+        missing_count, total, missing_count / total if total else 0.0))
+    print("Cache entries:{entries} Hits:{hits} Misses:{misses} Evictions:{evictions} HitRatio:{hit_ratio:.2%}".format(**cache.stats()))
 
 
 
 
 
 if __name__ == "__main__":
-    main(opt["--input_file_path"], opt["--output_file_path"], opt["--api_key"])
+    main(opt["--input_file_path"], opt["--output_file_path"], opt["--api_key"], opt["--cache_file_path"],
+         float(opt["--queries_per_second"]), int(opt["--max_in_flight"]), int(opt["--max_retries"]),
+         opt["--journal_path"], opt["--gazetteer_path"], opt["--export"].split(',') if opt["--export"] else ())
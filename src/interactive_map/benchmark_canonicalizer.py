@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""This script benchmarks the street canonicalizer on a synthetic corpus of noisy
+intersection addresses. It compares the raw queries built from the street names
+as they are typed with the canonical queries of `street_canonicalizer.py` and
+reports the cache hit rate and the number of API calls of both.
+
+Usage: benchmark_canonicalizer.py [--n_incidents=<n_incidents>] [--n_intersections=<n_intersections>] [--seed=<seed>]
+
+Options:
+
+--n_incidents=<n_incidents>     The number of synthetic incidents [default: 50000].
+--n_intersections=<n_intersections>     The number of distinct synthetic intersections [default: 2000].
+--seed=<seed>   The random seed [default: 123].
+
+Example:
+python src/interactive_map/benchmark_canonicalizer.py --n_incidents=50000
+"""
+
+import random
+import time
+from docopt import docopt
+from street_canonicalizer import build_query
+
+NAMES = ['Granville', 'Dunsmuir', 'Robson', 'Hastings', 'Broadway', 'Kingsway', 'Main', 'Cambie',
+         'Oak', 'Knight', 'Fraser', 'Victoria', 'Commercial', 'Nanaimo', 'Rupert', 'Boundary',
+         'Marine', 'Lonsdale', 'Georgia', 'Pender', 'Burrard', 'Davie', 'Denman', 'Hornby',
+         'Howe', 'Seymour', 'Richards', 'Homer', 'Arbutus', 'Macdonald', 'Dunbar', 'Alma',
+         'Clark', 'Renfrew', 'Slocan', 'Joyce', 'Royal Oak', 'Willingdon', 'Gilmore', 'Lougheed']
+SUFFIXES = [('St', 'Street'), ('Ave', 'Avenue'), ('Rd', 'Road'), ('Dr', 'Drive'), ('Blvd', 'Boulevard'), ('Hwy', 'Highway')]
+DIRECTIONALS = [('', ''), ('W', 'West'), ('E', 'East'), ('N', 'North'), ('S', 'South')]
+CITIES = ['Vancouver', 'Burnaby', 'Surrey', 'Richmond', 'North Vancouver', 'New Westminster', 'Coquitlam']
+
+
+def ordinal(number):
+    if number % 100 in (11, 12, 13):
+        return '{0}th'.format(number)
+    return '{0}{1}'.format(number, {1: 'st', 2: 'nd', 3: 'rd'}.get(number % 10, 'th'))
+
+
+def make_street(rng):
+    name = ordinal(rng.randint(1, 80)) if rng.random() < 0.2 else rng.choice(NAMES)
+    return rng.choice(DIRECTIONALS), name, rng.choice(SUFFIXES)
+
+
+def render_street(street, rng):
+    """
+    It types a street name the way it shows up in the collision data: random
+    case, short or long street type and directional, missing ordinal suffixes,
+    extra spaces and periods.
+    """
+    directional, name, suffix = street
+    if name[0].isdigit() and rng.random() < 0.5:
+        name = name[:-2]
+    words = [directional[rng.random() < 0.5], name, suffix[rng.random() < 0.5]]
+    if rng.random() < 0.1:
+        words[2] = words[2] + '.'
+    text = (' ' if rng.random() < 0.9 else '  ').join(word for word in words if word)
+    case = rng.random()
+    if case < 0.4:
+        text = text.upper()
+    elif case < 0.5:
+        text = text.lower()
+    return text
+
+
+def main(n_incidents, n_intersections, seed):
+    rng = random.Random(seed)
+    intersections = [(make_street(rng), make_street(rng), rng.choice(CITIES)) for _ in range(n_intersections)]
+
+    incidents = []
+    for _ in range(n_incidents):
+        street1, street2, city = rng.choice(intersections)
+        if rng.random() < 0.5:
+            street1, street2 = street2, street1
+        city = city.upper() if rng.random() < 0.3 else city
+        incidents.append((render_street(street1, rng), render_street(street2, rng), city))
+
+    query_format = '{0} & {1}, {2}, {3}'
+    t = time.time()
+    raw_queries = [query_format.format(street1, street2, city, 'BC') for street1, street2, city in incidents]
+    raw_time = time.time() - t
+    t = time.time()
+    canonical_queries = [build_query(street1, street2, city) for street1, street2, city in incidents]
+    canonical_time = time.time() - t
+
+    print("Incidents: {0}, distinct intersections: {1}".format(n_incidents, n_intersections))
+    for label, queries, elapsed in [('raw', raw_queries, raw_time), ('canonical', canonical_queries, canonical_time)]:
+        # every first sight of a query is a cache miss and an API call
+        api_calls = len(set(queries))
+        hit_rate = 1 - api_calls / len(queries)
+        print("{0:>10}: API calls {1:>7}, cache hit rate {2:.2%}, key time {3:.3f} s ({4:.1f} us/query)".format(
+            label, api_calls, hit_rate, elapsed, 1e6 * elapsed / len(queries)))
+    reduction = 1 - len(set(canonical_queries)) / len(set(raw_queries))
+    print("API call reduction: {0:.2%}".format(reduction))
+
+
+if __name__ == "__main__":
+    opt = docopt(__doc__)
+    main(int(opt["--n_incidents"]), int(opt["--n_intersections"]), int(opt["--seed"]))
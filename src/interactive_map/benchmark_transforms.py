@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This script benchmarks the vectorized transforms of `transforms.py` against
+the row-wise `apply` functions and the chain of `replace` calls that
+`prepare_data.py` used before, on synthetic incidents with missing dates and
+misspelled city names. It checks that both give the same columns.
+
+Usage: benchmark_transforms.py [--n_rows=<n_rows>] [--city_aliases_path=<city_aliases_path>] [--seed=<seed>]
+
+Options:
+--n_rows=<n_rows>  The number of incidents [default: 1000000].
+--city_aliases_path=<city_aliases_path>  A file path for the known spellings of each city [default: src/interactive_map/city_aliases.json].
+--seed=<seed>  The random seed [default: 123].
+
+Example:
+python src/interactive_map/benchmark_transforms.py --n_rows=1000000
+"""
+
+import json
+import math
+import time
+from docopt import docopt
+import numpy as np
+import pandas as pd
+from transforms import (coalesce_loss_date, experience_in_months, experience_levels, load_city_aliases,
+                        normalize_cities)
+
+
+def compare_loss_date(row):
+    if (row['loss_date_x'] is not pd.NaT) & (row['loss_date_y'] is pd.NaT):
+        val = row.loss_date_x
+    else:
+        val = row.loss_date_y
+    return val
+
+
+def get_experience_in_months(row):
+    difference = row['loss_date'] - row['hire_date']
+    return round(difference.days / 30, 0)
+
+
+def legacy_cities(cities, city_aliases_path):
+    """
+    The city names after one `replace` call per city.
+    """
+    with open(city_aliases_path) as aliases_file:
+        spellings = json.load(aliases_file)
+    cities = cities.str.lower().str.strip()
+    for city, aliases in spellings.items():
+        cities = cities.replace(aliases, city)
+    return cities
+
+
+def synthetic_incidents(n_rows, city_aliases, rng):
+    def dates(start, n_days, missing):
+        values = pd.Series(pd.Timestamp(start) + pd.to_timedelta(rng.randint(0, n_days, n_rows), unit='D'))
+        return values.mask(rng.rand(n_rows) < missing)
+
+    spellings = np.array(list(city_aliases) + ['Vancouver ', 'BURNABY', 'abbotsford', 'vancuover'], dtype=object)
+    return pd.DataFrame({'loss_date_x': dates('2015-01-01', 2000, 0.05), 'loss_date_y': dates('2015-01-01', 2000, 0.3),
+                         'hire_date': dates('1995-01-01', 9000, 0.0),
+                         'city_of_incident': pd.Series(rng.choice(spellings, n_rows)).mask(rng.rand(n_rows) < 0.02)})
+
+
+def main(n_rows, city_aliases_path, seed):
+    city_aliases = load_city_aliases(city_aliases_path)
+    df = synthetic_incidents(n_rows, city_aliases, np.random.RandomState(seed))
+    print("Incidents: %d" % n_rows)
+
+    def report(name, legacy, vectorized):
+        t = time.time()
+        expected = legacy()
+        legacy_time = time.time() - t
+        t = time.time()
+        result = vectorized()
+        vectorized_time = time.time() - t
+        identical = result.astype(object).equals(expected.astype(object))
+        print("  %-20s apply/replace %7.2f s, vectorized %6.3f s (%.0fx), identical: %s" % (
+            name, legacy_time, vectorized_time, legacy_time / vectorized_time, identical))
+        return result
+
+    df['loss_date'] = report('loss_date', lambda: df.apply(compare_loss_date, axis=1),
+                             lambda: coalesce_loss_date(df['loss_date_x'], df['loss_date_y']))
+    months = report('experience_in_months', lambda: df.apply(get_experience_in_months, axis=1),
+                    lambda: experience_in_months(df['loss_date'], df['hire_date']))
+    report('experience_levels', lambda: pd.cut(months, bins=[0, 6, 18, 60, math.inf],
+                                               labels=['< 6 months', '6-18 months', '18-60 months', '> 60 months']),
+           lambda: experience_levels(months))
+    report('city_of_incident', lambda: legacy_cities(df['city_of_incident'], city_aliases_path),
+           lambda: normalize_cities(df['city_of_incident'], city_aliases))
+
+
+if __name__ == "__main__":
+    opt = docopt(__doc__)
+    main(int(opt['--n_rows']), opt['--city_aliases_path'], int(opt['--seed']))
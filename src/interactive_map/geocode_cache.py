@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+A geocode cache for `append_coordinates.py`. The cache is loaded from the
+coordinate cache file once, kept in memory as a dictionary keyed by the query
+string and every new result is appended to the same file so that the next run
+can reuse it. The file keeps the columns of `coordinate_cache.csv`:
+query, street1, street2, city, lat, long, formatted_address.
+"""
+
+import csv
+import os
+from collections import OrderedDict
+from pathlib import Path
+
+CACHE_COLUMNS = ['query', 'street1', 'street2', 'city', 'lat', 'long', 'formatted_address']
+
+
+class GeocodeCache:
+    """
+    An in-memory geocode cache backed by an append-only CSV log. Lookups are
+    dictionary lookups by query, new entries are appended to the log and the
+    log is fsynced on `flush` and `close`.
+
+    Parameters:
+    file_path (str): The path of the cache file.
+    max_entries (int): The maximum number of entries kept in memory. The least
+    recently used entries are evicted when it is exceeded. Evicted entries stay
+    in the file and they are loaded again in the next run. None means unbounded.
+    key_function (function): Creates the key of a loaded row from its street1, street2
+    and city, e.g. to re-key the rows written with an older query format. None keeps
+    the query column as the key.
+    """
+
+    def __init__(self, file_path, max_entries=None, key_function=None):
+        self.file_path = file_path
+        self.max_entries = max_entries
+        self.key_function = key_function
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._log = None
+        self._load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, query):
+        return query in self._entries
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _load(self):
+        """
+        It reads the cache file once. Rows that can't be parsed, e.g. a row
+        torn by an interrupted run, are skipped.
+        """
+        if not os.path.exists(self.file_path):
+            return
+        with open(self.file_path, newline='') as cache_file:
+            for row in csv.DictReader(cache_file):
+                try:
+                    location = {'lat': float(row['lat']), 'long': float(row['long']),
+                                'address': row['formatted_address']}
+                except (TypeError, ValueError, KeyError):
+                    continue
+                if self.key_function is None:
+                    query = row['query']
+                else:
+                    query = self.key_function(row['street1'], row['street2'], row['city'])
+                self._store(query, location)
+
+    def _store(self, query, location):
+        self._entries[query] = location
+        self._entries.move_to_end(query)
+        if self.max_entries is not None and len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, query):
+        """
+        It returns the cached location of the query.
+
+        Parameters:
+        query (str): The address in the 'street1 & street2, city, province' format.
+
+        Returns:
+        location (dict): A dictionary contains latitude, longitude, formatted address
+        and the source of the location, or None if the query is not in the cache.
+        """
+        location = self._entries.get(query)
+        if location is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(query)
+        return dict(location, source='cache')
+
+    def put(self, query, street1, street2, city, location):
+        """
+        It adds a location to the cache and appends it to the cache file.
+
+        Parameters:
+        query (str): The address in the 'street1 & street2, city, province' format.
+        street1 (str): The name of the first street of the intersection point.
+        street2 (str): The name of the second street of the intersection point.
+        city (str): The city of the intersection point.
+        location (dict): A dictionary contains latitude, longitude, and the formatted address.
+        """
+        self._store(query, {'lat': location['lat'], 'long': location['long'],
+                            'address': location['address']})
+        if self._log is None:
+            Path(os.path.dirname(self.file_path) or '.').mkdir(parents=True, exist_ok=True)
+            write_header = not os.path.exists(self.file_path) or os.path.getsize(self.file_path) == 0
+            torn_row = not write_header and not self._ends_with_newline()
+            self._log = open(self.file_path, 'a', newline='')
+            self._writer = csv.writer(self._log, lineterminator='\n')
+            if write_header:
+                self._writer.writerow(CACHE_COLUMNS)
+            elif torn_row:
+                # start a new line so a torn row doesn't swallow the next entry
+                self._log.write('\n')
+        self._writer.writerow([query, street1, street2, city,
+                               location['lat'], location['long'], location['address']])
+
+    def _ends_with_newline(self):
+        with open(self.file_path, 'rb') as cache_file:
+            cache_file.seek(-1, os.SEEK_END)
+            return cache_file.read(1) == b'\n'
+
+    def flush(self):
+        """
+        It makes the appended entries durable.
+        """
+        if self._log is not None:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+
+    def close(self):
+        if self._log is not None:
+            self.flush()
+            self._log.close()
+            self._log = None
+
+    def stats(self):
+        """
+        It returns the hit, miss and eviction counters of the cache.
+        """
+        lookups = self.hits + self.misses
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0}
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+A concurrent geocoding engine for `append_coordinates.py`. Queries are sent
+from a thread pool with a bounded number of requests in flight, a token bucket
+keeps the request rate under the API quota and quota or transient errors are
+retried with exponential backoff. Any object with a `geocode(query)` method that
+returns results in the Google Geocoding format can be used as the client, e.g.
+`googlemaps.Client` or `StubGeocoder` for tests and benchmarks.
+"""
+
+import hashlib
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# statuses and exception names of the googlemaps client that are worth retrying
+RETRYABLE_STATUSES = {'OVER_QUERY_LIMIT', 'UNKNOWN_ERROR', 'RESOURCE_EXHAUSTED'}
+RETRYABLE_ERRORS = {'Timeout', 'TransportError', '_OverQueryLimit', '_RetriableRequest'}
+
+
+class TokenBucket:
+    """
+    A thread safe token bucket rate limiter.
+
+    Parameters:
+    rate (float): The number of tokens added per second.
+    capacity (int): The maximum number of tokens, i.e. the allowed burst size.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1, rate))
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        It blocks until a token is available and takes it.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_time = (1 - self._tokens) / self.rate
+            time.sleep(wait_time)
+
+
+class StubGeocoder:
+    """
+    A local geocoder that mimics `googlemaps.Client.geocode`. Coordinates are
+    derived from the hash of the query so that results are deterministic.
+
+    Parameters:
+    latency (float): The seconds each request takes.
+    failure_rate (float): The probability of a transient failure for each request.
+    seed (int): The seed of the failure generator.
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=123):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def geocode(self, query):
+        with self._lock:
+            self.calls += 1
+            failed = self._random.random() < self.failure_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            raise TimeoutError("Stub geocoder timed out for " + query)
+        digest = int(hashlib.md5(query.encode('utf-8')).hexdigest(), 16)
+        lat = 49.0 + (digest % 10000) / 20000
+        lng = -123.3 + (digest // 10000 % 10000) / 20000
+        return [{'formatted_address': query + ', Canada',
+                 'geometry': {'location': {'lat': lat, 'lng': lng}}}]
+
+
+def is_retryable(error):
+    """
+    It checks whether an error is a quota or transient error that can be retried.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if type(error).__name__ in RETRYABLE_ERRORS:
+        return True
+    return getattr(error, 'status', None) in RETRYABLE_STATUSES
+
+
+def parse_geocode_result(geocode_result):
+    """
+    It takes the first result of a Google Geocoding response.
+
+    Returns:
+    location (dict): A dictionary contains latitude, longitude, and the formatted
+    address of the location.
+    """
+    if not geocode_result:
+        raise LookupError("No geocoding result.")
+    address = geocode_result[0]['formatted_address']
+    geometry = geocode_result[0]['geometry']['location']
+    source = geocode_result[0].get('source', 'google')
+    return {'lat': geometry['lat'], 'long': geometry['lng'], "address": address, "source": source}
+
+
+class GeocodingEngine:
+    """
+    It resolves many queries concurrently with a geocoding client.
+
+    Parameters:
+    client: An object with a `geocode(query)` method, e.g. googlemaps.Client.
+    queries_per_second (float): The rate limit of the requests, None means no limit.
+    max_in_flight (int): The maximum number of requests running at the same time.
+    max_retries (int): The number of retries for quota and transient errors.
+    backoff_base (float): The first backoff in seconds, it doubles at each retry.
+    backoff_max (float): The maximum backoff in seconds.
+    """
+
+    def __init__(self, client, queries_per_second=10, max_in_flight=8, max_retries=5,
+                 backoff_base=0.5, backoff_max=30.0):
+        self.client = client
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = TokenBucket(queries_per_second) if queries_per_second else None
+        self.errors = {}
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def geocode(self, query):
+        """
+        It geocodes a single query, retrying quota and transient errors with
+        exponential backoff.
+
+        Returns:
+        location (dict): A dictionary contains latitude, longitude, and the formatted
+        address of the location.
+        """
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            try:
+                return parse_geocode_result(self.client.geocode(query))
+            except Exception as error:
+                if attempt >= self.max_retries or not is_retryable(error):
+                    raise
+                backoff = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+                attempt += 1
+                with self._lock:
+                    self.retries += 1
+                # jitter so that the workers don't retry at the same time
+                time.sleep(backoff * (0.5 + random.random() / 2))
+
+    def resolve_all(self, queries, on_result=None):
+        """
+        It geocodes the given queries concurrently. Failed queries are recorded
+        in `errors` instead of stopping the run.
+
+        Parameters:
+        queries (iterable): The queries in the 'street1 & street2, city, province' format.
+        on_result (function): Called in the calling thread as `on_result(query, location, error)`
+        when a query finishes, location is None if the query failed.
+
+        Returns:
+        locations (dict): A dictionary of the resolved queries and their locations.
+        """
+        locations = {}
+        queries = iter(queries)
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            in_flight = {}
+            while True:
+                # keep at most `max_in_flight` requests submitted
+                while len(in_flight) < self.max_in_flight:
+                    query = next(queries, None)
+                    if query is None:
+                        break
+                    in_flight[executor.submit(self.geocode, query)] = query
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    query = in_flight.pop(future)
+                    error = future.exception()
+                    if error is None:
+                        locations[query] = future.result()
+                        location = locations[query]
+                    else:
+                        self.errors[query] = '{0}: {1}'.format(type(error).__name__, error)
+                        location = None
+                    if on_result is not None:
+                        on_result(query, location, error)
+        return locations
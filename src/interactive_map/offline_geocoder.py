@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""This script writes a synthetic gazetteer of street intersections. The module
+also provides `GazetteerGeocoder`, an offline geocoder for `append_coordinates.py`
+that resolves intersection queries from a local gazetteer file (CSV or Parquet
+with street1, street2, city, lat and long columns, e.g. `coordinate_cache.csv`)
+with an exact lookup first and a trigram fuzzy match of each street second.
+A fuzzy match only forgives typos: the city, the numbers and the directionals
+of the streets must be the same, e.g. "45 Ave" never matches "41 Ave" and
+"49 Ave" never matches "E 49 Ave". The Google Maps client is only an optional
+fallback, it is asked for the queries without a match.
+
+Usage: offline_geocoder.py --output_file_path=<output_file_path> [--n_intersections=<n_intersections>] [--seed=<seed>]
+
+Options:
+
+--output_file_path=<output_file_path>   A file path for the synthetic gazetteer.
+--n_intersections=<n_intersections>     The number of synthetic intersections [default: 5000].
+--seed=<seed>   The random seed [default: 123].
+
+Example:
+python src/interactive_map/offline_geocoder.py --output_file_path "results/processed_data/synthetic_gazetteer.csv"
+"""
+
+import os
+import random
+import sys
+import threading
+from collections import Counter
+from docopt import docopt
+import pandas as pd
+from geocoding_engine import TokenBucket
+from street_canonicalizer import build_query, canonical_query, exact_words, split_query
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.artifact_io import read_table, write_table
+
+GAZETTEER_COLUMNS = ['street1', 'street2', 'city', 'lat', 'long']
+
+
+def trigrams(text):
+    """
+    It returns the set of character trigrams of a text padded with spaces.
+    """
+    padded = '  ' + text.lower() + ' '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def read_gazetteer(gazetteer_path):
+    """
+    It reads a gazetteer from a CSV, Parquet or Feather file.
+    """
+    gazetteer_df = read_table(gazetteer_path)
+    if not set(GAZETTEER_COLUMNS).issubset(gazetteer_df.columns):
+        raise ValueError("The gazetteer should contain all of: ", GAZETTEER_COLUMNS)
+    return gazetteer_df.dropna(subset=['lat', 'long'])
+
+
+def street_parts(key):
+    """
+    It returns the parts of a canonical query that a fuzzy match compares.
+
+    Returns:
+    streets (tuple): The words that must match exactly and the trigrams of each
+    street, and the city, or None if the key isn't an intersection query.
+    """
+    parts = split_query(key)
+    if parts is None:
+        return None
+    street1, street2, city, _ = parts
+    return tuple((exact_words(street), trigrams(street)) for street in (street1, street2)), city
+
+
+class GazetteerGeocoder:
+    """
+    An offline geocoder with the same `geocode(query)` interface as
+    `googlemaps.Client`, so it can be plugged into `GeocodingEngine`.
+
+    Parameters:
+    gazetteer_df (DataFrame): The intersections with street1, street2, city, lat and
+    long columns, and optionally a formatted_address column.
+    fallback_client: A client to ask for queries that are not in the gazetteer, e.g.
+    googlemaps.Client. None means such queries have no result.
+    min_similarity (float): The minimum mean trigram Jaccard similarity of the streets of a fuzzy match.
+    min_street_similarity (float): The minimum trigram Jaccard similarity of each street of a fuzzy match.
+    queries_per_second (float): The rate limit of the requests to the fallback client,
+    None means no limit. The gazetteer lookups are never limited.
+    """
+
+    def __init__(self, gazetteer_df, fallback_client=None, min_similarity=0.7, queries_per_second=None,
+                 min_street_similarity=0.5):
+        self.fallback_client = fallback_client
+        self.min_similarity = min_similarity
+        self.min_street_similarity = min_street_similarity
+        self.rate_limiter = TokenBucket(queries_per_second) if fallback_client is not None and queries_per_second else None
+        self.exact_matches = 0
+        self.fuzzy_matches = 0
+        self.fallbacks = 0
+        # the counters are updated from the worker threads of `GeocodingEngine`
+        self._lock = threading.Lock()
+        self._keys = []
+        self._trigrams = []
+        self._streets = []
+        self._locations = []
+        self._index = {}
+        self._postings = {}
+        addresses = gazetteer_df['formatted_address'] if 'formatted_address' in gazetteer_df.columns else [None] * len(gazetteer_df)
+        for street1, street2, city, lat, long, address in zip(gazetteer_df['street1'], gazetteer_df['street2'],
+                                                              gazetteer_df['city'], gazetteer_df['lat'],
+                                                              gazetteer_df['long'], addresses):
+            key = build_query(street1, street2, city)
+            if key in self._index:
+                continue
+            entry_id = len(self._keys)
+            self._index[key] = entry_id
+            key_trigrams = trigrams(key)
+            self._keys.append(key)
+            self._trigrams.append(key_trigrams)
+            self._streets.append(street_parts(key))
+            self._locations.append((float(lat), float(long), address if isinstance(address, str) else key))
+            for trigram in key_trigrams:
+                self._postings.setdefault(trigram, []).append(entry_id)
+        # trigrams like ' st' or ', b' are in most keys, they are skipped while collecting candidates
+        self._max_posting_size = max(50, len(self._keys) // 50)
+
+    @classmethod
+    def from_file(cls, gazetteer_path, fallback_client=None, min_similarity=0.7, queries_per_second=None,
+                  min_street_similarity=0.5):
+        return cls(read_gazetteer(gazetteer_path), fallback_client, min_similarity, queries_per_second,
+                   min_street_similarity)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def match(self, query):
+        """
+        It finds the gazetteer entry of a query. The entries that share the most
+        trigrams with the query are the candidates of a fuzzy match, a candidate
+        matches if it is in the same city and each of its streets has the numbers
+        and the directionals of a street of the query and a similar name.
+
+        Parameters:
+        query (str): The canonical query in the 'street1 & street2, city, province' format.
+
+        Returns:
+        entry_id (int): The index of the matched entry or None.
+        similarity (float): 1 for an exact match, the mean trigram similarity of the streets for a fuzzy match.
+        """
+        entry_id = self._index.get(query)
+        if entry_id is not None:
+            return entry_id, 1.0
+        query_streets = street_parts(query)
+        if query_streets is None:
+            return None, 0.0
+        query_trigrams = trigrams(query)
+        overlaps = Counter()
+        for trigram in query_trigrams:
+            postings = self._postings.get(trigram, ())
+            if len(postings) <= self._max_posting_size:
+                overlaps.update(postings)
+        best_id, best_similarity = None, 0.0
+        for candidate_id, _ in overlaps.most_common(20):
+            similarity = self.street_similarity(query_streets, self._streets[candidate_id])
+            if similarity > best_similarity:
+                best_id, best_similarity = candidate_id, similarity
+        if best_similarity >= self.min_similarity:
+            return best_id, best_similarity
+        return None, best_similarity
+
+    def street_similarity(self, query_streets, entry_streets):
+        """
+        It returns the mean trigram similarity of the streets of a query and of
+        an entry, paired in the order that matches, or 0 if they aren't in the
+        same city or no pairing keeps the numbers and the directionals.
+        """
+        if entry_streets is None or query_streets[1] != entry_streets[1]:
+            return 0.0
+        query_names, entry_names = query_streets[0], entry_streets[0]
+        best = 0.0
+        for pairs in (zip(query_names, entry_names), zip(query_names, reversed(entry_names))):
+            similarities = []
+            for (query_words, query_trigrams), (entry_words, entry_trigrams) in pairs:
+                if query_words != entry_words:
+                    break
+                overlap = len(query_trigrams & entry_trigrams)
+                similarity = overlap / (len(query_trigrams) + len(entry_trigrams) - overlap)
+                if similarity < self.min_street_similarity:
+                    break
+                similarities.append(similarity)
+            else:
+                best = max(best, sum(similarities) / len(similarities))
+        return best
+
+    def geocode(self, query):
+        """
+        It geocodes a query from the gazetteer and falls back to the fallback
+        client with the query as it is given, under the rate limit. The result has
+        the format of the Google Geocoding API.
+        """
+        entry_id, similarity = self.match(canonical_query(query))
+        if entry_id is None:
+            if self.fallback_client is None:
+                return []
+            with self._lock:
+                self.fallbacks += 1
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            return self.fallback_client.geocode(query)
+        with self._lock:
+            if similarity == 1.0:
+                self.exact_matches += 1
+            else:
+                self.fuzzy_matches += 1
+        lat, long, address = self._locations[entry_id]
+        return [{'formatted_address': address, 'geometry': {'location': {'lat': lat, 'lng': long}},
+                 'source': 'gazetteer'}]
+
+
+def make_synthetic_gazetteer(n_intersections=5000, seed=123):
+    """
+    It creates a gazetteer of made up intersections to run the offline geocoder
+    without any real data.
+
+    Returns:
+    gazetteer_df (DataFrame): A data frame with street1, street2, city, lat and long columns.
+    """
+    rng = random.Random(seed)
+    names = ['Granville', 'Dunsmuir', 'Robson', 'Hastings', 'Broadway', 'Kingsway', 'Main', 'Cambie',
+             'Oak', 'Knight', 'Fraser', 'Victoria', 'Commercial', 'Nanaimo', 'Rupert', 'Boundary']
+    suffixes = ['St', 'Ave', 'Rd', 'Dr', 'Blvd']
+    cities = ['Vancouver', 'Burnaby', 'Surrey', 'Richmond', 'Coquitlam']
+    rows = []
+    for _ in range(n_intersections):
+        street1 = '{0} {1}'.format(rng.choice(names + [str(rng.randint(1, 200))]), rng.choice(suffixes))
+        street2 = '{0} {1}'.format(rng.choice(names + [str(rng.randint(1, 200))]), rng.choice(suffixes))
+        rows.append([street1, street2, rng.choice(cities),
+                     round(rng.uniform(49.0, 49.4), 7), round(rng.uniform(-123.3, -122.5), 7)])
+    return pd.DataFrame(rows, columns=GAZETTEER_COLUMNS)
+
+
+if __name__ == "__main__":
+    opt = docopt(__doc__)
+    write_table(make_synthetic_gazetteer(int(opt["--n_intersections"]), int(opt["--seed"])), opt["--output_file_path"])
@@ -4,11 +4,12 @@
 """
 This script joins the following datasets`claim_vehicle_employee_line.csv`, 
 `Preventable and Non Preventable_tabDelimited.txt` and `employee_experience_V2.csv`
-to create a CSV file that contains the required information for the interactive plot.
-It also cleans the resulting CSV file to get a successful result from the Google 
+to create a data set that contains the required information for the interactive plot.
+It is written in the format of the extension of the output file, Parquet keeps the dtypes.
+It also cleans the resulting data set to get a successful result from the Google 
 Maps API. Assumes `get-data.py` is run before. 
 
-Usage: prepare_data.py --claims_file_path=<claims_file_path> --collisions_file_path=<collisions_file_path> --employee_file_path=<employee_file_path> --output_file_path=<output_file_path>
+Usage: prepare_data.py --claims_file_path=<claims_file_path> --collisions_file_path=<collisions_file_path> --employee_file_path=<employee_file_path> --output_file_path=<output_file_path> [--city_aliases_path=<city_aliases_path>] [--min_confidence=<min_confidence>]
 
 Options:
 
@@ -16,6 +17,8 @@ Options:
 --collisions_file_path=<collisions_file_path>   A file path for collisions dataset that contains information about the collisions.
 --employee_file_path=<employee_file_path>   A file path for employees dataset that contains information about the employees.
 --output_file_path=<output_file_path>   A file path for resulting joined dataset.
+--city_aliases_path=<city_aliases_path>   A file path for the known spellings of each city [default: src/interactive_map/city_aliases.json].
+--min_confidence=<min_confidence>   The minimum confidence from 0 to 1 of a fuzzy match of a rare city name that is not in the city aliases, no fuzzy matching if it is not given.
 
 Example: 
 
@@ -23,18 +26,21 @@ python src/interactive_map/prepare_data.py \
     --claims_file_path "data/TransLink Raw Data/claim_vehicle_employee_line.csv" \
     --collisions_file_path  "data/TransLink Raw Data/Preventable and Non Preventable_tabDelimited.txt"\
     --employee_file_path "data/TransLink Raw Data/employee_experience_V2.csv"\
-    --output_file_path "results/processed_data/collision_with_claim_and_employee_info.csv" 
+    --output_file_path "results/processed_data/collision_with_claim_and_employee_info.parquet" 
     
 """
 
 import pandas as pd
-import numpy as np
 from docopt import docopt
-import glob
 import os
-import googlemaps
 from pathlib import Path
-import math
+import sys
+from street_canonicalizer import build_query
+from transforms import coalesce_loss_date, experience_in_months, experience_levels, load_city_aliases, normalize_cities
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.artifact_io import write_table
+from common.schemas import load_dataset
 
 opt = docopt(__doc__)
 
@@ -48,55 +54,19 @@ def create_dirs_if_not_exists(file_path_list):
     for path in file_path_list:
         Path(os.path.dirname(path)).mkdir(parents=True, exist_ok=True)
 
-def compare_loss_date(row):
-    """
-    A helper function to be used in the main function to take 
-    non null values for the loss_date.
-    """
-    if (row['loss_date_x'] is not pd.NaT) & (row['loss_date_y'] is pd.NaT):
-        val =  row.loss_date_x
-    else:
-        val =  row.loss_date_y
-    return val
+def main(claims_file_path, collisions_file_path, employee_file_path, output_file_path,
+         city_aliases_path='src/interactive_map/city_aliases.json', min_confidence=None):
 
+    #read the required columns of the collisions dataset, `loss_date` as date_time
+    collision = load_dataset('collisions', collisions_file_path)
 
-def get_experience_in_months(row):
-    """
-    A helper function to be used in the main functon. It creates the
-    experiences of the operators in terms of months by using the incident date and 
-    the operators' hiring date. 
-    """
-    difference = row['loss_date']- row['hire_date']
-    return round(difference.days / 30,0)
-
-def main(claims_file_path, collisions_file_path, employee_file_path, output_file_path):
-
-    #read the collisions dataset
-    collision = pd.read_csv(collisions_file_path, delimiter="\t")
-    collision.columns = map(str.lower, collision.columns)
-    #take the required columns
-    collision = collision[['loss_location_at','preventable_nonpreventable', 'loss_location_on',
-    'city_of_incident', 'loss_date','apta_desc', 'asset_vehicle_year', 'asset_manufacturer', 
-    "claim_id", 'time_of_loss']]
-    #convert `loss_date` to date_time
-    collision['loss_date'] = pd.to_datetime(collision['loss_date'], format="%d/%m/%Y")
-
-    #read the claims dataset
-    claims = pd.read_csv(claims_file_path, low_memory=False)
-    #take the required columns
-    claims = claims[['claim_id', 'paid_cost$', 'empl_id','day_of_week', 'loss_date', 
-    'claim_status', 'line_no', 'bus_no', 'bus_fuel_type','bus_carry_capacity' ]]
+    #read the required columns of the claims dataset, `loss_date` as date_time
+    claims = load_dataset('claims', claims_file_path)
     #give a better name for join
     claims = claims.rename(columns = {'empl_id': 'employee_id'})
-    #convert `loss_date` to date_time
-    claims['loss_date'] = pd.to_datetime(claims['loss_date'], format="%Y-%m-%d")
 
-    #read the employees dataset
-    employee = pd.read_csv(employee_file_path)
-    #take only the required information
-    employee = employee[['employee_id', 'hire_date']]
-    #convert `hire_date` to date_time
-    employee['hire_date'] = pd.to_datetime(employee['hire_date'], format="%Y-%m-%d")
+    #read the required information of the employees dataset, `hire_date` as date_time
+    employee = load_dataset('employees', employee_file_path)
 
     #first merge claims and employees' information with respect to employee_id column
     claims_with_employee = pd.merge(employee, claims, on=['employee_id'], how='right')
@@ -105,8 +75,8 @@ def main(claims_file_path, collisions_file_path, employee_file_path, output_file
     combined_df = pd.merge(claims_with_employee, collision, on=['claim_id'], how='left')
 
     #there are two `loss_date`s coming from claims and also collisions datasets.
-    #take the not null one.
-    combined_df['loss_date'] = combined_df.apply(compare_loss_date, axis = 1)
+    #take the not null one, the one of the collisions if both are there.
+    combined_df['loss_date'] = coalesce_loss_date(combined_df['loss_date_x'], combined_df['loss_date_y'])
     #drop unnecessary columns
     combined_df = combined_df.drop(columns = ['loss_date_x', 'loss_date_y'])
 
@@ -114,46 +84,30 @@ def main(claims_file_path, collisions_file_path, employee_file_path, output_file
     combined_df = combined_df.dropna(subset = ["hire_date"])
 
     #create experience in terms of months
-    combined_df['experience_in_months'] = combined_df.apply(get_experience_in_months, axis = 1)
+    combined_df['experience_in_months'] = experience_in_months(combined_df['loss_date'], combined_df['hire_date'])
 
     #create experience levels
-    bin_labels = ['< 6 months', '6-18 months', '18-60 months', '> 60 months']
-    combined_df['experience_levels'] = pd.cut(combined_df['experience_in_months'],
-                              bins=[0, 6, 18, 60, math.inf],
-                              labels=bin_labels)
+    combined_df['experience_levels'] = experience_levels(combined_df['experience_in_months'])
 
     #remove the rows if both street names are null.
     combined_df = combined_df.dropna(subset=["loss_location_at", "loss_location_on"], how = 'all')
 
     #clean city names to get a successful result from Google Maps API
-    combined_df['city_of_incident'] = combined_df['city_of_incident'].str.lower().str.strip()
-    combined_df['city_of_incident'].replace(["van", "vacovuer", "vancouer", "vancover", "vancouver", "vancovuer", "ubc", "vancouver - vtc", "vtc"], "Vancouver", inplace=True)
-    combined_df['city_of_incident'].replace(["bur", "burnaby", "bunaby"], "Burnaby", inplace=True)
-    combined_df['city_of_incident'].replace(["new wesminster", "nw", "new westminister", "new westminster"], "New Westminster", inplace=True)
-    combined_df['city_of_incident'].replace(["sur", "sureey", "surrye", "surrey", "cloverdale", "south surrey"], "Surrey", inplace=True)
-    combined_df['city_of_incident'].replace(["ladnar", "ladner", "del", "delta"], "Delta", inplace=True)
-    combined_df['city_of_incident'].replace(["coq", "coquitlam"], "Coquitlam", inplace=True)
-    combined_df['city_of_incident'].replace(["lan", "langley"], "Langley", inplace=True)
-    combined_df['city_of_incident'].replace(["pit", "pit meadow", "pitt meadows"], "Pitt Meadows", inplace=True)
-    combined_df['city_of_incident'].replace(["mr", "maple ridge"], "Maple Ridge", inplace=True)
-    combined_df['city_of_incident'].replace(["pm", "poer moody", "port moody"], "Port Moody", inplace=True)
-    combined_df['city_of_incident'].replace(["pc", "port coquitlam"], "Port Coquitlam", inplace=True)
-    combined_df['city_of_incident'].replace(["wr", "white rock", "white rock/surrey", "whiterock", "white rock / surrey"], "White Rock", inplace=True)
-    combined_df['city_of_incident'].replace(["wv", "west vancouver"], "West Vancouver", inplace=True)
-    combined_df['city_of_incident'].replace(["ric", "richmond"], "Richmond", inplace=True)
-    combined_df['city_of_incident'].replace(["nv", "north van", "north vancover", "north vancouver"], "North Vancouver", inplace=True)
-    combined_df['city_of_incident'].replace(["anmore"], "Anmore", inplace=True)
-    combined_df['city_of_incident'].replace(["belcarra"], "Belcarra", inplace=True)
-    combined_df['city_of_incident'].replace(["walnut grove"], "Walnut Grove", inplace=True)
+    #the known spellings are in the city aliases, the rare unknown ones can be matched to them
+    combined_df['city_of_incident'] = normalize_cities(combined_df['city_of_incident'],
+                                                       load_city_aliases(city_aliases_path), min_confidence)
 
     # trim street names
     combined_df['loss_location_at'] = combined_df['loss_location_at'].str.strip()
     combined_df['loss_location_on'] = combined_df['loss_location_on'].str.strip()
 
+    # canonical intersection query, spelling variants of the same intersection share one key
+    combined_df['query_key'] = [build_query(street1, street2, city) for street1, street2, city
+                                in combined_df[['loss_location_at', 'loss_location_on', 'city_of_incident']].itertuples(index=False)]
+
     #write the resulting dataframe into the output_file_path.
-    create_dirs_if_not_exists([output_file_path])
-    combined_df.to_csv(output_file_path, index=False)
+    write_table(combined_df, output_file_path)
 
 if __name__ == "__main__":
-    main(opt["--claims_file_path"], opt["--collisions_file_path"], opt["--employee_file_path"], opt["--output_file_path"])
-    
\ No newline at end of file
+    main(opt["--claims_file_path"], opt["--collisions_file_path"], opt["--employee_file_path"], opt["--output_file_path"],
+         opt["--city_aliases_path"], float(opt["--min_confidence"]) if opt["--min_confidence"] else None)
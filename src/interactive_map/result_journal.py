@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+An append-only journal of the geocoding results of `append_coordinates.py`.
+Each resolved query is written as one JSON line, the journal is fsynced in
+batches and an interrupted run can replay it to continue where it stopped.
+The journal is removed once the output is written, so a later run with other
+input or another geocoder doesn't replay stale results.
+"""
+
+import json
+import os
+from pathlib import Path
+
+
+class ResultJournal:
+    """
+    An append-only journal with one record per resolved query.
+
+    Parameters:
+    file_path (str): The path of the journal file.
+    sync_every (int): The number of records written between two fsyncs.
+    """
+
+    def __init__(self, file_path, sync_every=40):
+        self.file_path = file_path
+        self.sync_every = sync_every
+        self.records_written = 0
+        self._unsynced = 0
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def replay(self):
+        """
+        It reads the records of the previous runs. A torn last line of an
+        interrupted run is skipped.
+
+        Returns:
+        records (dict): A dictionary of the queries and their records.
+        """
+        records = {}
+        if not os.path.exists(self.file_path):
+            return records
+        with open(self.file_path) as journal_file:
+            for line in journal_file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                records[record['query']] = record
+        return records
+
+    def append(self, query, street1, street2, city, location):
+        """
+        It appends the location of a resolved query to the journal.
+
+        Parameters:
+        query (str): The address in the 'street1 & street2, city, province' format.
+        street1 (str): The name of the first street of the intersection point.
+        street2 (str): The name of the second street of the intersection point.
+        city (str): The city of the intersection point.
+        location (dict): A dictionary contains latitude, longitude, and the formatted address.
+        """
+        if self._file is None:
+            Path(os.path.dirname(self.file_path) or '.').mkdir(parents=True, exist_ok=True)
+            self._file = open(self.file_path, 'a')
+            # a torn line of an interrupted run must not swallow the first new record
+            if self._file.tell() > 0:
+                self._file.write('\n')
+        record = {'query': query, 'street1': street1, 'street2': street2, 'city': city,
+                  'lat': location['lat'], 'long': location['long'], 'address': location['address']}
+        self._file.write(json.dumps(record) + '\n')
+        self.records_written += 1
+        self._unsynced += 1
+        if self._unsynced >= self.sync_every:
+            self.sync()
+
+    def sync(self):
+        """
+        It makes the appended records durable.
+        """
+        if self._file is not None and self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        """
+        It closes the journal and deletes its file, once the results are in the output.
+        """
+        self.close()
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
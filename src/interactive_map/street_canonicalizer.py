@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Canonical street names and intersection queries. The same intersection is
+typed in many ways in the collision data, e.g. "Granville St & Dunsmuir St",
+"DUNSMUIR ST & GRANVILLE STREET" or with the streets swapped. All of them get
+the same query here, so they share one entry in the coordinate cache and one
+request to the Google Maps API. The canonical query is only a key, used by both
+`prepare_data.py` and `append_coordinates.py`: the API is asked with the
+address as it is typed (`geocoding_query`), as the canonical form, e.g. "41"
+for "41st", can change what it finds.
+"""
+
+import math
+import re
+
+# street types, only the last word of a street name is treated as a street type
+STREET_SUFFIXES = {
+    'st': 'St', 'str': 'St', 'street': 'St',
+    'av': 'Ave', 'ave': 'Ave', 'avenue': 'Ave',
+    'rd': 'Rd', 'road': 'Rd',
+    'dr': 'Dr', 'drive': 'Dr',
+    'blvd': 'Blvd', 'boulevard': 'Blvd',
+    'hwy': 'Hwy', 'highway': 'Hwy',
+    'pl': 'Pl', 'place': 'Pl',
+    'cres': 'Cres', 'crescent': 'Cres',
+    'ct': 'Ct', 'court': 'Ct',
+    'ln': 'Ln', 'lane': 'Ln',
+    'pkwy': 'Pkwy', 'parkway': 'Pkwy',
+    'sq': 'Sq', 'square': 'Sq',
+    'hts': 'Hts', 'heights': 'Hts',
+    'wy': 'Way', 'way': 'Way',
+}
+
+# directionals, only the first or the last word of a street name is treated as a directional
+DIRECTIONALS = {
+    'n': 'N', 'north': 'N',
+    's': 'S', 'south': 'S',
+    'e': 'E', 'east': 'E',
+    'w': 'W', 'west': 'W',
+    'ne': 'NE', 'northeast': 'NE',
+    'nw': 'NW', 'northwest': 'NW',
+    'se': 'SE', 'southeast': 'SE',
+    'sw': 'SW', 'southwest': 'SW',
+}
+
+ORDINAL_NUMBER = re.compile(r'^(\d+)(st|nd|rd|th)$')
+SEPARATORS = re.compile(r'[.,;]+')
+
+
+def is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def canonical_street(street):
+    """
+    It normalizes the case, the street type, the directionals and the ordinal
+    numbers of a street name.
+
+    Parameters:
+    street (str): The name of the street.
+
+    Returns:
+    street (str): The canonical street name, an empty string for missing values.
+
+    Example: canonical_street("west 41st avenue") = "W 41 Ave"
+    """
+    if is_missing(street):
+        return ''
+    words = SEPARATORS.sub(' ', str(street)).lower().split()
+    canonical_words = []
+    for position, word in enumerate(words):
+        is_first = position == 0
+        is_last = position == len(words) - 1
+        ordinal = ORDINAL_NUMBER.match(word)
+        if ordinal:
+            canonical_words.append(ordinal.group(1))
+        elif is_last and not is_first and word in STREET_SUFFIXES:
+            canonical_words.append(STREET_SUFFIXES[word])
+        elif (is_first or is_last) and len(words) > 1 and word in DIRECTIONALS:
+            canonical_words.append(DIRECTIONALS[word])
+        else:
+            canonical_words.append(word.capitalize())
+    return ' '.join(canonical_words)
+
+
+def canonical_city(city):
+    """
+    It normalizes the case and the spaces of a city name.
+    """
+    if is_missing(city):
+        return ''
+    return ' '.join(word.capitalize() for word in str(city).split())
+
+
+def build_query(street1, street2, city, province="BC"):
+    """
+    It creates the canonical query of an intersection in the
+    'street1 & street2, city, province' format. The streets are sorted so that
+    the query doesn't depend on their order.
+
+    Example: build_query("GRANVILLE STREET", "Dunsmuir St", "vancouver") =
+    "Dunsmuir St & Granville St, Vancouver, BC"
+    """
+    streets = sorted([canonical_street(street1), canonical_street(street2)])
+    query_format = '{0} & {1}, {2}, {3}'
+    return query_format.format(streets[0], streets[1], canonical_city(city), province)
+
+
+def geocoding_query(street1, street2, city, province="BC"):
+    """
+    It creates the query of an intersection that is sent to a geocoder, with
+    the streets and the city as they are typed.
+
+    Example: geocoding_query("W 41st Ave", "Granville St", "Vancouver") =
+    "W 41st Ave & Granville St, Vancouver, BC"
+    """
+    query_format = '{0} & {1}, {2}, {3}'
+    return query_format.format(street1, street2, city, province)
+
+
+def split_query(query):
+    """
+    It splits a query in the 'street1 & street2, city, province' format.
+
+    Returns:
+    parts (tuple): The street1, street2, city and province of the query, None if
+    it isn't in that format.
+    """
+    parts = query.rsplit(', ', 2)
+    if len(parts) != 3 or ' & ' not in parts[0]:
+        return None
+    street1, street2 = parts[0].split(' & ', 1)
+    return street1, street2, parts[1], parts[2]
+
+
+def exact_words(street):
+    """
+    It returns the words of a canonical street name that a fuzzy match must
+    keep as they are: the numbers, e.g. "41" of "41 Ave", and the directionals.
+
+    Example: exact_words("W 41 Ave") = ("W", "41")
+    """
+    directionals = set(DIRECTIONALS.values())
+    return tuple(word for word in street.split() if word in directionals or any(c.isdigit() for c in word))
+
+
+def canonical_query(query):
+    """
+    It returns the canonical query of a query in the
+    'street1 & street2, city, province' format, or the query itself if it
+    isn't in that format.
+    """
+    parts = split_query(query)
+    if parts is None:
+        return query
+    return build_query(*parts)
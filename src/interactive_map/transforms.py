@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+The vectorized transforms of `prepare_data.py`. Each one works on whole
+columns, instead of calling a Python function for every row with
+`DataFrame.apply(axis=1)`.
+"""
+
+import json
+import math
+import os
+import sys
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.fuzzy_index import fuzzy_normalizer
+
+EXPERIENCE_BINS = [0, 6, 18, 60, math.inf]
+EXPERIENCE_LABELS = ['< 6 months', '6-18 months', '18-60 months', '> 60 months']
+
+
+def coalesce_loss_date(loss_date_x, loss_date_y):
+    """
+    It takes the loss date of the collisions and the loss date of the claims
+    where the former is missing.
+
+    Parameters:
+    loss_date_x (Series): The loss dates of the claims.
+    loss_date_y (Series): The loss dates of the collisions.
+
+    Returns:
+    loss_date (Series): The loss date of each incident.
+    """
+    return loss_date_y.combine_first(loss_date_x)
+
+
+def experience_in_months(loss_date, hire_date):
+    """
+    It returns the experience of the operators at the incident in months of
+    30 days, rounded half to even like `round`.
+    """
+    return ((loss_date - hire_date).dt.days / 30).round(0)
+
+
+def experience_levels(months):
+    """
+    It bins the experience in months into the levels of `EXPERIENCE_LABELS`.
+    """
+    return pd.cut(months, bins=EXPERIENCE_BINS, labels=EXPERIENCE_LABELS)
+
+
+def load_city_aliases(city_aliases_path):
+    """
+    It reads the known spellings of the cities.
+
+    Parameters:
+    city_aliases_path (str): The path of a JSON file with the lowercase spellings of each city.
+
+    Returns:
+    city_aliases (dict): A dictionary of spelling -> city.
+    """
+    with open(city_aliases_path) as aliases_file:
+        spellings = json.load(aliases_file)
+    city_aliases = {}
+    for city, aliases in spellings.items():
+        for alias in aliases:
+            city_aliases.setdefault(alias, city)
+    return city_aliases
+
+
+def normalize_cities(cities, city_aliases, min_confidence=None):
+    """
+    It maps the spellings of the city names to the cities with one lookup per
+    distinct spelling.
+
+    Parameters:
+    cities (Series): The city names as they were entered.
+    city_aliases (dict): A dictionary of lowercase spelling -> city.
+    min_confidence (float): The minimum confidence of a fuzzy match of a rare unknown spelling, None turns it off.
+
+    Returns:
+    cities (Series): The cities as a category.
+    """
+    cities = cities.str.lower().str.strip()
+    return cities.map(fuzzy_normalizer(city_aliases, cities.value_counts().to_dict(), min_confidence)).astype('category')
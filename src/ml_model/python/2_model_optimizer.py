@@ -4,17 +4,25 @@
 """
 This script prepares the train and test datasets to generate a predictive model. 
 It compares different models to select the best one and then tune the best models' hyperparameters.
-Returns the best model as a pickled file and assumes the script will be run from the root of the repository.
+Returns the fitted best model with the parameters, the features and the results of the search as a pickled
+model artifact and assumes the script will be run from the root of the repository.
 
 Usage: 2_model_optimizer.py --train_file_path=<train_file_path> --bus_file_path=<bus_file_path> \
-    --test_file_path=<test_file_path> --path_out=<path_out>
+    --test_file_path=<test_file_path> --path_out=<path_out> [--search=<search>] [--n_trials=<n_trials>] \
+    [--cache_dir=<cache_dir>] [--encoding=<encoding>] [--shared_dir=<shared_dir>] [--cpus=<cpus>]
 
 Options:
 
 --train_file_path=<train_file_path>     A file path containing the train dataset.
 --bus_file_path=<bus_file_path>     A file path containing other bus information.
 --test_file_path=<test_file_path>     A file path containing the test dataset.
---path_out=<path_out> A file path that specifies where to output the final selected model's parameters.
+--path_out=<path_out> A file path that specifies where to output the final selected model.
+--search=<search>     The hyperparameter search strategy, one of grid, halving, halving_random or bayes [default: grid].
+--n_trials=<n_trials>     The number of configurations of the bayes search [default: 60].
+--cache_dir=<cache_dir>     A directory to keep the preprocessing fitted on each fold between runs, a temporary one if it isn't given. Only the dense and sparse encodings have a preprocessing step to cache.
+--encoding=<encoding>     The feature encoding of the LightGBM search, one of dense, sparse or native [default: sparse].
+--shared_dir=<shared_dir>     A directory for the memory-mapped training data that the search workers share, a temporary one if it isn't given.
+--cpus=<cpus>     The number of CPUs of the model fits, split between parallel fits and threads, all the available ones if it isn't given.
 """
 import numpy as np
 import time
@@ -27,18 +35,24 @@ from sklearn.ensemble import RandomForestClassifier
 from lightgbm import LGBMClassifier
 from shap import TreeExplainer, summary_plot
 # Preprocessors 
-from sklearn.preprocessing import StandardScaler
-from sklearn.preprocessing import OneHotEncoder
 from sklearn.pipeline import Pipeline, make_pipeline
-from sklearn.compose import ColumnTransformer
-from sklearn.impute import SimpleImputer
 
 # other
 from sklearn.metrics import roc_auc_score
-from sklearn.model_selection import train_test_split, GridSearchCV, StratifiedKFold
+from sklearn.model_selection import train_test_split, StratifiedKFold
 from docopt import docopt
-import pickle
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir))
+from common.artifact_io import read_table
+from common.schemas import load_dataset
+from cpu_budget import plan_cpus
+from features import CATEGORICAL_FEATURES, FEATURES, make_preprocessor
+from fold_cache import PreprocessingCache
+from model_artifact import make_model_artifact, save_model_artifact
+from search_strategies import make_search, max_parallel_fits, n_fits
+from shared_data import SharedTrainingData
 
 opt = docopt(__doc__)
 
@@ -70,7 +84,7 @@ def fit_and_report(model, X, y, X_valid, y_valid):
     scores = [lr_auc, lr_auc_val]      
     return scores
 
-def add_expt_result(results_dict, model, train_score, test_score):
+def add_expt_result(results_dict, model, train_score, test_score, encoding):
     '''
 
     It creates a dataframe that show the model scores.
@@ -81,6 +95,7 @@ def add_expt_result(results_dict, model, train_score, test_score):
         model (sklearn classifier model): The sklearn model
         train_score (float): The traing score of the model
         test_score (float): The test score of the model
+        encoding (str): The feature encoding of the model
 
     Returns:
         df (dataFrame): The dataframe containing model scores.
@@ -88,23 +103,21 @@ def add_expt_result(results_dict, model, train_score, test_score):
 
     '''
     results_dict.setdefault('model', []).append(model)
+    results_dict.setdefault('encoding', []).append(encoding)
     results_dict.setdefault('train score', []).append(train_score)
     results_dict.setdefault('validation score', []).append(test_score)
     df = pd.DataFrame(results_dict)
     df = df.drop_duplicates()
     return df
 
-def main(train_file_path, bus_file_path, test_file_path, path_out):
-    # load bus information
-    other_bus_info = pd.read_csv(bus_file_path)
-
-    # take only required columns
-    columns_bus_info = ["bus_no", "asset_class", "asset_manufactmodel"]
-    other_bus_info = other_bus_info.loc[:, columns_bus_info]
+def main(train_file_path, bus_file_path, test_file_path, path_out, search='grid', n_trials=60, cache_dir=None,
+         encoding='sparse', shared_dir=None, cpus=None):
+    # load the required columns of the bus information
+    other_bus_info = load_dataset('bus_spec', bus_file_path)
 
     # load train data and test data
-    train = pd.read_csv(train_file_path)
-    test = pd.read_csv(test_file_path)
+    train = read_table(train_file_path)
+    test = read_table(test_file_path)
 
     # merge bus information into train and test datasets
     train_with_bus = train.merge(other_bus_info, on="bus_no", how="left")
@@ -131,26 +144,7 @@ def main(train_file_path, bus_file_path, test_file_path, path_out):
 
 
     # onehot encoding for categorical features and standard scaling for numerical features
-    # impute to the missing values
-    categorical_features = ['day_of_week', 'city', 'line_no', "asset_class", 'asset_manufactmodel', 'month', 'is_shuttle']
-
-    numeric_features = ['hour', 'bus_age', 'bus_carry_capacity', 'pressure', 'rel_hum', 'elev', 'temp', 'visib', 'wind_dir', 
-                    'wind_spd', 'total_precip', 'total_rain', 'total_snow', 'experience_in_months']
-
-    numeric_transformer = Pipeline(steps=[
-        ('imputer', SimpleImputer(strategy='median')),
-        ('scaler', StandardScaler())])
-
-
-    # create a pipeline for the model
-    categorical_transformer = Pipeline(steps=[
-        ('imputer', SimpleImputer(strategy="most_frequent", fill_value='missing')),
-        ('onehot', OneHotEncoder(sparse=False, handle_unknown='ignore'))])
-    preprocessor = ColumnTransformer(
-                                transformers=[
-                                ('num', numeric_transformer, numeric_features),
-                                ('cat', categorical_transformer, categorical_features)
-                            ])
+    # impute to the missing values, the features and the encodings are in features.py
 
     # model selection 
 
@@ -166,17 +160,23 @@ def main(train_file_path, bus_file_path, test_file_path, path_out):
 
 
     # compare the training and validation scores from different models
+    # one model is fitted at a time, with all the threads of the CPU budget
+    comparison_plan = plan_cpus(cpus)
+    print("The models are compared with %s" % comparison_plan)
     for model_name, model in models.items():
-        print('Training classifier ', model_name)
+        # only lightgbm reads the native categories, the other models get the sparse onehot encoding
+        model_encoding = 'sparse' if encoding == 'native' and model_name != 'lgbm' else encoding
+        print('Training classifier ', model_name, 'with the', model_encoding, 'encoding')
         t = time.time()
-        clf = Pipeline(steps=[('preprocessor', preprocessor),
-                            ('classifier', model)])
+        clf = comparison_plan.set_threads(Pipeline(steps=[('preprocessor', make_preprocessor(model_encoding)),
+                            ('classifier', model)]))
     
-        tr_sc, valid_sc = fit_and_report(clf, X_train, y_train, X_valid, y_valid)
+        with comparison_plan.limits():
+            tr_sc, valid_sc = fit_and_report(clf, X_train, y_train, X_valid, y_valid)
         elapsed_time = time.time() - t
         results_df = add_expt_result(results_dict, 
                                             model_name + ' + scaling',  
-                                            tr_sc,  valid_sc)
+                                            tr_sc,  valid_sc, model_encoding)
         elapsed_time = time.time() - t    
         print("The classifier %s took %.2f s to train" %(model_name, elapsed_time))
 
@@ -185,60 +185,63 @@ def main(train_file_path, bus_file_path, test_file_path, path_out):
     print(results_df)
 
 
-    # lightgbm optimization procedure
-    param_opt = {
-        'classifier__max_depth': [10, 20, 40],
-        'classifier__num_leaves': [5, 15, 30],
-        'classifier__reg_alpha': [0, 0.1, 1],
-        'classifier__reg_lambda': [0, 0.1, 1],
-        'classifier__subsample': [0.8, 1], 
-        'classifier__learning_rate' : [0.001, 0.01, 0.1, 1]
-        }
-
     #apply the pipeline
     model_lgbm = LGBMClassifier(random_state=123, objective= "binary")
 
+    # the workers of the search share one numeric copy of the training data in a memory-mapped file
+    # only the features are kept, so every encoding of the search sees the same columns
+    shared = SharedTrainingData(X, y, CATEGORICAL_FEATURES, shared_dir, FEATURES)
+    print("The training data is shared as a %d x %d matrix of %.1f MB" % (
+        shared.X.shape[0], shared.X.shape[1], shared.nbytes / 2 ** 20))
+
+    # the candidates only change the classifier, the preprocessing fitted on a fold is
+    # cached and reused by all of them, the native encoding passes the matrix through
+    cache = PreprocessingCache(cache_dir)
     estimator = Pipeline(steps=[
-        ('preprocessor', preprocessor),
+        ('preprocessor', make_preprocessor(encoding, shared.columns)),
         ('classifier', model_lgbm)
-    ])
+    ], memory=cache.memory)
 
     # to get the best parameters apply grid search
     cv_folds = StratifiedKFold(n_splits=10, shuffle=True, random_state=123)
 
-    gridSearchCV = GridSearchCV(estimator=estimator , 
-        param_grid=param_opt, 
-        scoring='roc_auc',
-        n_jobs=-1,
-        cv=cv_folds,
-        verbose=2)
+    # the CPUs go to parallel fits first and the rest to the threads of each fit
+    plan = plan_cpus(cpus, max_parallel_fits(search, cv_folds))
+    plan.set_threads(estimator)
+    print("The %s search runs with %s" % (search, plan))
 
-    # use all training dataset to get best parameters
+    # the grid of the search is in search_strategies.PARAM_GRID
+    gridSearchCV = make_search(search, estimator, cv_folds, len(X), n_jobs=plan.outer, n_trials=n_trials, verbose=2)
 
-    gridSearchCV.fit(X,y) 
+    # use all training dataset to get best parameters
+    t = time.time()
+    with shared, cache, plan.limits():
+        gridSearchCV.fit(shared.X, shared.y, **shared.fit_params(encoding))
+        preprocessing_fits, preprocessing_time = cache.stats()
+    elapsed_time = time.time() - t
+    print("The %s search took %.2f s for %d fits, the best validation score is %.4f with %s" % (
+        search, elapsed_time, n_fits(gridSearchCV), gridSearchCV.best_score_, gridSearchCV.best_params_))
+    if encoding == 'native':
+        # the shared matrix already has the codes of the categories, there is no preprocessing to cache
+        print("The native encoding has no preprocessing step on the folds")
+    else:
+        print("The preprocessing was fitted %d times in %.2f s" % (preprocessing_fits, preprocessing_time))
 
     # see the test scores 
 
-    lr_probs_test = gridSearchCV.best_estimator_.predict_proba(X_test)
+    lr_probs_test = gridSearchCV.best_estimator_.predict_proba(shared.encode(X_test))
     lr_probs_test = lr_probs_test[:, 1]
     lr_auc_test = roc_auc_score(y_test, lr_probs_test)
     print(lr_auc_test)
 
-    # write final model 
-    final_model =  LGBMClassifier(
-        learning_rate=gridSearchCV.best_params_['classifier__learning_rate'],
-        num_leaves=gridSearchCV.best_params_['classifier__num_leaves'],
-        max_depth=gridSearchCV.best_params_['classifier__max_depth'],
-        reg_alpha=gridSearchCV.best_params_['classifier__reg_alpha'],
-        subsample=gridSearchCV.best_params_['classifier__subsample']
-        )
-    
+    # write the fitted best pipeline, its complete parameters, the feature schema and the search results
     if not os.path.exists(path_out):
         os.makedirs(path_out)
 
     filename = path_out + '/final_model_after_optimization.pickle'
-    with open(filename, 'wb') as out:
-        pickle.dump(final_model, out)
+    save_model_artifact(make_model_artifact(gridSearchCV, search, encoding, shared, lr_auc_test), filename)
 
 if __name__ == "__main__":
-    main(opt["--train_file_path"], opt["--bus_file_path"], opt["--test_file_path"], opt["--path_out"])
+    main(opt["--train_file_path"], opt["--bus_file_path"], opt["--test_file_path"], opt["--path_out"],
+         opt["--search"], int(opt["--n_trials"]), opt["--cache_dir"],
+         opt["--encoding"], opt["--shared_dir"], int(opt["--cpus"]) if opt["--cpus"] else None)
@@ -2,19 +2,22 @@
 # coding: utf-8
 
 """
-This script fits the final model and generate results from this model for use in the report.
-It takes train, test and bus information datasets and combines them to fit the final model.
-It also takes the path for the final model and writes the results to the output file. 
+This script gets the final model and generate results from this model for use in the report.
+It takes train, test and bus information datasets and combines them to explain the final model.
+It also takes the path for the model artifact of the optimizer and uses its fitted model, or fits the
+final model on the combined datasets if asked, and writes the results to the output file. 
 
 Usage: 3_model_generator.py --train_file_path=<train_file_path> --bus_file_path=<bus_file_path> \
---test_file_path=<test_file_path> --model_file_path=<model_file_path> --path_out=<path_out>
+--test_file_path=<test_file_path> --model_file_path=<model_file_path> --path_out=<path_out> [--cpus=<cpus>] [--refit]
 
 Options:
 --train_file_path=<train_file_path> A file path containing the train dataset.
 --bus_file_path=<bus_file_path> A file path containing other bus information.
 --test_file_path=<test_file_path> A file path containing the test dataset.
---model_file_path=<model_file_path> A file path containing the final model selected from optimization.
+--model_file_path=<model_file_path> A file path containing the model artifact of the optimization.
 --path_out=<path_out> A file path that specifies where to output needed files for the interactive report.
+--cpus=<cpus>  The number of threads of the fit and of the SHAP values, all the available CPUs if it isn't given.
+--refit  Fit the model on the train and test datasets instead of using the model that the optimizer fitted on the train dataset. The model is always fitted if the optimizer didn't use the native encoding.
 
 """
 
@@ -43,20 +46,26 @@ from sklearn.metrics import roc_auc_score
 from sklearn.model_selection import train_test_split, GridSearchCV, StratifiedKFold
 from docopt import docopt
 import pickle
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir))
+from common.artifact_io import read_table, write_table
+from common.schemas import load_dataset
+from cpu_budget import plan_cpus
+from features import make_preprocessor
+from model_artifact import can_warm_start, load_model_artifact, warm_classifier
 
 
 opt = docopt(__doc__)
 
-def main(train_file_path, bus_file_path, test_file_path, model_file_path, path_out):
+def main(train_file_path, bus_file_path, test_file_path, model_file_path, path_out, cpus=None, refit=False):
 
-    # load bus information
-    other_bus_info = pd.read_csv(bus_file_path)
-    columns_bus_info = ["bus_no", "asset_class", "asset_manufactmodel"]
-    other_bus_info = other_bus_info.loc[:, columns_bus_info]
+    # load the required columns of the bus information
+    other_bus_info = load_dataset('bus_spec', bus_file_path)
 
     # load train data and test data
-    train = pd.read_csv(train_file_path)
-    test = pd.read_csv(test_file_path)
+    train = read_table(train_file_path)
+    test = read_table(test_file_path)
 
     # combine entire dataset
     combined_data_set_v0 = pd.concat([train, test])
@@ -76,33 +85,45 @@ def main(train_file_path, bus_file_path, test_file_path, model_file_path, path_o
     X = combined_data_set_v1.drop(columns='incident')
     y = combined_data_set_v1['incident']
 
-    # preprocessing with categorical features
-    for c in X.columns:
-        col_type = X[c].dtype
-        if col_type == 'object' or col_type.name == 'category':
-            X[c] = X[c].astype('category')
-    
-    #open the final model from the given path      
-    filename = model_file_path
-    
-    with open(filename, 'rb') as infile:
-        best_estimator = pickle.load(infile)
-
-    print(best_estimator)
-    #fit the final model with the complete dataset
-    best_estimator.fit(X, y)
+    # preprocessing with categorical features, the native encoding of the optimizer, with the levels
+    # of the complete dataset so the report data and the SHAP values keep the levels only seen in test
+    X = make_preprocessor('native').fit_transform(X)
+
+    #open the model artifact of the optimizer from the given path
+    artifact = load_model_artifact(model_file_path)
+    warm_start = not refit and can_warm_start(artifact) and \
+        list(X.columns) == artifact['feature_schema']['columns']
+
+    # a single fit, all the CPUs of the budget go to its threads
+    plan = plan_cpus(cpus)
+    if warm_start:
+        # the best model of the optimizer is already fitted on the train dataset with the native
+        # encoding, LightGBM maps the categories to the ones it was fitted with
+        print("Using the fitted model of the optimizer, version %d of %s" % (artifact['version'], artifact['created']))
+        best_estimator = plan.set_threads(warm_classifier(artifact))
+    else:
+        best_estimator = plan.set_threads(LGBMClassifier(**artifact['classifier_params']))
+        print(best_estimator)
+        print("The final model is fitted with %s" % plan)
+        #fit the final model with the complete dataset
+        with plan.limits():
+            best_estimator.fit(X, y)
     
     if not os.path.exists(path_out):
         os.makedirs(path_out)
 
-    # Save the final fitted model for usage in interactive report
+    # Save the final fitted model for usage in interactive report, with the levels of its categorical
+    # columns so the report converts its inputs without the feature code of the model scripts
+    best_estimator.feature_categories_ = {column: list(X[column].cat.categories) for column in X.columns
+                                          if isinstance(X[column].dtype, pd.CategoricalDtype)}
     filename = path_out + "/final_fitted.pickle"
     with open(filename, 'wb') as outfile:
         pickle.dump(best_estimator, outfile)
 
     # generate summary plot for interpretability
     
-    feat_import = TreeExplainer(best_estimator).shap_values(X=X)
+    with plan.limits():
+        feat_import = TreeExplainer(best_estimator).shap_values(X=X)
     class0 = pd.DataFrame(feat_import[0])
     class0.columns = X.columns
     
@@ -110,9 +131,9 @@ def main(train_file_path, bus_file_path, test_file_path, model_file_path, path_o
     class1.columns = X.columns
     
     # Save class1 shap scores for usage in interactive report
-    class1.to_csv(path_out + "/class1_shap.csv")
-    X.to_csv(path_out + "/full_data.csv")
+    write_table(class1, path_out + "/class1_shap.csv", index=True)
+    write_table(X, path_out + "/full_data.csv", index=True)
 
 if __name__ == "__main__":
     main(opt["--train_file_path"], opt["--bus_file_path"], opt["--test_file_path"],
-        opt["--model_file_path"], opt["--path_out"])
+        opt["--model_file_path"], opt["--path_out"], int(opt["--cpus"]) if opt["--cpus"] else None, opt["--refit"])
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This script benchmarks the splits of a CPU budget of `cpu_budget.py` on a grid
+search of synthetic model data. It runs the search with every split of the
+budget into parallel fits x threads, and with the previous default of
+`GridSearchCV(n_jobs=-1)` and the default threads of LightGBM, and reports the
+throughput in fits per second. Every search runs in a new process with a new
+pool of workers.
+
+Usage: benchmark_cpu_budget.py [--cpus=<cpus>] [--n_rows=<n_rows>] [--n_splits=<n_splits>] [--seed=<seed>]
+
+Options:
+--cpus=<cpus>  The CPU budget, all the available CPUs if it isn't given.
+--n_rows=<n_rows>  The number of training rows [default: 50000].
+--n_splits=<n_splits>  The number of folds [default: 4].
+--seed=<seed>  The random seed [default: 123].
+
+Example:
+python src/ml_model/python/benchmark_cpu_budget.py --cpus=8
+"""
+
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from docopt import docopt
+from joblib.externals.loky import get_reusable_executor
+import numpy as np
+import pandas as pd
+from lightgbm import LGBMClassifier
+from sklearn.model_selection import GridSearchCV, StratifiedKFold
+from sklearn.pipeline import Pipeline
+from benchmark_features import synthetic_features
+from cpu_budget import CpuPlan, available_cpus
+from features import make_preprocessor
+
+PARAM_GRID = {'classifier__num_leaves': [5, 15, 30], 'classifier__learning_rate': [0.01, 0.1]}
+
+
+def run(plan, data_path, n_splits):
+    """
+    It runs one search in the current process, with the default parallelism if the plan is None.
+
+    Returns:
+    elapsed_time (float): The time of the search.
+    n_fits (int): The number of fits.
+    """
+    data = pd.read_pickle(data_path)
+    X, y = data.drop(columns='incident'), data['incident']
+    estimator = Pipeline(steps=[('preprocessor', make_preprocessor('sparse')),
+                                ('classifier', LGBMClassifier(random_state=123, objective='binary', verbose=-1))])
+    cv_folds = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=123)
+    t = time.time()
+    if plan is None:
+        GridSearchCV(estimator, PARAM_GRID, scoring='roc_auc', cv=cv_folds, n_jobs=-1, refit=False).fit(X, y)
+    else:
+        plan.set_threads(estimator)
+        with plan.limits():
+            GridSearchCV(estimator, PARAM_GRID, scoring='roc_auc', cv=cv_folds, n_jobs=plan.outer, refit=False).fit(X, y)
+    elapsed_time = time.time() - t
+    get_reusable_executor().shutdown(wait=True, kill_workers=True)
+    return elapsed_time, int(np.prod([len(values) for values in PARAM_GRID.values()])) * n_splits
+
+
+def main(cpus, n_rows, n_splits, seed):
+    with tempfile.TemporaryDirectory() as directory:
+        data_path = os.path.join(directory, 'train.pickle')
+        synthetic_features(n_rows, 300, np.random.RandomState(seed)).to_pickle(data_path)
+        print("Training rows: %d, %d CPUs available, budget of %d CPUs" % (n_rows, available_cpus(), cpus))
+        plans = [None] + [CpuPlan(cpus, outer, cpus // outer) for outer in range(cpus, 0, -1) if cpus % outer == 0]
+        for plan in plans:
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                elapsed_time, n_fits = executor.submit(run, plan, data_path, n_splits).result()
+            print("  %-40s %6.1f s, %5.2f fits/s" % (
+                plan or 'default (n_jobs=-1, LightGBM threads)', elapsed_time, n_fits / elapsed_time))
+
+
+if __name__ == "__main__":
+    opt = docopt(__doc__)
+    main(int(opt['--cpus']) if opt['--cpus'] else available_cpus(), int(opt['--n_rows']), int(opt['--n_splits']),
+         int(opt['--seed']))
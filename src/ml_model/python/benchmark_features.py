@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This script benchmarks the feature encodings of `features.py` on synthetic
+model data with the features of the optimizer and hundreds of levels of
+`line_no`. Every encoding is fitted in a new process, as a worker of the
+search would, so the peak resident memory of a fit can be compared. It also
+reports the fit time, the memory of the encoded matrix and the validation AUC.
+
+Usage: benchmark_features.py [--n_rows=<n_rows>] [--n_lines=<n_lines>] [--seed=<seed>]
+
+Options:
+--n_rows=<n_rows>  The number of training rows [default: 200000].
+--n_lines=<n_lines>  The number of levels of `line_no` [default: 300].
+--seed=<seed>  The random seed [default: 123].
+
+Example:
+python src/ml_model/python/benchmark_features.py --n_rows=200000
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from docopt import docopt
+import numpy as np
+import pandas as pd
+from lightgbm import LGBMClassifier
+from scipy import sparse
+from sklearn.metrics import roc_auc_score
+from sklearn.pipeline import Pipeline
+from features import CATEGORICAL_FEATURES, ENCODINGS, NUMERIC_FEATURES, make_preprocessor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir))
+from common.schemas import peak_rss
+
+
+def synthetic_features(n_rows, n_lines, rng):
+    levels = {'day_of_week': ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'],
+              'city': ['city %d' % i for i in range(25)],
+              'line_no': ['%03d' % i for i in range(n_lines)],
+              'asset_class': ['class %d' % i for i in range(6)],
+              'asset_manufactmodel': ['model %d' % i for i in range(40)],
+              'month': list(range(1, 13)), 'is_shuttle': [0, 1]}
+    df = pd.DataFrame({column: rng.choice(levels[column], n_rows) for column in CATEGORICAL_FEATURES})
+    for column in NUMERIC_FEATURES:
+        df[column] = rng.normal(0, 1, n_rows)
+        df.loc[rng.rand(n_rows) < 0.03, column] = np.nan
+    line_effect = dict(zip(levels['line_no'], rng.normal(0, 0.5, n_lines)))
+    logit = -1 + df['line_no'].map(line_effect) + 0.5 * df['hour'].fillna(0) + 0.3 * (df['city'] == 'city 3')
+    df['incident'] = (rng.rand(n_rows) < 1 / (1 + np.exp(-logit))).astype(int)
+    return df
+
+
+def run(encoding, train_path, valid_path):
+    """
+    It fits the pipeline of an encoding in the current process.
+
+    Returns:
+    fit_time (float): The time of the fit.
+    rss (float): The peak resident memory of the fit above the start in megabytes.
+    matrix_size (float): The memory of the encoded training matrix in megabytes.
+    auc (float): The validation AUC.
+    """
+    train, valid = pd.read_pickle(train_path), pd.read_pickle(valid_path)
+    X, y = train.drop(columns='incident'), train['incident']
+    baseline = peak_rss()
+    t = time.time()
+    model = Pipeline(steps=[('preprocessor', make_preprocessor(encoding)),
+                            ('classifier', LGBMClassifier(random_state=123, objective='binary', verbose=-1))])
+    model.fit(X, y)
+    fit_time = time.time() - t
+    rss = peak_rss() - baseline
+    Xt = model.named_steps['preprocessor'].transform(X)
+    if sparse.issparse(Xt):
+        matrix_size = (Xt.data.nbytes + Xt.indices.nbytes + Xt.indptr.nbytes) / 2 ** 20
+    elif isinstance(Xt, pd.DataFrame):
+        matrix_size = Xt.memory_usage(deep=True).sum() / 2 ** 20
+    else:
+        matrix_size = Xt.nbytes / 2 ** 20
+    auc = roc_auc_score(valid['incident'], model.predict_proba(valid.drop(columns='incident'))[:, 1])
+    return fit_time, rss, matrix_size, auc
+
+
+def main(n_rows, n_lines, seed):
+    rng = np.random.RandomState(seed)
+    with tempfile.TemporaryDirectory() as directory:
+        train_path, valid_path = os.path.join(directory, 'train.pickle'), os.path.join(directory, 'valid.pickle')
+        synthetic_features(n_rows, n_lines, rng).to_pickle(train_path)
+        synthetic_features(n_rows // 4, n_lines, rng).to_pickle(valid_path)
+        print("Training rows: %d, %d features, %d levels of line_no" % (
+            n_rows, len(CATEGORICAL_FEATURES) + len(NUMERIC_FEATURES), n_lines))
+        for encoding in ENCODINGS:
+            # a new process for every encoding, the peak memory of a process never goes down
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                fit_time, rss, matrix_size, auc = executor.submit(run, encoding, train_path, valid_path).result()
+            print("  %-7s fit %6.2f s, peak RSS of the worker +%7.1f MB, encoded matrix %7.1f MB, validation AUC %.4f" % (
+                encoding, fit_time, rss, matrix_size, auc))
+
+
+if __name__ == "__main__":
+    opt = docopt(__doc__)
+    main(int(opt['--n_rows']), int(opt['--n_lines']), int(opt['--seed']))
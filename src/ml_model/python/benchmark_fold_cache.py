@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This script benchmarks the preprocessing cache of `fold_cache.py` on a grid
+search of synthetic incidents. It counts and times the fits of the
+`ColumnTransformer` with and without the cache, and checks that the searches
+find the same scores.
+
+Usage: benchmark_fold_cache.py [--n_rows=<n_rows>] [--n_splits=<n_splits>] [--params=<params>] [--seed=<seed>]
+
+Options:
+--n_rows=<n_rows>  The number of training rows [default: 20000].
+--n_splits=<n_splits>  The number of folds [default: 10].
+--params=<params>  The parameters of `search_strategies.PARAM_GRID` to search, separated by commas [default: classifier__num_leaves,classifier__learning_rate].
+--seed=<seed>  The random seed [default: 123].
+
+Example:
+python src/ml_model/python/benchmark_fold_cache.py --n_rows=20000 --n_splits=10
+"""
+
+import time
+from docopt import docopt
+import numpy as np
+from sklearn.compose import ColumnTransformer
+from sklearn.model_selection import StratifiedKFold
+from benchmark_search import make_estimator, synthetic_incidents
+from fold_cache import PreprocessingCache
+from search_strategies import PARAM_GRID, make_search, n_fits
+
+
+class TimedColumnTransformer(ColumnTransformer):
+    """
+    A `ColumnTransformer` that counts and times its fits, the cached fits are not counted.
+    """
+    n_fits = 0
+    fit_time = 0.0
+
+    def fit_transform(self, X, y=None, **params):
+        t = time.time()
+        Xt = super().fit_transform(X, y, **params)
+        TimedColumnTransformer.n_fits += 1
+        TimedColumnTransformer.fit_time += time.time() - t
+        return Xt
+
+
+def main(n_rows, n_splits, params, seed):
+    train = synthetic_incidents(n_rows, np.random.RandomState(seed))
+    X, y = train.drop(columns='incident'), train['incident']
+    param_grid = {name: PARAM_GRID[name] for name in params}
+    print("Training rows: %d, %d folds, %d configurations" % (
+        n_rows, n_splits, np.prod([len(values) for values in param_grid.values()])))
+
+    scores = {}
+    for cached in [False, True]:
+        TimedColumnTransformer.n_fits, TimedColumnTransformer.fit_time = 0, 0.0
+        with PreprocessingCache() as cache:
+            estimator = make_estimator(cache.memory if cached else None, TimedColumnTransformer)
+            search = make_search('grid', estimator, StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=123),
+                                 len(X), param_grid=param_grid, n_jobs=1, verbose=0)
+            t = time.time()
+            search.fit(X, y)
+            elapsed_time = time.time() - t
+            cache_fits, cache_time = cache.stats()
+        scores[cached] = search.cv_results_['mean_test_score']
+        print("  %-8s %7.1f s, %4d pipeline fits, %4d preprocessing fits in %6.1f s" % (
+            'cached' if cached else 'uncached', elapsed_time, n_fits(search) + 1, TimedColumnTransformer.n_fits,
+            TimedColumnTransformer.fit_time))
+        if cached:
+            print("  the cache has %d entries from %.1f s of fits" % (cache_fits, cache_time))
+    print("Same scores: %s" % np.allclose(scores[False], scores[True]))
+
+
+if __name__ == "__main__":
+    opt = docopt(__doc__)
+    main(int(opt['--n_rows']), int(opt['--n_splits']), opt['--params'].split(','), int(opt['--seed']))
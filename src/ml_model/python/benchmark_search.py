@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This script benchmarks the hyperparameter search strategies of
+`search_strategies.py` against the exhaustive grid on synthetic incidents with
+the categorical and numeric features of the model data. It reports the time,
+the number of pipeline fits, the best cross-validation AUC and the test AUC of
+the best pipeline of each strategy.
+
+Usage: benchmark_search.py [--n_rows=<n_rows>] [--n_splits=<n_splits>] [--n_trials=<n_trials>] [--strategies=<strategies>] [--seed=<seed>]
+
+Options:
+--n_rows=<n_rows>  The number of training rows [default: 4000].
+--n_splits=<n_splits>  The number of folds [default: 5].
+--n_trials=<n_trials>  The number of configurations of the bayes search [default: 60].
+--strategies=<strategies>  The strategies to compare, separated by commas [default: grid,halving,halving_random,bayes].
+--seed=<seed>  The random seed [default: 123].
+
+Example:
+python src/ml_model/python/benchmark_search.py --n_rows=4000 --n_splits=5
+"""
+
+import time
+from docopt import docopt
+import numpy as np
+import pandas as pd
+from lightgbm import LGBMClassifier
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import StratifiedKFold
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from search_strategies import make_search, n_fits
+
+CATEGORICAL_FEATURES = ['day_of_week', 'city', 'line_no', 'month']
+NUMERIC_FEATURES = ['hour', 'bus_age', 'temp', 'total_precip', 'experience_in_months']
+
+
+def synthetic_incidents(n_rows, rng):
+    """
+    Incidents whose probability depends on a few of the features.
+    """
+    df = pd.DataFrame({
+        'day_of_week': rng.choice(['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'], n_rows),
+        'city': rng.choice(['vancouver', 'burnaby', 'surrey', 'richmond', 'coquitlam'], n_rows),
+        'line_no': rng.choice(['%03d' % i for i in range(40)], n_rows),
+        'month': rng.randint(1, 13, n_rows),
+        'hour': rng.randint(0, 24, n_rows),
+        'bus_age': rng.randint(0, 20, n_rows).astype(float),
+        'temp': rng.normal(10, 7, n_rows),
+        'total_precip': rng.exponential(2, n_rows),
+        'experience_in_months': rng.exponential(60, n_rows).round()})
+    df.loc[rng.rand(n_rows) < 0.05, 'temp'] = np.nan
+    logit = (-1.5 + 0.08 * (df['hour'] - 12).abs() + 0.4 * (df['city'] == 'surrey') + 0.1 * df['total_precip']
+             - 0.01 * df['experience_in_months'] + 0.05 * df['bus_age'] + rng.normal(0, 1, n_rows))
+    df['incident'] = (rng.rand(n_rows) < 1 / (1 + np.exp(-logit))).astype(int)
+    return df
+
+
+def make_estimator(memory=None, transformer_class=ColumnTransformer):
+    """
+    The preprocessing and the classifier of `2_model_optimizer.py`.
+    """
+    preprocessor = transformer_class(transformers=[
+        ('num', Pipeline(steps=[('imputer', SimpleImputer(strategy='median')), ('scaler', StandardScaler())]),
+         NUMERIC_FEATURES),
+        ('cat', Pipeline(steps=[('imputer', SimpleImputer(strategy='most_frequent')),
+                                ('onehot', OneHotEncoder(handle_unknown='ignore'))]), CATEGORICAL_FEATURES)])
+    return Pipeline(steps=[('preprocessor', preprocessor),
+                           ('classifier', LGBMClassifier(random_state=123, objective='binary', verbose=-1))],
+                    memory=memory)
+
+
+def main(n_rows, n_splits, n_trials, strategies, seed):
+    rng = np.random.RandomState(seed)
+    train = synthetic_incidents(n_rows, rng)
+    test = synthetic_incidents(n_rows // 4, rng)
+    X, y = train.drop(columns='incident'), train['incident']
+    print("Training rows: %d, incident rate %.2f, %d folds" % (n_rows, y.mean(), n_splits))
+
+    for strategy in strategies:
+        cv_folds = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=123)
+        search = make_search(strategy, make_estimator(), cv_folds, len(X), n_jobs=1, n_trials=n_trials, verbose=0)
+        t = time.time()
+        search.fit(X, y)
+        elapsed_time = time.time() - t
+        test_auc = roc_auc_score(test['incident'], search.best_estimator_.predict_proba(test.drop(columns='incident'))[:, 1])
+        print("  %-14s %8.1f s, %5d fits, best CV AUC %.4f, test AUC %.4f" % (
+            strategy, elapsed_time, n_fits(search), search.best_score_, test_auc))
+
+
+if __name__ == "__main__":
+    opt = docopt(__doc__)
+    main(int(opt['--n_rows']), int(opt['--n_splits']), int(opt['--n_trials']), opt['--strategies'].split(','),
+         int(opt['--seed']))
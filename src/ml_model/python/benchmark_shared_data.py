@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+This script benchmarks a parallel grid search on the data frame against one on
+the memory-mapped matrix of `shared_data.py`, on synthetic model data. Every
+search is run in a new process with a new pool of workers, and the peak
+resident memory of the process and of each of its workers is read from /proc
+after the search, with the proportional memory (PSS) that splits the shared
+pages between the processes. It also checks that both searches give the same
+scores.
+
+Usage: benchmark_shared_data.py [--n_rows=<n_rows>] [--n_jobs=<n_jobs>] [--n_splits=<n_splits>] [--encoding=<encoding>] [--seed=<seed>]
+
+Options:
+--n_rows=<n_rows>  The number of training rows [default: 300000].
+--n_jobs=<n_jobs>  The numbers of workers, separated by commas [default: 1,2,4].
+--n_splits=<n_splits>  The number of folds [default: 4].
+--encoding=<encoding>  The feature encoding of `features.py` [default: sparse].
+--seed=<seed>  The random seed [default: 123].
+
+Example:
+python src/ml_model/python/benchmark_shared_data.py --n_rows=300000 --n_jobs=1,2,4
+"""
+
+import glob
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from docopt import docopt
+from joblib.externals.loky import get_reusable_executor
+import numpy as np
+import pandas as pd
+from lightgbm import LGBMClassifier
+from sklearn.model_selection import GridSearchCV, StratifiedKFold
+from sklearn.pipeline import Pipeline
+from benchmark_features import synthetic_features
+from features import CATEGORICAL_FEATURES, FEATURES, make_preprocessor
+from shared_data import SharedTrainingData
+
+PARAM_GRID = {'classifier__num_leaves': [5, 30]}
+
+
+def memory(pid, field):
+    """
+    It returns a memory field of /proc in megabytes, 0 if the process is gone.
+    """
+    file_name = 'smaps_rollup' if field == 'Pss:' else 'status'
+    try:
+        with open('/proc/%d/%s' % (pid, file_name)) as status:
+            for line in status:
+                if line.startswith(field):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def descendants(pid):
+    children = []
+    for file_path in glob.glob('/proc/%d/task/*/children' % pid):
+        with open(file_path) as children_file:
+            children += [int(child) for child in children_file.read().split()]
+    return children + [grandchild for child in children for grandchild in descendants(child)]
+
+
+def run(mode, n_jobs, data_path, n_splits, encoding):
+    """
+    It runs one search in the current process.
+
+    Returns:
+    elapsed_time (float): The time of the search.
+    main_peak (float): The peak resident memory of the process in megabytes.
+    worker_peaks (list): The peak resident memory of each worker in megabytes.
+    pss (float): The proportional memory of the process and its workers after the search in megabytes.
+    scores (ndarray): The mean validation score of each configuration.
+    """
+    data = pd.read_pickle(data_path)
+    X, y = data.drop(columns='incident'), data['incident']
+    cv_folds = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=123)
+    t = time.time()
+    with tempfile.TemporaryDirectory() as directory:
+        fit_params = {}
+        if mode == 'shared':
+            shared = SharedTrainingData(X, y, CATEGORICAL_FEATURES, directory, FEATURES)
+            del X, y, data
+            X, y, columns, fit_params = shared.X, shared.y, shared.columns, shared.fit_params(encoding)
+        else:
+            columns = None
+        estimator = Pipeline(steps=[('preprocessor', make_preprocessor(encoding, columns)),
+                                    ('classifier', LGBMClassifier(random_state=123, objective='binary', verbose=-1))])
+        search = GridSearchCV(estimator, PARAM_GRID, scoring='roc_auc', cv=cv_folds, n_jobs=n_jobs, refit=False)
+        search.fit(X, y, **fit_params)
+        elapsed_time = time.time() - t
+        workers = descendants(os.getpid())
+        worker_peaks = [memory(pid, 'VmHWM:') for pid in workers]
+        pss = memory(os.getpid(), 'Pss:') + sum(memory(pid, 'Pss:') for pid in workers)
+    # the idle workers of joblib would otherwise be waited for at the exit of the process
+    get_reusable_executor().shutdown(wait=True, kill_workers=True)
+    return elapsed_time, memory(os.getpid(), 'VmHWM:'), worker_peaks, pss, search.cv_results_['mean_test_score']
+
+
+def main(n_rows, n_jobs_list, n_splits, encoding, seed):
+    with tempfile.TemporaryDirectory() as directory:
+        data_path = os.path.join(directory, 'train.pickle')
+        synthetic_features(n_rows, 300, np.random.RandomState(seed)).to_pickle(data_path)
+        print("Training rows: %d, %d folds, %d configurations, %s encoding" % (
+            n_rows, n_splits, len(PARAM_GRID['classifier__num_leaves']), encoding))
+        for n_jobs in n_jobs_list:
+            scores = {}
+            for mode in ['frame', 'shared']:
+                # a new process for every search, the peak memory of a process never goes down
+                with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                    elapsed_time, main_peak, worker_peaks, pss, scores[mode] = executor.submit(
+                        run, mode, n_jobs, data_path, n_splits, encoding).result()
+                print("  %d workers, %-6s %6.1f s, peak RSS main %6.1f MB, workers %s MB (total %7.1f MB), PSS after %7.1f MB" % (
+                    n_jobs, mode, elapsed_time, main_peak, '/'.join('%.0f' % peak for peak in worker_peaks) or '-',
+                    main_peak + sum(worker_peaks), pss))
+            print("  same scores: %s" % np.allclose(scores['frame'], scores['shared']))
+
+
+if __name__ == "__main__":
+    opt = docopt(__doc__)
+    main(int(opt['--n_rows']), [int(n_jobs) for n_jobs in opt['--n_jobs'].split(',')], int(opt['--n_splits']),
+         opt['--encoding'], int(opt['--seed']))
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+The CPU budget of the model scripts. A search runs several fits at once and
+every LightGBM fit, and the BLAS of the linear models, would otherwise start a
+thread per core, so a machine with n cores ends up with n x n threads. A
+`CpuPlan` splits a budget of CPUs between the fits that run in parallel
+(outer) and the threads of each fit (inner): the outer parallelism goes to the
+`n_jobs` of the search, the inner threads to the `n_jobs` of the classifier
+and, with threadpoolctl and joblib, to the OpenMP and BLAS pools of the main
+process and of the workers.
+"""
+
+import os
+from contextlib import ExitStack
+from joblib import parallel_backend
+from threadpoolctl import threadpool_limits
+
+
+class CpuPlan:
+    """
+    A split of a CPU budget.
+
+    Parameters:
+    cpus (int): The number of CPUs of the budget.
+    outer (int): The number of fits that run in parallel.
+    inner (int): The number of threads of each fit.
+    """
+
+    def __init__(self, cpus, outer, inner):
+        self.cpus = cpus
+        self.outer = outer
+        self.inner = inner
+
+    def __str__(self):
+        return "%d CPUs: %d parallel fits x %d threads" % (self.cpus, self.outer, self.inner)
+
+    def set_threads(self, estimator):
+        """
+        It sets the threads of the classifier of a pipeline, or of an estimator,
+        that has an `n_jobs` parameter.
+        """
+        params = estimator.get_params()
+        name = 'classifier__n_jobs' if 'classifier__n_jobs' in params else 'n_jobs'
+        if name in params:
+            estimator.set_params(**{name: self.inner})
+        return estimator
+
+    def limits(self):
+        """
+        It returns a context that limits the thread pools of the process to the
+        inner threads and tells joblib to start its workers with the same limit.
+        """
+        stack = ExitStack()
+        stack.enter_context(threadpool_limits(limits=self.inner))
+        stack.enter_context(parallel_backend('loky', inner_max_num_threads=self.inner))
+        return stack
+
+
+def available_cpus():
+    """
+    It returns the number of CPUs the process may run on.
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def plan_cpus(cpus=None, n_tasks=1):
+    """
+    It splits a CPU budget. The fits of a search are small, so the CPUs go to
+    parallel fits first, up to the number of fits, and the rest to the threads
+    of each fit.
+
+    Parameters:
+    cpus (int): The number of CPUs, all the available ones if it is None.
+    n_tasks (int): The number of fits that can run at the same time.
+
+    Returns:
+    plan (CpuPlan): The split of the CPUs.
+    """
+    cpus = available_cpus() if cpus is None else cpus
+    if cpus < 1:
+        raise ValueError("The CPU budget should be at least 1: ", cpus)
+    outer = max(min(cpus, n_tasks), 1)
+    return CpuPlan(cpus, outer, max(cpus // outer, 1))
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+The feature encodings of the model scripts. `2_model_optimizer.py` tunes the
+model with one of them and `3_model_generator.py` fits the final model with
+the native one:
+
+- dense: median imputation and scaling of the numeric features and a dense
+  one-hot encoding of the categorical ones, a float64 column per level.
+- sparse: the same features, but the one-hot encoding and the output of the
+  `ColumnTransformer` stay a CSR matrix, so the hundreds of levels of
+  `line_no` only take memory for the rows that have them.
+- native: the features are passed as they are and the categorical ones as
+  pandas categories, which LightGBM splits on directly. The missing values
+  are left to LightGBM. The other models can't read categories.
+
+Every encoding uses the columns of `FEATURES` only, the other columns of the
+data are dropped.
+"""
+
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+ENCODINGS = ['dense', 'sparse', 'native']
+
+CATEGORICAL_FEATURES = ['day_of_week', 'city', 'line_no', "asset_class", 'asset_manufactmodel', 'month', 'is_shuttle']
+
+NUMERIC_FEATURES = ['hour', 'bus_age', 'bus_carry_capacity', 'pressure', 'rel_hum', 'elev', 'temp', 'visib', 'wind_dir',
+                    'wind_spd', 'total_precip', 'total_rain', 'total_snow', 'experience_in_months']
+
+FEATURES = NUMERIC_FEATURES + CATEGORICAL_FEATURES
+
+
+def feature_columns(columns, features=FEATURES):
+    """
+    It returns the columns that are features, in the order of the columns.
+    """
+    return [column for column in columns if column in features]
+
+
+class NativeCategories(BaseEstimator, TransformerMixin):
+    """
+    It converts the categorical columns to pandas categories with the levels
+    seen in fit, so the codes are the same for every data set and the unseen
+    levels are missing values.
+
+    Parameters:
+    categorical_features (list): The categorical columns, the other columns that
+    aren't numeric are categorical too.
+    features (list): The columns to keep, all of them if it is None.
+    """
+
+    def __init__(self, categorical_features=None, features=None):
+        self.categorical_features = categorical_features
+        self.features = features
+
+    def fit(self, X, y=None):
+        listed = set(self.categorical_features or [])
+        self.columns_ = list(X.columns) if self.features is None else feature_columns(X.columns, self.features)
+        self.categories_ = {}
+        for column in self.columns_:
+            dtype = X[column].dtype
+            if (column in listed or isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_object_dtype(dtype)
+                    or pd.api.types.is_string_dtype(dtype)):
+                self.categories_[column] = pd.Categorical(X[column]).categories
+        return self
+
+    def transform(self, X):
+        X = X[self.columns_].copy()
+        for column, categories in self.categories_.items():
+            X[column] = pd.Categorical(X[column], categories=categories)
+        return X
+
+
+def one_hot_encoder(sparse):
+    # `sparse` is named `sparse_output` from scikit-learn 1.2
+    try:
+        return OneHotEncoder(sparse_output=sparse, handle_unknown='ignore')
+    except TypeError:
+        return OneHotEncoder(sparse=sparse, handle_unknown='ignore')
+
+
+def make_preprocessor(encoding, columns=None):
+    """
+    It creates the preprocessing of an encoding.
+
+    Parameters:
+    encoding (str): One of `ENCODINGS`.
+    columns (list): The names of the columns of a numeric matrix of
+    `shared_data.SharedTrainingData` to select the features by position, None
+    for a data frame. The native encoding needs a matrix of the features only.
+
+    Returns:
+    preprocessor (sklearn transformer): The preprocessing step of the model pipelines.
+    """
+    if encoding == 'native':
+        if columns is None:
+            return NativeCategories(CATEGORICAL_FEATURES, FEATURES)
+        # the matrix already has the codes of the categories, LightGBM is given their positions
+        if sorted(columns) != sorted(FEATURES):
+            raise ValueError("The native encoding needs a matrix of exactly the features: ", FEATURES)
+        return 'passthrough'
+    if encoding not in ENCODINGS:
+        raise ValueError("The feature encoding should be one of: ", ENCODINGS)
+
+    numeric_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='median')),
+        ('scaler', StandardScaler())])
+    categorical_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy="most_frequent", fill_value='missing')),
+        ('onehot', one_hot_encoder(encoding == 'sparse'))])
+    numeric_features, categorical_features = NUMERIC_FEATURES, CATEGORICAL_FEATURES
+    if columns is not None:
+        numeric_features = [columns.index(column) for column in NUMERIC_FEATURES]
+        categorical_features = [columns.index(column) for column in CATEGORICAL_FEATURES]
+    # a threshold of 1 keeps the stacked output sparse whatever its density
+    return ColumnTransformer(
+        transformers=[
+            ('num', numeric_transformer, numeric_features),
+            ('cat', categorical_transformer, categorical_features)],
+        sparse_threshold=1.0 if encoding == 'sparse' else 0.0)
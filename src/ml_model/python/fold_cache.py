@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+A cache of the fitted preprocessing of the searches of `2_model_optimizer.py`.
+The candidates of a search only change the `classifier__*` parameters, so the
+`ColumnTransformer` fitted on a fold is the same for all of them. With
+`Pipeline(memory=cache.memory)` the transformer fitted on the rows of a fold,
+and the matrix it returns, are stored on disk the first time and loaded by
+every other candidate. The key is the hash of the transformer parameters and
+the rows, so a change of the preprocessing or of the folds is a new entry. The
+cache is on disk, so the parallel workers of a search share it. Only the dense
+and sparse encodings of `features.py` have a transformer to cache, the native
+one passes the shared matrix through.
+"""
+
+import glob
+import json
+import os
+import shutil
+import tempfile
+import time
+from joblib import Memory
+
+
+class PreprocessingCache:
+    """
+    A joblib cache of the fitted transformers of a pipeline.
+
+    Parameters:
+    cache_dir (str): A directory to keep the cache between runs, a temporary one
+    that is removed on close if it is None.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.temporary = cache_dir is None
+        self.cache_dir = tempfile.mkdtemp(prefix='preprocessing_') if self.temporary else cache_dir
+        self.memory = Memory(self.cache_dir, verbose=0)
+        self.opened = time.time()
+
+    def stats(self):
+        """
+        It returns the fits of the transformers since the cache was opened.
+
+        Returns:
+        n_fits (int): The number of fits, one per fold and preprocessing.
+        fit_time (float): The time of the fits in seconds.
+        """
+        n_fits, fit_time = 0, 0.0
+        for file_path in glob.glob(os.path.join(self.cache_dir, 'joblib', '**', 'metadata.json'), recursive=True):
+            with open(file_path) as metadata_file:
+                metadata = json.load(metadata_file)
+            if metadata.get('time', 0) >= self.opened:
+                n_fits += 1
+                fit_time += metadata.get('duration', 0)
+        return n_fits, fit_time
+
+    def close(self):
+        if self.temporary:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+The model artifact that `2_model_optimizer.py` writes and `3_model_generator.py`
+reads. It is a versioned dictionary with the fitted best pipeline of the
+search, the complete parameters of its classifier, the feature schema and the
+cross-validation results, so the generator can use the fitted model instead
+of training it again. The artifacts of the earlier versions of the optimizer,
+a pickled unfitted `LGBMClassifier`, are read as version 0.
+"""
+
+import datetime
+import pickle
+import pandas as pd
+
+MODEL_ARTIFACT_VERSION = 1
+
+
+def make_model_artifact(search, search_name, encoding, shared, test_score):
+    """
+    It collects the results of a fitted search.
+
+    Parameters:
+    search (object): The fitted search, with the interface of `GridSearchCV`.
+    search_name (str): The strategy of the search.
+    encoding (str): The feature encoding of the search.
+    shared (SharedTrainingData): The training data of the search.
+    test_score (float): The test AUC of the best pipeline.
+
+    Returns:
+    artifact (dict): The model artifact.
+    """
+    # the cache of the search is a temporary directory
+    best_estimator = search.best_estimator_.set_params(memory=None)
+    return {
+        'version': MODEL_ARTIFACT_VERSION,
+        'created': datetime.datetime.now().isoformat(),
+        'search': search_name,
+        'encoding': encoding,
+        'best_params': dict(search.best_params_),
+        'classifier_params': best_estimator.named_steps['classifier'].get_params(),
+        'best_score': search.best_score_,
+        'test_score': test_score,
+        'best_estimator': best_estimator,
+        'feature_schema': {'columns': shared.columns,
+                           'categorical_features': list(shared.categories),
+                           'categories': {column: list(categories) for column, categories in shared.categories.items()}},
+        'native_categories': shared.native,
+        'cv_results': pd.DataFrame(search.cv_results_),
+    }
+
+
+def save_model_artifact(artifact, file_path):
+    with open(file_path, 'wb') as out:
+        pickle.dump(artifact, out)
+
+
+def load_model_artifact(file_path):
+    """
+    It reads a model artifact.
+
+    Returns:
+    artifact (dict): The model artifact, an unfitted classifier of an earlier
+    optimizer only has the `version` 0 and its `classifier_params`.
+    """
+    with open(file_path, 'rb') as infile:
+        artifact = pickle.load(infile)
+    if not isinstance(artifact, dict):
+        return {'version': 0, 'encoding': None, 'best_estimator': None, 'classifier_params': artifact.get_params()}
+    if artifact.get('version', 0) > MODEL_ARTIFACT_VERSION:
+        raise ValueError("The model artifact is of a newer version: ", artifact.get('version'))
+    return artifact
+
+
+def can_warm_start(artifact):
+    """
+    It returns whether the fitted classifier of an artifact reads the native
+    categories of the generator, only the native encoding does.
+    """
+    return artifact['version'] >= 1 and artifact['encoding'] == 'native' and artifact['best_estimator'] is not None
+
+
+def warm_classifier(artifact):
+    """
+    It returns the fitted classifier of an artifact, ready to read a data frame
+    with the native categories of the artifact.
+
+    The classifier was fitted on the codes of the categories, LightGBM is given
+    the levels of each categorical column so it converts a data frame to the
+    same codes, as it does for a classifier fitted on the data frame. The
+    levels of the data frame that aren't in the artifact are missing values
+    for the classifier.
+    """
+    classifier = artifact['best_estimator'].named_steps['classifier']
+    categories = artifact['feature_schema']['categories']
+    classifier.booster_.pandas_categorical = [categories[column] for column in artifact['feature_schema']['columns']
+                                              if column in categories]
+    return classifier
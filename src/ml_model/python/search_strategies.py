@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+The hyperparameter search strategies of `2_model_optimizer.py`. Every strategy
+searches the same LightGBM grid with the same pipeline, folds and scoring, and
+returns an object with the `fit`, `best_params_`, `best_score_` and
+`best_estimator_` of `GridSearchCV`:
+
+- grid: every configuration on every fold (`GridSearchCV`).
+- halving: successive halving of the grid, every configuration is first
+  scored on a sample of the rows and only the best third is kept for the next
+  round with three times more rows, up to all the rows in the last round
+  (`HalvingGridSearchCV`). The scores on a few hundred rows favour the fast
+  learning rates, so there are at most `HALVING_ROUNDS` rounds and the first
+  one has at least `MIN_RESOURCES` rows.
+- halving_random: successive halving of as many random configurations of the
+  grid as the rounds from `MIN_RESOURCES` rows to all the rows allow
+  (`HalvingRandomSearchCV`).
+- bayes: a sequential model-based search (the TPE sampler of optuna) that
+  scores the folds of a configuration in batches of parallel fits and prunes
+  it when its mean score is below the median of the earlier configurations at
+  that fold. The configurations are tried one at a time, so the sampler
+  proposes each of them from the scores of all the earlier ones.
+"""
+
+import time
+import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.base import clone
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401, it enables the halving searches
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import GridSearchCV, HalvingGridSearchCV, HalvingRandomSearchCV
+
+STRATEGIES = ['grid', 'halving', 'halving_random', 'bayes']
+FACTOR = 3
+HALVING_ROUNDS = 3
+MIN_RESOURCES = 500
+
+# 3 x 3 x 3 x 3 x 2 x 4 = 648 configurations
+PARAM_GRID = {
+    'classifier__max_depth': [10, 20, 40],
+    'classifier__num_leaves': [5, 15, 30],
+    'classifier__reg_alpha': [0, 0.1, 1],
+    'classifier__reg_lambda': [0, 0.1, 1],
+    'classifier__subsample': [0.8, 1],
+    'classifier__learning_rate': [0.001, 0.01, 0.1, 1]
+    }
+
+
+def take(data, index):
+    """
+    It returns some rows of a data frame, a series or an array.
+    """
+    return data.iloc[index] if hasattr(data, 'iloc') else data[index]
+
+
+def fit_and_score(estimator, params, X, y, train_index, test_index, scorer, fit_params):
+    """
+    It fits a configuration on the train rows of a fold and scores it on the test rows.
+    """
+    model = clone(estimator).set_params(**params)
+    model.fit(take(X, train_index), take(y, train_index), **fit_params)
+    return scorer(model, take(X, test_index), take(y, test_index))
+
+
+class PrunedBayesSearchCV:
+    """
+    A sequential model-based search over a grid with pruning of the
+    configurations that score below the median after some folds.
+
+    Parameters:
+    estimator (sklearn estimator): The pipeline to tune.
+    param_grid (dict): The values of each parameter.
+    scoring (str): The name of the scorer.
+    cv (cross-validation generator): The folds.
+    n_trials (int): The number of configurations to try.
+    n_warmup_folds (int): The number of folds of a configuration that are scored before it can be pruned.
+    n_jobs (int): The number of folds of a configuration that are fitted in parallel, -1 for all the
+    processors. A configuration can only be pruned after a batch of folds.
+    random_state (int): The seed of the sampler.
+    verbose (int): Whether to log every configuration.
+    """
+
+    def __init__(self, estimator, param_grid, scoring='roc_auc', cv=None, n_trials=60, n_warmup_folds=2,
+                 n_jobs=1, random_state=None, verbose=0):
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.scoring = scoring
+        self.cv = cv
+        self.n_trials = n_trials
+        self.n_warmup_folds = n_warmup_folds
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.verbose = verbose
+
+    def fit(self, X, y, **fit_params):
+        # optuna is only needed by this strategy
+        import optuna
+
+        if not self.verbose:
+            optuna.logging.set_verbosity(optuna.logging.WARNING)
+        scorer = get_scorer(self.scoring)
+        folds = list(self.cv.split(X, y))
+        self.n_fits_ = 0
+
+        batch_size = max(min(effective_n_jobs(self.n_jobs), len(folds)), 1)
+
+        def objective(trial):
+            params = {name: trial.suggest_categorical(name, values) for name, values in self.param_grid.items()}
+            scores = []
+            for start in range(0, len(folds), batch_size):
+                scores += parallel(delayed(fit_and_score)(self.estimator, params, X, y, train_index, test_index,
+                                                          scorer, fit_params)
+                                   for train_index, test_index in folds[start:start + batch_size])
+                self.n_fits_ += len(folds[start:start + batch_size])
+                for fold in range(start, len(scores)):
+                    trial.report(np.mean(scores[:fold + 1]), fold)
+                if trial.should_prune():
+                    raise optuna.TrialPruned()
+            return np.mean(scores)
+
+        self.study_ = optuna.create_study(
+            direction='maximize', sampler=optuna.samplers.TPESampler(seed=self.random_state),
+            pruner=optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=self.n_warmup_folds))
+        # the configurations are tried one at a time, the workers of the folds are kept between them
+        with Parallel(n_jobs=self.n_jobs) as parallel:
+            self.study_.optimize(objective, n_trials=self.n_trials)
+
+        self.best_params_ = self.study_.best_params
+        self.best_score_ = self.study_.best_value
+        # one row per configuration, with its parameters, its mean score and whether it was pruned
+        self.cv_results_ = self.study_.trials_dataframe().to_dict('list')
+        t = time.time()
+        self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_).fit(X, y, **fit_params)
+        self.refit_time_ = time.time() - t
+        return self
+
+
+def halving_min_resources(n_samples):
+    """
+    It returns the number of rows of the first round of the halving of a grid,
+    so that the last round has all the rows.
+    """
+    n_rounds = HALVING_ROUNDS
+    while n_rounds > 1 and n_samples // FACTOR ** (n_rounds - 1) < MIN_RESOURCES:
+        n_rounds -= 1
+    return n_samples // FACTOR ** (n_rounds - 1)
+
+
+def make_search(strategy, estimator, cv, n_samples, param_grid=PARAM_GRID, scoring='roc_auc', n_jobs=-1,
+                n_trials=60, random_state=123, verbose=2):
+    """
+    It creates the hyperparameter search of a strategy.
+
+    Parameters:
+    strategy (str): One of `STRATEGIES`.
+    estimator (sklearn estimator): The pipeline to tune.
+    cv (cross-validation generator): The folds.
+    n_samples (int): The number of rows the search is fitted on.
+    param_grid (dict): The values of each parameter.
+    scoring (str): The name of the scorer.
+    n_jobs (int): The number of fits in parallel, -1 for all the processors.
+    n_trials (int): The number of configurations of the bayes strategy.
+    random_state (int): The seed of the sampling of the rows and the configurations.
+    verbose (int): The verbosity of the search.
+
+    Returns:
+    search (object): The search, with the interface of `GridSearchCV`.
+    """
+    if strategy == 'grid':
+        return GridSearchCV(estimator=estimator, param_grid=param_grid, scoring=scoring, n_jobs=n_jobs, cv=cv,
+                            verbose=verbose)
+    if strategy == 'halving':
+        return HalvingGridSearchCV(estimator=estimator, param_grid=param_grid, factor=FACTOR,
+                                   min_resources=halving_min_resources(n_samples), scoring=scoring,
+                                   n_jobs=n_jobs, cv=cv, return_train_score=False,
+                                   random_state=random_state, verbose=verbose)
+    if strategy == 'halving_random':
+        return HalvingRandomSearchCV(estimator=estimator, param_distributions=param_grid, factor=FACTOR,
+                                     min_resources=min(MIN_RESOURCES, n_samples), scoring=scoring,
+                                     n_jobs=n_jobs, cv=cv, return_train_score=False,
+                                     random_state=random_state, verbose=verbose)
+    if strategy == 'bayes':
+        return PrunedBayesSearchCV(estimator=estimator, param_grid=param_grid, scoring=scoring, cv=cv,
+                                   n_trials=n_trials, n_jobs=n_jobs, random_state=random_state, verbose=verbose)
+    raise ValueError("The search strategy should be one of: ", STRATEGIES)
+
+
+def n_fits(search):
+    """
+    It returns the number of pipeline fits of a fitted search on the folds,
+    without the final refit.
+    """
+    if isinstance(search, PrunedBayesSearchCV):
+        return search.n_fits_
+    return len(search.cv_results_['params']) * search.n_splits_
+
+
+def max_parallel_fits(strategy, cv, param_grid=PARAM_GRID):
+    """
+    It returns the number of fits of a search that can run at the same time,
+    the fits of the first round or the folds of a configuration of the bayes
+    strategy.
+    """
+    if strategy == 'bayes':
+        return cv.get_n_splits()
+    return int(np.prod([len(values) for values in param_grid.values()])) * cv.get_n_splits()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+The training data of the searches of `2_model_optimizer.py` as one contiguous
+numeric matrix in a memory-mapped file. joblib sends a memory-mapped array to
+its workers as a reference to the file, so all the workers read the same
+pages instead of unpickling their own copy of the data frame for every task.
+
+The numeric columns are stored as they are and the categorical ones as the
+codes of their levels in the training data, as floats: a missing value is
+NaN and a level that wasn't in the training data is -1. The one-hot encoders
+ignore the -1 codes and LightGBM takes the negative codes as missing values,
+as the pipelines on the data frame do with the unseen levels.
+"""
+
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from features import NativeCategories
+
+
+class SharedTrainingData:
+    """
+    The features and the target of a search in memory-mapped files.
+
+    Parameters:
+    X (DataFrame): The features.
+    y (Series): The target.
+    categorical_features (list): The categorical columns, the other columns that
+    aren't numeric are categorical too, as in `features.NativeCategories`.
+    directory (str): A directory for the files, a temporary one if it is None.
+    features (list): The columns to keep in the matrix, all of them if it is None.
+    """
+
+    def __init__(self, X, y, categorical_features, directory=None, features=None):
+        self.directory = tempfile.mkdtemp(prefix='shared_data_', dir=directory)
+        # the levels of the native encoding, so the codes are the ones of its categories
+        self.native = NativeCategories(categorical_features, features).fit(X)
+        self.columns = self.native.columns_
+        self.categories = self.native.categories_
+        self.X = self.share('X', self.encode(X))
+        self.y = self.share('y', np.ascontiguousarray(y))
+
+    def encode(self, X):
+        """
+        It returns the features of a data frame as a C-contiguous float64 matrix
+        with the codes of the training levels.
+        """
+        matrix = np.empty((len(X), len(self.columns)), dtype=np.float64)
+        for i, column in enumerate(self.columns):
+            if column in self.categories:
+                values = X[column]
+                codes = pd.Categorical(values, categories=self.categories[column]).codes.astype(np.float64)
+                codes[values.isna().values] = np.nan
+                matrix[:, i] = codes
+            else:
+                matrix[:, i] = X[column].astype(np.float64)
+        return matrix
+
+    def share(self, name, array):
+        file_path = os.path.join(self.directory, name + '.npy')
+        np.save(file_path, array)
+        return np.load(file_path, mmap_mode='r')
+
+    def indices(self, columns):
+        """
+        It returns the positions of some columns in the matrix.
+        """
+        return [self.columns.index(column) for column in columns]
+
+    @property
+    def categorical_indices(self):
+        return self.indices(list(self.categories))
+
+    def fit_params(self, encoding):
+        """
+        It returns the fit parameters of the pipelines of an encoding on the matrix,
+        LightGBM is told which columns are the codes of the native categories.
+        """
+        return {'classifier__categorical_feature': self.categorical_indices} if encoding == 'native' else {}
+
+    @property
+    def nbytes(self):
+        return self.X.nbytes + self.y.nbytes
+
+    def close(self):
+        self.X = self.y = None
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
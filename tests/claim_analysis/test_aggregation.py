@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+A regression test of `aggregation.aggregate`: the claim and verb colour data
+frames must be the ones the original `claim_description.py` created. The
+reference is the code of the script after the parsing as it was before the
+token store, the typo tables and the colour tables, with the `replace` chains,
+the dictionary counts and the per row colour lookups.
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, 'src')
+sys.path.append(os.path.join(SRC, 'claim_analysis'))
+from aggregation import aggregate
+from normalization import load_mapping, normalize
+from token_store import TokenStore
+
+NORMALIZATION_PATH = os.path.join(SRC, 'claim_analysis', 'normalization.json')
+COLOR_PATH = os.path.join(SRC, 'claim_analysis', 'data.json')
+INFO_COLUMNS = ['occurrence_id', 'loss_date_x', 'bus_category', 'bus_no_x', 'asset_manufacturer', 'latt', 'long']
+
+# the display colours of the dashboard, (colour, display colour) in the order the script replaced them
+COLOUR_REPLACEMENTS = [
+    ('Silver', 'skyblue'), ('Aqua', 'Pink'), ('Fuchsia', 'Red'), ('Lime', 'peachpuff'), ('Olive', 'orange'),
+    ('Teal', 'yellowgreen'), ('SpringGreen3', 'SpringGreen'), ('Cyan3', 'Cyan'), ('DodgerBlue3', 'DodgerBlue'),
+    ('DodgerBlue1', 'darkmagenta'), ('DodgerBlue2', 'gold'), ('DeepSkyBlue1', 'firebrick'),
+    ('DeepSkyBlue2', 'DeepSkyBlue'), ('DeepSkyBlue3', 'thistle'), ('DeepSkyBlue4', 'tan'),
+    ('Green1', 'forestgreen'), ('Green3', 'Green'), ('Green4', 'plum'), ('Turquoise3', 'rosybrown'),
+    ('Turquoise4', 'royalblue'), ('Turquoise2', 'darkorange'), ('SpringGreen2', 'darksalmon'),
+    ('SpringGreen1', 'darkgoldenrod'), ('DeepPink4', 'darkkhaki'), ('Blue3', 'chocolate'), ('Blue1', 'darkorchid'),
+    ('violetred', 'blue'), ('SlateBlue3', 'limegreen'), ('burgundy', 'rosybrown'), ('SkyBlue2', 'sienna'),
+    ('MediumPurple3', 'seagreen'), ('DarkOliveGreen3', 'sandybrown'), ('White', 'magenta')]
+
+
+def baseline_aggregate(list_of_list, color_path):
+    """
+    The data frames of the parsed claims, as the original `claim_description.py` created them.
+    """
+    pos_df = pd.DataFrame(list_of_list, columns=['Description', 'POS', 'preposition', 'verb', 'chosen_verb', 'pos', 'noun', 'impact', 'occurrence_id',
+                                                 'loss_date_x', 'bus_category', 'bus_no_x', 'asset_manufacturer', 'latt', 'long'])
+
+    pos_df['impact'] = pos_df['impact'].apply(','.join).str.lower()
+    pos_df['chosen_verb'] = pos_df['chosen_verb'].apply(','.join).str.lower()
+
+    pos_df['impact'] = pos_df['impact'].replace(
+        ['rr', 'rf', 'rl', 'lf', 'rd', 'rs', 's', 'l', 'ls'], 'side of the vehicle', regex=False)
+
+    pos_df['impact'] = pos_df['impact'].replace(['dmgd', 'dmged', 'damae', 'damage',
+                                                 'damaging', 'damdage', 'damge', 'dmge'], 'damaged', regex=False)
+
+    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(['dmgd', 'dmged', 'damae', 'damage',
+                                                           'damaging', 'damdage', 'damge', 'dmge'], 'damaged', regex=False)
+    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(
+        ['bone', 'boned'], 'T-bone', regex=False)
+
+    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(['colledid', 'collide',
+                                                           'colliede', 'colly'], 'collide', regex=False)
+
+    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(
+        ['block', 'blockie'], 'block', regex=False)
+    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(
+        ['brake', 'braked'], 'brake', regex=False)
+    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(
+        ['cause', 'causge'], 'cause', regex=False)
+
+    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(
+        ['end', 'endde', 'ene'], 'end', regex=False)
+
+    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(
+        ['force', 'forcing'], 'force', regex=False)
+    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(
+        ['reaende', 'rear', 'rearedne', 'rearend', 'rearende', 'rearenede'], 'hit 	rearend', regex=False)
+    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(
+        ['scapre', 'scrap', 'scrape', 'rsscrape'], 'scrape', regex=False)
+    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(
+        ['incur', 'injure', 'injurie'], 'injure', regex=False)
+    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(
+        ['swerve', 'swerved'], 'swerve', regex=False)
+    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(
+        ['slidde', 'slide'], 'slide', regex=False)
+    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(
+        ['sqeeze', 'squeese', 'squeeze'], 'squeeze', regex=False)
+    pos_df['impact'] = pos_df['impact'].replace(
+        ['veh'], 'vehicle', regex=False)
+    pos_df['chosen_verb'] = pos_df['chosen_verb'].replace(
+        ['veh'], 'vehicle', regex=False)
+    pos_df['impact'] = pos_df['impact'].replace(
+        ['tp'], 'Third party', regex=False)
+
+    checker = dict()
+    for i in pos_df['impact']:
+        if i.lower() not in checker:
+            checker[i.lower()] = 1
+        else:
+            checker[i.lower()] += 1
+    Impacted_object_df = pd.DataFrame(checker.items(), columns=[
+                                      'Impacted Object', 'Count']).sort_values(by='Count', ascending=False)
+    Verbs_df = pd.DataFrame(checker.items(), columns=[
+                            'Verbs', 'Count']).sort_values(by='Count', ascending=False)
+    less_frequent_impact_objects = Impacted_object_df['Impacted Object'][Impacted_object_df['Count'] < 5]
+    less_frequent_verbs = Verbs_df['Verbs'][Verbs_df['Count'] < 5]
+    effective_impact = pos_df[~pos_df['impact'].isin(
+        less_frequent_impact_objects)].copy()
+
+    list_of_colour = pd.read_json(color_path)[['name']]
+    effective_impact_len = len(effective_impact)
+    effective_impact['claim_id'] = np.arange(1, effective_impact_len+1, 1)
+    intermediate_df = (effective_impact[['claim_id', 'chosen_verb']].set_index(['claim_id'])
+                       .apply(lambda x: x.str.split(',').explode()).reset_index()
+
+                       )
+    exploded_verb_df = pd.merge(
+        intermediate_df, effective_impact, on='claim_id')
+
+    effective_verb = exploded_verb_df[~exploded_verb_df['chosen_verb_x'].isin(
+        less_frequent_verbs)]
+
+    checker_verb = dict()
+    for i in effective_verb['chosen_verb_x']:
+        if i.lower() not in checker_verb:
+            checker_verb[i.lower()] = 1
+        else:
+            checker_verb[i.lower()] += 1
+    effective_verbs_df = pd.DataFrame(checker_verb.items(), columns=[
+                                      'Verbs', 'Count']).sort_values(by='Count', ascending=False)
+
+    less_occuring_verbs = effective_verbs_df['Verbs'][effective_verbs_df['Count'] < 3]
+
+    updated_verb = effective_verb[~effective_verb['chosen_verb_x'].isin(
+        less_occuring_verbs)].copy()
+
+    impact_list = list(np.unique(effective_impact['impact']))
+    impact_colour = list()
+    for i in effective_impact['impact']:
+        impact_colour.append(list_of_colour.iloc[impact_list.index(i)]['name'])
+
+    verb_list = list(np.unique(updated_verb['chosen_verb_x']))
+    verb_colour = list()
+    for i in updated_verb['chosen_verb_x']:
+        verb_colour.append(list_of_colour.iloc[verb_list.index(i)]['name'])
+
+    effective_impact['impact_colour'] = impact_colour
+    updated_verb['verb_colour'] = verb_colour
+
+    result_df = effective_impact
+    result_verb_df = updated_verb
+    for colour, display_colour in COLOUR_REPLACEMENTS:
+        result_df = result_df.replace(colour, display_colour)
+    for colour, display_colour in COLOUR_REPLACEMENTS:
+        result_verb_df = result_verb_df.replace(colour, display_colour)
+    return result_df, result_verb_df
+
+
+def parsed_claims(n_claims, seed):
+    """
+    It creates the lists of `claim_parser.parse_tokens` and the information of
+    some claims, with typos of the tables, mixed case tokens, claims without an
+    impacted object and claims with several chosen verbs.
+    """
+    rng = np.random.RandomState(seed)
+    nouns = ['bus', 'car', 'pole', 'mirror', 'Bus', 'TP', 'tp', 'veh', 'dmgd', 'damge', 'rr', 'ls',
+             'window', 'truck', 'curb', 'rare_noun']
+    verbs = ['hit', 'Hit', 'scrape', 'scapre', 'rear', 'rearend', 'collide', 'colly', 'bone', 'dmge',
+             'veh', 'swerve', 'back', 'turn', 'rare_verb']
+    tags = ['NOUN', 'VERB', 'PROPN', 'ADJ']
+    noun_weights = 1.0 / np.arange(1, len(nouns) + 1)
+    verb_weights = 1.0 / np.arange(1, len(verbs) + 1)
+    list_of_list = []
+    for i in range(n_claims):
+        noun_list = list(rng.choice(nouns, rng.randint(0, 4), p=noun_weights / noun_weights.sum()))
+        verb_list = list(rng.choice(verbs, rng.randint(0, 4), p=verb_weights / verb_weights.sum()))
+        pos_list = list(rng.choice(tags, len(noun_list) + len(verb_list)))
+        preposition_list = noun_list[:1] if rng.rand() < 0.2 else []
+        chosen_verb_list = verb_list[:2]
+        impact_list = noun_list[-1:]
+        list_of_list.append(['claim %d' % i, pos_list, preposition_list, verb_list, chosen_verb_list, pos_list,
+                             noun_list, impact_list, i, pd.Timestamp('2019-01-01') + pd.Timedelta(hours=i),
+                             int(rng.randint(0, 5)), int(rng.randint(0, 9999)),
+                             ['NEW FLYER', 'NOVA'][rng.randint(0, 2)], float(rng.rand()), float(rng.rand())])
+    return list_of_list
+
+
+@pytest.mark.parametrize('n_claims,seed', [(60, 0), (400, 1), (2000, 2)])
+def test_aggregate_matches_the_baseline(n_claims, seed):
+    list_of_list = parsed_claims(n_claims, seed)
+    expected_df, expected_verb_df = baseline_aggregate(list_of_list, COLOR_PATH)
+
+    mapping = load_mapping(NORMALIZATION_PATH)
+    palette = list(normalize(pd.read_json(COLOR_PATH)['name'], mapping['colours']))
+    claims_df = pd.DataFrame([[row[0]] + row[8:] for row in list_of_list], columns=['Description'] + INFO_COLUMNS)
+    store = TokenStore.from_parsed([[row[1], row[2], row[3], row[4], row[6], row[7]]
+                                    for row in list_of_list])
+    result_df, result_verb_df = aggregate(claims_df, store, mapping['typos'], palette)
+
+    assert len(expected_df) and len(expected_verb_df)
+    pd.testing.assert_frame_equal(result_df, expected_df)
+    pd.testing.assert_frame_equal(result_verb_df, expected_verb_df)
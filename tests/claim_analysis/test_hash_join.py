@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+A test of the streamed merge of `merge_claims.py`: with the claim schema the
+chunks of the join must give the data frame of the in-memory merge, with and
+without spilling, and the exports must be written along with the Parquet file.
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, 'src')
+sys.path.append(os.path.join(SRC, 'claim_analysis'))
+from hash_join import stream_merge
+from common.artifact_io import read_table, write_table
+from common.schemas import SCHEMAS, load_dataset
+
+
+def claim_files(directory, n_claims=500, seed=123):
+    """
+    It writes claims with text in the numeric columns, a column that is only
+    filled in the last rows and the locations of part of the claims.
+    """
+    rng = np.random.RandomState(seed)
+    bus_no = rng.randint(1000, 9999, n_claims).astype(str).astype(object)
+    bus_no[rng.rand(n_claims) < 0.05] = 'N/A'
+    claims = pd.DataFrame({
+        'claim_id': rng.randint(0, n_claims // 2, n_claims),
+        'day_of_week': rng.choice(['Monday', 'Friday', 'Sunday'], n_claims),
+        'line_no': rng.choice(['99', '25', 'N19'], n_claims),
+        'bus_no': bus_no,
+        'bus_carry_capacity': rng.choice(['40', '60', '12A'], n_claims),
+        'paid_cost$': np.round(rng.rand(n_claims) * 1000, 2),
+        'loss_date': rng.choice(['2018-01-02', '2019-05-06'], n_claims),
+        'claim_status': rng.choice(['Closed', 'Open'], n_claims),
+        'bus_fuel_type': rng.choice(['Diesel', 'Hybrid'], n_claims),
+        'asset_vehicle_year': np.where(np.arange(n_claims) < n_claims - 20, np.nan, 2010.0)})
+    locations = pd.DataFrame({'claim_id': np.arange(0, n_claims // 2, 2),
+                              'bus_no': rng.randint(1000, 9999, n_claims // 4),
+                              'latt': rng.uniform(49.0, 49.4, n_claims // 4)})
+    claims_path = os.path.join(str(directory), 'claims.csv')
+    locations_path = os.path.join(str(directory), 'locations.parquet')
+    claims.to_csv(claims_path, index=False)
+    write_table(locations, locations_path)
+    return claims_path, locations_path
+
+
+@pytest.mark.parametrize('n_partitions', [1, 3])
+def test_stream_merge_with_schema_matches_in_memory_merge(tmp_path, n_partitions):
+    claims_path, locations_path = claim_files(tmp_path)
+    output_file_path = os.path.join(str(tmp_path), 'merged.parquet')
+
+    stats = stream_merge(claims_path, locations_path, output_file_path, chunksize=64, n_partitions=n_partitions,
+                         spill_dir=str(tmp_path), exports=['csv', 'xlsx'], claims_schema=SCHEMAS['claim_lines'])
+
+    expected = pd.merge(load_dataset('claim_lines', claims_path), read_table(locations_path),
+                        on=['claim_id'], how='inner')
+    merged = read_table(output_file_path)
+    assert stats['rows'] == len(expected)
+    if n_partitions > 1:
+        # the spilled join is ordered by partition
+        merged = merged.sort_values(list(merged.columns)).reset_index(drop=True)
+        expected = expected.sort_values(list(expected.columns)).reset_index(drop=True)
+    # the categories of a chunk only have its own levels, they are read as text, the integers
+    # of the sample are nullable and a column without any value in the sample is text
+    expected = expected.astype({column: object for column in expected.select_dtypes('category').columns})
+    expected['claim_id'] = expected['claim_id'].astype('Int64')
+    late = expected['asset_vehicle_year']
+    expected['asset_vehicle_year'] = late.astype(str).where(late.notna(), None)
+    pd.testing.assert_frame_equal(merged, expected)
+    assert merged['bus_no_x'].isna().sum() == expected['bus_no_x'].isna().sum() > 0
+
+
+def test_stream_merge_writes_the_exports_chunk_by_chunk(tmp_path):
+    claims_path, locations_path = claim_files(tmp_path)
+    output_file_path = os.path.join(str(tmp_path), 'merged.parquet')
+
+    stream_merge(claims_path, locations_path, output_file_path, chunksize=64, exports=['csv', 'xlsx', 'feather'],
+                 claims_schema=SCHEMAS['claim_lines'])
+
+    merged = read_table(output_file_path)
+    for extension in ['csv', 'xlsx', 'feather']:
+        export = read_table(os.path.join(str(tmp_path), 'merged.' + extension))
+        assert list(export.columns) == list(merged.columns)
+        assert len(export) == len(merged)
+        pd.testing.assert_series_equal(export['claim_id'], merged['claim_id'], check_dtype=False)
+        pd.testing.assert_series_equal(export['latt'], merged['latt'], check_dtype=False)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Tests of `schemas.load_dataset`: the numeric columns of the schemas are read
+whatever text the raw files have in them.
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, 'src'))
+from common.schemas import load_dataset, to_numeric
+
+
+@pytest.fixture
+def claims_path(tmp_path):
+    file_path = str(tmp_path / 'claims.csv')
+    pd.DataFrame({
+        'CLAIM_ID': [1, 2, 3, 4, 5, 6, 7],
+        'paid_cost$': [10.5, 20, 30, 40, 50, 60, 70],
+        'empl_id': [11, 12, 13, 14, 15, 16, 17],
+        'day_of_week': ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'],
+        'loss_date': ['2019-01-0%d' % day for day in range(1, 8)],
+        'claim_status': ['Open', 'Closed', 'Open', 'Open', 'Closed', 'Open', 'Closed'],
+        'line_no': ['014', '099', 'N19', '014', '099', '025', '014'],
+        'bus_no': ['12', 'N/A', '12A', '12.0', '12.5', '99999999999', ''],
+        'bus_fuel_type': ['Diesel', 'CNG', 'Diesel', 'Electric', 'Diesel', 'CNG', 'Diesel'],
+        'bus_carry_capacity': ['40', '60 seats', '80', '40000', '-1', '60', '80.0'],
+        'description': ['a', 'b', 'c', 'd', 'e', 'f', 'g']}).to_csv(file_path, index=False)
+    return file_path
+
+
+def test_numeric_columns_are_coerced(claims_path):
+    claims = load_dataset('claims', claims_path, report=False)
+    assert list(claims.columns) == ['claim_id', 'paid_cost$', 'empl_id', 'day_of_week', 'loss_date', 'claim_status',
+                                    'line_no', 'bus_no', 'bus_fuel_type', 'bus_carry_capacity']
+    assert claims['bus_no'].dtype == 'Int32'
+    assert claims['bus_no'].tolist() == [12, pd.NA, pd.NA, 12, pd.NA, pd.NA, pd.NA]
+    assert claims['bus_carry_capacity'].dtype == 'Int16'
+    assert claims['bus_carry_capacity'].tolist() == [40, pd.NA, 80, pd.NA, -1, 60, 80]
+    assert claims['line_no'].dtype == 'category' and claims['line_no'].tolist()[:3] == ['014', '099', 'N19']
+    assert pd.api.types.is_datetime64_any_dtype(claims['loss_date'])
+
+
+def test_all_the_columns_of_the_claim_lines(claims_path):
+    claims = load_dataset('claim_lines', claims_path, report=False)
+    assert list(claims.columns) == list(pd.read_csv(claims_path, nrows=0).columns)
+    assert claims['bus_no'].dtype == 'Int32'
+    assert claims['loss_date'].dtype == object
+
+
+def test_to_numeric():
+    values = pd.Series([1, 2.5, 'x', None, 2 ** 40], dtype=object)
+    assert to_numeric(values, 'Int32').tolist() == [1, pd.NA, pd.NA, pd.NA, pd.NA]
+    result = to_numeric(values, 'float32')
+    assert result.dtype == np.float32 and np.isnan(result[2])
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Tests of `GazetteerGeocoder`: the exact and the fuzzy matches of the gazetteer,
+the fallback to another client and its rate limit, and the near misses of
+numbered streets that must not be taken from the gazetteer.
+"""
+
+import os
+import sys
+import time
+import pandas as pd
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, 'src')
+sys.path.append(os.path.join(SRC, 'interactive_map'))
+from geocoding_engine import GeocodingEngine, StubGeocoder
+from offline_geocoder import GazetteerGeocoder, make_synthetic_gazetteer
+from street_canonicalizer import canonical_query
+
+
+@pytest.fixture
+def gazetteer_df():
+    return pd.DataFrame([['Granville St', 'Dunsmuir St', 'Vancouver', 49.2833, -123.1167],
+                         ['Kingsway', 'Boundary Rd', 'Burnaby', 49.2300, -123.0230],
+                         ['W 41st Ave', 'Oak St', 'Vancouver', 49.2340, -123.1280]],
+                        columns=['street1', 'street2', 'city', 'lat', 'long'])
+
+
+def location(result):
+    return result[0]['geometry']['location']['lat'], result[0]['geometry']['location']['lng'], result[0].get('source')
+
+
+def test_exact_match(gazetteer_df):
+    geocoder = GazetteerGeocoder(gazetteer_df)
+    # the streets swapped and typed differently
+    result = geocoder.geocode('DUNSMUIR STREET & granville st., vancouver, BC')
+    assert location(result) == (49.2833, -123.1167, 'gazetteer')
+    assert location(geocoder.geocode('Oak Street & West 41 Avenue, Vancouver, BC'))[:2] == (49.2340, -123.1280)
+    assert (geocoder.exact_matches, geocoder.fuzzy_matches, geocoder.fallbacks) == (2, 0, 0)
+
+
+def test_fuzzy_match(gazetteer_df):
+    geocoder = GazetteerGeocoder(gazetteer_df)
+    result = geocoder.geocode('Kingsway & Boundry Rd, Burnaby, BC')
+    assert location(result) == (49.2300, -123.0230, 'gazetteer')
+    assert (geocoder.exact_matches, geocoder.fuzzy_matches, geocoder.fallbacks) == (0, 1, 0)
+
+
+def test_fallback(gazetteer_df):
+    query = 'Main St & Hastings St, Vancouver, BC'
+    assert GazetteerGeocoder(gazetteer_df).geocode(query) == []
+
+    fallback_client = StubGeocoder()
+    geocoder = GazetteerGeocoder(gazetteer_df, fallback_client=fallback_client)
+    result = geocoder.geocode(query)
+    # the fallback is asked with the query as it is given
+    assert result == fallback_client.geocode(query)
+    assert location(result)[2] is None
+    assert (geocoder.exact_matches, geocoder.fuzzy_matches, geocoder.fallbacks) == (0, 0, 1)
+
+
+def test_only_the_fallback_is_rate_limited(gazetteer_df):
+    geocoder = GazetteerGeocoder(gazetteer_df, fallback_client=StubGeocoder(), queries_per_second=5)
+    t = time.time()
+    for _ in range(100):
+        geocoder.geocode('Granville St & Dunsmuir St, Vancouver, BC')
+    assert time.time() - t < 1.0
+    t = time.time()
+    for i in range(8):
+        geocoder.geocode('Main St & %d Ave, Vancouver, BC' % i)
+    # the bucket starts with 5 tokens, the 3 other requests wait 0.2 s each
+    assert time.time() - t >= 0.5
+
+
+def test_counters_with_concurrent_workers():
+    gazetteer_df = make_synthetic_gazetteer(n_intersections=500, seed=1)
+    queries = ['{0} & {1}, {2}, BC'.format(*row) for row in gazetteer_df[['street1', 'street2', 'city']].values] * 4
+    queries = list(dict.fromkeys(queries)) + ['Nowhere St & %d Ave, Atlantis, BC' % i for i in range(50)]
+    geocoder = GazetteerGeocoder(gazetteer_df, fallback_client=StubGeocoder())
+    locations = GeocodingEngine(geocoder, queries_per_second=None, max_in_flight=8).resolve_all(queries)
+    assert len(locations) == len(queries)
+    assert geocoder.exact_matches + geocoder.fuzzy_matches + geocoder.fallbacks == len(queries)
+    assert geocoder.fallbacks == 50
+
+
+@pytest.mark.parametrize('query,street1,street2', [
+    # another number of a numbered street
+    ('Main St & 45 Ave, Vancouver, BC', '41 Ave', 'Main St'),
+    # a directional that the query doesn't have
+    ('Main St & 49 Ave, Vancouver, BC', 'E 49 Ave', 'Main St'),
+    # a directional that the gazetteer doesn't have
+    ('Main St & E 41 Ave, Vancouver, BC', '41 Ave', 'Main St'),
+    ('Main St & 41st Ave, Vancouver, BC', '1st Ave', 'Main St'),
+])
+def test_no_fuzzy_match_of_another_numbered_street(query, street1, street2):
+    gazetteer_df = pd.DataFrame([[street1, street2, 'Vancouver', 49.2, -123.1]],
+                                columns=['street1', 'street2', 'city', 'lat', 'long'])
+    geocoder = GazetteerGeocoder(gazetteer_df)
+    assert geocoder.match(canonical_query(query))[0] is None
+    fallback_client = StubGeocoder()
+    geocoder = GazetteerGeocoder(gazetteer_df, fallback_client=fallback_client)
+    # the near miss is sent to the fallback instead of being taken from the gazetteer
+    assert geocoder.geocode(query) == fallback_client.geocode(query)
+    assert (geocoder.exact_matches, geocoder.fuzzy_matches, geocoder.fallbacks) == (0, 0, 1)
+
+
+def test_no_fuzzy_match_in_another_city(gazetteer_df):
+    geocoder = GazetteerGeocoder(gazetteer_df)
+    assert geocoder.geocode('Kingsway & Boundry Rd, Vancouver, BC') == []
+    assert geocoder.geocode('Kingsway & Boundary Rd, Burnaby, BC') != []
+
+
+def test_fuzzy_match_of_each_street(gazetteer_df):
+    geocoder = GazetteerGeocoder(gazetteer_df)
+    # a typo in both streets, swapped
+    assert location(geocoder.geocode('Granvile St & Dunsmur St, Vancouver, BC')) == (49.2833, -123.1167, 'gazetteer')
+    # a typo in one street and another street
+    assert geocoder.geocode('Granvile St & Robson St, Vancouver, BC') == []
+    assert (geocoder.exact_matches, geocoder.fuzzy_matches) == (0, 1)
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Tests of `ResultJournal`: an interrupted run is replayed, a finished run
+removes its journal so a later run doesn't replay stale results.
+"""
+
+import os
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, 'src')
+sys.path.append(os.path.join(SRC, 'interactive_map'))
+from result_journal import ResultJournal
+
+LOCATION = {'lat': 49.2833, 'long': -123.1167, 'address': 'Dunsmuir St & Granville St, Vancouver, BC'}
+
+
+def test_replay_of_an_interrupted_run(tmp_path):
+    journal_path = os.path.join(str(tmp_path), 'output.parquet.journal')
+    journal = ResultJournal(journal_path)
+    journal.append('Dunsmuir St & Granville St, Vancouver, BC', 'Granville St', 'Dunsmuir St', 'Vancouver', LOCATION)
+    journal.close()
+    # a torn line of a run killed in the middle of a write
+    with open(journal_path, 'a') as journal_file:
+        journal_file.write('{"query": "Kingsway')
+
+    journal = ResultJournal(journal_path)
+    records = journal.replay()
+    assert list(records) == ['Dunsmuir St & Granville St, Vancouver, BC']
+    assert records['Dunsmuir St & Granville St, Vancouver, BC']['lat'] == 49.2833
+    journal.append('Boundary Rd & Kingsway, Burnaby, BC', 'Kingsway', 'Boundary Rd', 'Burnaby', LOCATION)
+    journal.close()
+    assert len(ResultJournal(journal_path).replay()) == 2
+
+
+def test_remove_after_the_output_is_written(tmp_path):
+    journal_path = os.path.join(str(tmp_path), 'output.parquet.journal')
+    journal = ResultJournal(journal_path)
+    journal.append('Dunsmuir St & Granville St, Vancouver, BC', 'Granville St', 'Dunsmuir St', 'Vancouver', LOCATION)
+    journal.remove()
+    assert not os.path.exists(journal_path)
+    assert ResultJournal(journal_path).replay() == {}
+    # a run without any new result has no journal file to remove
+    ResultJournal(journal_path).remove()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Tests of the vectorized transforms of `transforms.py`: each one must give the
+column of the row-wise `apply` function or of the chain of `replace` calls that
+`prepare_data.py` used before.
+"""
+
+import math
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, 'src')
+sys.path.append(os.path.join(SRC, 'interactive_map'))
+from transforms import (coalesce_loss_date, experience_in_months, experience_levels, load_city_aliases,
+                        normalize_cities)
+
+CITY_ALIASES_PATH = os.path.join(SRC, 'interactive_map', 'city_aliases.json')
+
+
+def compare_loss_date(row):
+    if (row['loss_date_x'] is not pd.NaT) & (row['loss_date_y'] is pd.NaT):
+        val = row.loss_date_x
+    else:
+        val = row.loss_date_y
+    return val
+
+
+def get_experience_in_months(row):
+    difference = row['loss_date'] - row['hire_date']
+    return round(difference.days / 30, 0)
+
+
+def legacy_cities(cities):
+    """
+    The city names after the `replace` calls of the original `prepare_data.py`.
+    """
+    cities = cities.str.lower().str.strip()
+    cities = cities.replace(["van", "vacovuer", "vancouer", "vancover", "vancouver", "vancovuer", "ubc", "vancouver - vtc", "vtc"], "Vancouver")
+    cities = cities.replace(["bur", "burnaby", "bunaby"], "Burnaby")
+    cities = cities.replace(["new wesminster", "nw", "new westminister", "new westminster"], "New Westminster")
+    cities = cities.replace(["sur", "sureey", "surrye", "surrey", "cloverdale", "south surrey"], "Surrey")
+    cities = cities.replace(["ladnar", "ladner", "del", "delta"], "Delta")
+    cities = cities.replace(["coq", "coquitlam"], "Coquitlam")
+    cities = cities.replace(["lan", "langley"], "Langley")
+    cities = cities.replace(["pit", "pit meadow", "pitt meadows"], "Pitt Meadows")
+    cities = cities.replace(["mr", "maple ridge"], "Maple Ridge")
+    cities = cities.replace(["pm", "poer moody", "port moody"], "Port Moody")
+    cities = cities.replace(["pc", "port coquitlam"], "Port Coquitlam")
+    cities = cities.replace(["wr", "white rock", "white rock/surrey", "whiterock", "white rock / surrey"], "White Rock")
+    cities = cities.replace(["wv", "west vancouver"], "West Vancouver")
+    cities = cities.replace(["ric", "richmond"], "Richmond")
+    cities = cities.replace(["nv", "north van", "north vancover", "north vancouver"], "North Vancouver")
+    cities = cities.replace(["anmore"], "Anmore")
+    cities = cities.replace(["belcarra"], "Belcarra")
+    cities = cities.replace(["walnut grove"], "Walnut Grove")
+    return cities
+
+
+def assert_same_values(result, expected):
+    pd.testing.assert_series_equal(result.astype(object), expected.astype(object), check_names=False)
+
+
+@pytest.fixture
+def incidents():
+    """
+    Incidents with missing loss dates of the claims, of the collisions and of both.
+    """
+    rng = np.random.RandomState(0)
+    n_rows = 500
+
+    def dates(start, n_days, missing):
+        values = pd.Series(pd.Timestamp(start) + pd.to_timedelta(rng.randint(0, n_days, n_rows), unit='D'))
+        return values.mask(rng.rand(n_rows) < missing)
+
+    df = pd.DataFrame({'loss_date_x': dates('2015-01-01', 2000, 0.2), 'loss_date_y': dates('2015-01-01', 2000, 0.4),
+                       'hire_date': dates('1995-01-01', 9000, 0.0)})
+    df.loc[:4, ['loss_date_x', 'loss_date_y']] = pd.NaT
+    # hired on the day of the incident and after it
+    df.loc[5, ['loss_date_y', 'hire_date']] = pd.Timestamp('2016-03-01')
+    df.loc[6, ['loss_date_y', 'hire_date']] = [pd.Timestamp('2016-03-01'), pd.Timestamp('2016-04-15')]
+    return df
+
+
+def test_coalesce_loss_date(incidents):
+    expected = incidents.apply(compare_loss_date, axis=1)
+    result = coalesce_loss_date(incidents['loss_date_x'], incidents['loss_date_y'])
+    assert result.isna().sum() >= 5
+    pd.testing.assert_series_equal(result, expected, check_names=False)
+
+
+def test_experience_in_months(incidents):
+    incidents['loss_date'] = coalesce_loss_date(incidents['loss_date_x'], incidents['loss_date_y'])
+    expected = incidents.apply(get_experience_in_months, axis=1)
+    result = experience_in_months(incidents['loss_date'], incidents['hire_date'])
+    assert result.isna().sum() >= 5
+    pd.testing.assert_series_equal(result, expected.astype(float), check_names=False)
+
+
+def legacy_experience_levels(df):
+    """
+    The experience levels of the original `prepare_data.py`, from the loss dates and the hire dates.
+    """
+    df = df.copy()
+    df['loss_date'] = df.apply(compare_loss_date, axis=1)
+    df = df.drop(columns=['loss_date_x', 'loss_date_y'])
+    df = df.dropna(subset=["hire_date"])
+    df['experience_in_months'] = df.apply(get_experience_in_months, axis=1)
+    bin_labels = ['< 6 months', '6-18 months', '18-60 months', '> 60 months']
+    df['experience_levels'] = pd.cut(df['experience_in_months'], bins=[0, 6, 18, 60, math.inf], labels=bin_labels)
+    return df['experience_levels']
+
+
+def test_experience_levels(incidents):
+    # the bin edges, 6, 18, 60 and 0 months, and a hire date that is missing
+    edges = pd.DataFrame({'loss_date_x': pd.to_datetime(['2016-01-01'] * 5), 'loss_date_y': pd.NaT,
+                          'hire_date': pd.to_datetime(['2015-07-05', '2014-07-21', '2011-01-16', '2015-12-31', None])})
+    incidents = pd.concat([incidents, edges], ignore_index=True)
+    expected = legacy_experience_levels(incidents)
+    incidents = incidents.dropna(subset=['hire_date'])
+    loss_date = coalesce_loss_date(incidents['loss_date_x'], incidents['loss_date_y'])
+    result = experience_levels(experience_in_months(loss_date, incidents['hire_date']))
+    assert list(result.iloc[-4:].astype(object).fillna('none')) == ['< 6 months', '6-18 months', '18-60 months', 'none']
+    assert result.isna().sum() >= 7
+    pd.testing.assert_series_equal(result, expected, check_names=False)
+
+
+@pytest.mark.parametrize('min_confidence', [None, 0.5])
+def test_normalize_cities(min_confidence):
+    city_aliases = load_city_aliases(CITY_ALIASES_PATH)
+    common = ['vancouver'] * 20 + ['BURNABY '] * 10 + ['Surrey'] * 8 + ['richmond'] * 6
+    # known aliases and an unknown spelling, each one below the min_count of the fuzzy matching
+    rare = ['van', 'bunaby', ' White Rock / Surrey', 'poer moody', 'unknown town']
+    cities = pd.Series(common + rare + [np.nan, np.nan])
+    result = normalize_cities(cities, city_aliases, min_confidence)
+    assert result.dtype == 'category'
+    assert_same_values(result, legacy_cities(cities))
+    assert result.isna().sum() == 2
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Tests of `model_artifact.warm_classifier`: the fitted classifier of an
+artifact, given a data frame with the native categories, must predict what the
+best pipeline of the search predicts on the encoded matrix.
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+from lightgbm import LGBMClassifier
+from sklearn.model_selection import GridSearchCV
+from sklearn.pipeline import Pipeline
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, 'src')
+sys.path.append(os.path.join(SRC, 'ml_model', 'python'))
+from features import CATEGORICAL_FEATURES, FEATURES, NUMERIC_FEATURES, make_preprocessor
+from model_artifact import can_warm_start, load_model_artifact, make_model_artifact, save_model_artifact, \
+    warm_classifier
+from shared_data import SharedTrainingData
+
+
+def synthetic_data(n_rows, seed):
+    rng = np.random.RandomState(seed)
+    X = pd.DataFrame({column: rng.rand(n_rows) for column in NUMERIC_FEATURES})
+    for column in CATEGORICAL_FEATURES:
+        X[column] = rng.choice(['a', 'b', 'c', 'd'], n_rows)
+    X['month'] = rng.randint(1, 13, n_rows)
+    X['is_shuttle'] = rng.randint(0, 2, n_rows)
+    y = pd.Series(((X['city'] == 'a') & (X['hour'] > 0.3) | (rng.rand(n_rows) < 0.2)).astype(int))
+    return X, y
+
+
+def test_warm_classifier_predicts_like_the_best_pipeline(tmp_path):
+    X, y = synthetic_data(600, 0)
+    X_test, _ = synthetic_data(100, 1)
+    # levels that aren't in the training data and missing values
+    X_test.loc[:9, 'city'] = 'z'
+    X_test.loc[10:19, 'line_no'] = np.nan
+    with SharedTrainingData(X, y, CATEGORICAL_FEATURES, str(tmp_path), FEATURES) as shared:
+        estimator = Pipeline(steps=[('preprocessor', make_preprocessor('native', shared.columns)),
+                                    ('classifier', LGBMClassifier(random_state=123, verbose=-1))])
+        search = GridSearchCV(estimator, {'classifier__num_leaves': [4, 8]}, cv=2)
+        search.fit(shared.X, shared.y, **shared.fit_params('native'))
+        expected = search.best_estimator_.predict_proba(shared.encode(X_test))
+        file_path = os.path.join(str(tmp_path), 'final_model_after_optimization.pickle')
+        save_model_artifact(make_model_artifact(search, 'grid', 'native', shared, 0.5), file_path)
+
+    artifact = load_model_artifact(file_path)
+    assert can_warm_start(artifact)
+    result = warm_classifier(artifact).predict_proba(artifact['native_categories'].transform(X_test))
+    np.testing.assert_array_equal(result, expected)
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Tests of `SharedTrainingData.encode`: the categorical columns are the codes of
+the training levels, -1 for an unseen level and NaN for a missing value.
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, 'src')
+sys.path.append(os.path.join(SRC, 'ml_model', 'python'))
+from shared_data import SharedTrainingData
+
+
+def training_data():
+    X = pd.DataFrame({'hour': [1.0, 2.0, np.nan, 4.0], 'city': ['Burnaby', 'Vancouver', 'Burnaby', 'Surrey'],
+                      'month': [1, 2, 3, 1], 'other': ['a', 'b', 'c', 'd']})
+    return X, pd.Series([0, 1, 0, 1])
+
+
+def test_encode_codes_of_the_training_levels(tmp_path):
+    X, y = training_data()
+    with SharedTrainingData(X, y, ['month'], str(tmp_path), ['hour', 'city', 'month']) as shared:
+        assert shared.columns == ['hour', 'city', 'month']
+        assert shared.X.flags['C_CONTIGUOUS'] and shared.X.dtype == np.float64
+        # the levels are sorted: Burnaby, Surrey, Vancouver
+        np.testing.assert_array_equal(shared.X, [[1, 0, 0], [2, 2, 1], [np.nan, 0, 2], [4, 1, 0]])
+        assert shared.categorical_indices == [1, 2]
+
+
+def test_encode_unseen_levels_and_missing_values(tmp_path):
+    X, y = training_data()
+    with SharedTrainingData(X, y, ['month'], str(tmp_path), ['hour', 'city', 'month']) as shared:
+        new_X = pd.DataFrame({'hour': [5.0, np.nan], 'city': ['Richmond', None], 'month': [12, np.nan]})
+        matrix = shared.encode(new_X)
+    # an unseen level is -1, a missing value is NaN, in the categorical and the numeric columns
+    np.testing.assert_array_equal(matrix, [[5, -1, -1], [np.nan, np.nan, np.nan]])
+    assert not os.listdir(str(tmp_path))